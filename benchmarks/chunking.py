@@ -0,0 +1,164 @@
+"""Structure-aware chunking compared with the previous fixed-size splitter.
+
+For each sample PDF both splitters chunk the extracted text; the benchmark
+reports split and embedding time, chunk count, duplicated characters from
+overlap, FAISS index size, sentences cut between chunks, and retrieval
+recall@k for queries made from sentences of the document (a query is a hit
+when a retrieved chunk contains the whole sentence):
+
+    python -m benchmarks.chunking --pages 20 100 --seeds 0 1 2 --profiles short long
+    python -m benchmarks.chunking --pdfs papers/*.pdf --queries 300
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import time
+
+import faiss
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from chunking import split_text, SENTENCE_END_RE, PARAGRAPH_BREAK
+from pdf_extraction import PAGE_BREAK
+from pdf_rag_utils import extract_text_from_pdf, embed_chunks, get_embeddings
+
+from benchmarks.run import git_commit, summarize
+from benchmarks.synthetic_pdf import make_pdf
+
+MIN_SENTENCE_WORDS = 6
+
+# Synthetic document layouts: short paragraphs with a heading per page, and
+# long paragraphs in sections spanning several pages (closer to papers and books)
+PROFILES = {
+    "short": {},
+    "long": {"paragraphs_per_page": 2, "sentences_per_paragraph": (10, 20), "pages_per_section": 3}
+}
+
+
+def fixed_size_split(pdf_text):
+    """The previous splitter: 1000-character chunks with 200 characters of overlap, page by page"""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, length_function=len)
+    chunks = [chunk for page_text in pdf_text.split(PAGE_BREAK) for chunk in splitter.split_text(page_text)]
+    return chunks, [{} for _ in chunks]
+
+
+SPLITTERS = {"fixed_1000_200": fixed_size_split, "structure_aware": split_text}
+
+
+def normalize(text):
+    return " ".join(text.split())
+
+
+def sample_sentences(pdf_text, count, rng):
+    """Sentences of the document, skipping headings and fragments"""
+    sentences = []
+    for page_text in pdf_text.split(PAGE_BREAK):
+        for paragraph in page_text.split(PARAGRAPH_BREAK):
+            if paragraph.startswith("#"):
+                continue
+            sentences += [normalize(s) for s in SENTENCE_END_RE.split(paragraph) if len(s.split()) >= MIN_SENTENCE_WORDS]
+    return rng.sample(sentences, min(count, len(sentences)))
+
+
+def make_query(sentence, rng):
+    """A paraphrase-like query: the sentence with about a third of its words dropped"""
+    words = sentence.split()
+    kept = [word for word in words if rng.random() > 0.33]
+    return " ".join(kept or words)
+
+
+def evaluate(splitter, pdf_text, sentences, queries, query_vectors, args):
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        chunks, _ = splitter(pdf_text)
+        timings.append(time.perf_counter() - start)
+    normalized_chunks = [normalize(chunk) for chunk in chunks]
+    text_chars = len(normalize(pdf_text.replace(PAGE_BREAK, " ")))
+    result = {
+        "split": summarize(timings),
+        "chunks": len(chunks),
+        "mean_chunk_chars": float(np.mean([len(chunk) for chunk in chunks])) if chunks else 0.0,
+        "embedded_chars": sum(len(chunk) for chunk in normalized_chunks),
+        "duplication": sum(len(chunk) for chunk in normalized_chunks) / max(text_chars, 1) - 1,
+        # Sentences not contained whole in any chunk were cut at a chunk boundary
+        "cut_sentences": sum(not any(s in chunk for chunk in normalized_chunks) for s in sentences) / max(len(sentences), 1)
+    }
+    if query_vectors is None:
+        return result
+
+    start = time.perf_counter()
+    vectors = embed_chunks(chunks)
+    result["embed_s"] = time.perf_counter() - start
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    result["index_bytes"] = int(faiss.serialize_index(index).nbytes)
+    _, ids = index.search(query_vectors, args.k)
+    hits = sum(any(sentence in normalized_chunks[i] for i in row if i >= 0) for sentence, row in zip(sentences, ids))
+    result[f"recall_at_{args.k}"] = hits / max(len(queries), 1)
+    return result
+
+
+def documents(args):
+    for profile in args.profiles:
+        for num_pages in args.pages:
+            for seed in args.seeds:
+                yield f"{profile}_{num_pages}p_seed{seed}", make_pdf(num_pages, seed=seed, **PROFILES[profile])
+    for path in args.pdfs:
+        yield os.path.basename(path), path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare structure-aware chunking with the fixed-size splitter")
+    parser.add_argument("--pages", type=int, nargs="*", default=[20, 100], help="synthetic PDF sizes")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2], help="synthetic PDFs per size")
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES), choices=list(PROFILES),
+                        help="synthetic document layouts")
+    parser.add_argument("--pdfs", nargs="*", default=[], help="real PDF files to include")
+    parser.add_argument("--queries", type=int, default=200, help="sentence queries per document")
+    parser.add_argument("--k", type=int, default=4, help="chunks retrieved per query")
+    parser.add_argument("--repeat", type=int, default=5, help="timed splits per document")
+    parser.add_argument("--skip-embeddings", action="store_true", help="only compare chunk statistics")
+    parser.add_argument("--output", default="bench_results_chunking.json", help="where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    results = []
+    for doc_name, pdf in documents(args):
+        pdf_text = extract_text_from_pdf(pdf)
+        if pdf_text.startswith("Error"):
+            print(f"{doc_name}: {pdf_text}")
+            continue
+        rng = random.Random(0)
+        sentences = sample_sentences(pdf_text, args.queries, rng)
+        queries = [make_query(sentence, rng) for sentence in sentences]
+        query_vectors = None
+        if not args.skip_embeddings and queries:
+            query_vectors = np.asarray(get_embeddings().embed_documents(queries), dtype=np.float32)
+            faiss.normalize_L2(query_vectors)
+        for name, splitter in SPLITTERS.items():
+            result = evaluate(splitter, pdf_text, sentences, queries, query_vectors, args)
+            results.append({"name": "chunking", "params": {"splitter": name, "document": doc_name}, **result})
+            recall = result.get(f"recall_at_{args.k}")
+            print(f"{doc_name:<28} {name:<16} {result['chunks']:6d} chunks  dup {result['duplication']:6.1%}  "
+                  f"cut {result['cut_sentences']:6.1%}  embed {result.get('embed_s', 0):7.2f}s  "
+                  f"index {result.get('index_bytes', 0) / 1024:8.0f} KiB  "
+                  f"recall@{args.k} {'-' if recall is None else f'{recall:.1%}'}")
+
+    report = {
+        "metadata": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "config": vars(args)
+        },
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
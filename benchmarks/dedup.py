@@ -0,0 +1,126 @@
+"""Duplicate-question index: per-question cost as the index grows, and detection quality.
+
+Random questions are indexed in batches up to each size in --sizes. At every
+size a probe set is looked up: half paraphrases of indexed questions (a word
+dropped or moved), half new questions, plus as many near misses of other
+indexed questions (one word swapped for another, a negation added or a number
+put in, which make them different questions). The benchmark reports
+milliseconds per probed question, the share of paraphrases mapped to their
+original (recall), and the shares of new questions and of near misses wrongly
+matched to an existing one (false positives):
+
+    python -m benchmarks.dedup --sizes 1000 10000 100000 --skip-embeddings
+    python -m benchmarks.dedup --sizes 1000 10000
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import tempfile
+import time
+
+from question_dedup import QuestionDedupIndex
+from quiz_parser import question_id
+
+from benchmarks.run import git_commit, summarize
+from benchmarks.synthetic_pdf import VOCABULARY
+
+QUESTION_STARTS = ["What is", "Which", "How does", "Why does", "What happens when", "Which of the following describes"]
+
+
+def make_question(rng):
+    words = [rng.choice(VOCABULARY) for _ in range(rng.randint(6, 14))]
+    return f"{rng.choice(QUESTION_STARTS)} {' '.join(words)}?"
+
+
+def paraphrase(question, rng):
+    """The question with one word dropped or moved"""
+    words = question.rstrip("?").split()
+    i = rng.randrange(len(words))
+    if rng.random() < 0.5 and len(words) > 4:
+        del words[i]
+    else:
+        words.insert(rng.randrange(len(words)), words.pop(i))
+    return " ".join(words) + "?"
+
+
+def near_miss(question, rng):
+    """A different question worded almost the same: one word swapped, a negation added or a number put in"""
+    words = question.rstrip("?").split()
+    # A word the question has once, so swapping it replaces it rather than adding a word
+    i = rng.choice([i for i in range(2, len(words)) if words.count(words[i]) == 1] or [len(words) - 1])
+    edit = rng.choice(["swap", "negate", "number"])
+    if edit == "swap":
+        words[i] = rng.choice([word for word in VOCABULARY if word not in words])
+    elif edit == "negate":
+        words.insert(i, "not")
+    else:
+        words[i] = rng.choice(["part II", "type III", "1914", "1918", "42"])
+    return " ".join(words) + "?"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the duplicate-question index")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="indexed questions")
+    parser.add_argument("--probes", type=int, default=200, help="questions looked up at each size")
+    parser.add_argument("--batch", type=int, default=1000, help="questions indexed per call while filling")
+    parser.add_argument("--repeat", type=int, default=3, help="timed probe rounds per size")
+    parser.add_argument("--skip-embeddings", action="store_true", help="MinHash only")
+    parser.add_argument("--output", default="bench_results_dedup.json", help="where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        index = QuestionDedupIndex(os.path.join(tmp, "dedup.db"), use_embeddings=not args.skip_embeddings)
+        originals = []
+        for size in sorted(args.sizes):
+            while len(originals) < size:
+                batch = [{"question": make_question(rng)} for _ in range(min(args.batch, size - len(originals)))]
+                index.canonical_ids(batch)
+                originals += [q["question"] for q in batch]
+
+            timings, recalled, false_positives, near_miss_matches = [], 0, 0, 0
+            for _ in range(args.repeat):
+                # Near misses come from other questions than the paraphrases, so they can only match their original
+                picked = rng.sample(originals, 2 * (args.probes // 2))
+                sources, near_miss_sources = picked[::2], picked[1::2]
+                duplicates = [{"question": paraphrase(q, rng)} for q in sources]
+                fresh = [{"question": make_question(rng)} for _ in range(args.probes - len(duplicates))]
+                start = time.perf_counter()
+                canonical = index.canonical_ids(duplicates + fresh)
+                timings.append((time.perf_counter() - start) / args.probes)
+                expected = [index.resolve([question_id({"question": q})]).pop() for q in sources]
+                recalled += sum(c == e for c, e in zip(canonical, expected))
+                false_positives += sum(c != question_id(q) for c, q in zip(canonical[len(duplicates):], fresh))
+                misses = index.canonical_ids([{"question": near_miss(q, rng)} for q in near_miss_sources])
+                originals_of_misses = [index.resolve([question_id({"question": q})]).pop() for q in near_miss_sources]
+                near_miss_matches += sum(c == e for c, e in zip(misses, originals_of_misses))
+            result = {
+                "per_question": summarize(timings),
+                "recall": recalled / (args.repeat * len(sources)),
+                "false_positive_rate": false_positives / (args.repeat * len(fresh)),
+                "near_miss_false_positive_rate": near_miss_matches / (args.repeat * len(near_miss_sources))
+            }
+            results.append({"name": "dedup", "params": {"indexed": size, "embeddings": not args.skip_embeddings},
+                            **result})
+            print(f"{size:>8} indexed  {result['per_question']['median_s'] * 1000:7.3f} ms/question  "
+                  f"recall {result['recall']:6.1%}  false positives {result['false_positive_rate']:6.1%}  "
+                  f"near misses matched {result['near_miss_false_positive_rate']:6.1%}")
+
+    report = {
+        "metadata": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "config": vars(args)
+        },
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
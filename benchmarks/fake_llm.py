@@ -0,0 +1,86 @@
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import SimpleChatModel
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), "recordings")
+
+# Recorded deepseek-r1 responses for each question type
+RECORDING_FILES = {
+    "MCQ": "mcq.md",
+    "True/False": "true_false.md",
+    "Short Answer": "short_answer.md"
+}
+
+
+def load_recording(q_type):
+    """Load the recorded LLM response for a question type"""
+    file_name = RECORDING_FILES.get(q_type, RECORDING_FILES["MCQ"])
+    with open(os.path.join(RECORDINGS_DIR, file_name), encoding="utf-8") as f:
+        return f.read()
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English text)"""
+    return max(1, len(text) // 4)
+
+
+class FakeChatGroq(SimpleChatModel):
+    """Deterministic stand-in for ChatGroq that replays recorded responses.
+
+    The response is chosen from the question type named in the prompt, so a
+    single instance can serve MCQ, True/False and Short Answer requests. Each
+    call sleeps for `latency` seconds (time to first token) plus the time it
+    would take to stream the response at `tokens_per_second`.
+    """
+
+    responses: Dict[str, str] = {}
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    calls: int = 0
+
+    # Accepted so the fake can be constructed exactly like ChatGroq
+    temperature: float = 0.7
+    api_key: Optional[Any] = None
+    model_name: str = "fake-chat-groq"
+
+    @property
+    def _llm_type(self):
+        return "fake-chat-groq"
+
+    def _pick_response(self, prompt):
+        for q_type in ("True/False", "Short Answer", "MCQ"):
+            if q_type in prompt and q_type in self.responses:
+                return self.responses[q_type]
+        return next(iter(self.responses.values()))
+
+    def simulated_delay(self, response):
+        """Seconds a real model would take to return this response"""
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += estimate_tokens(response) / self.tokens_per_second
+        return delay
+
+    def _call(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        response = self._pick_response(prompt)
+        self.calls += 1
+        time.sleep(self.simulated_delay(response))
+        return response
+
+
+def make_fake_chat_groq(latency=0.0, tokens_per_second=0.0, responses=None):
+    """Return a ChatGroq-compatible factory that builds FakeChatGroq models"""
+    if responses is None:
+        responses = {q_type: load_recording(q_type) for q_type in RECORDING_FILES}
+
+    def factory(**kwargs):
+        return FakeChatGroq(
+            responses=responses,
+            latency=latency,
+            tokens_per_second=tokens_per_second,
+            **kwargs
+        )
+
+    return factory
@@ -0,0 +1,142 @@
+"""Text extraction for every supported upload format.
+
+The same synthetic content is written as PDF, DOCX, PPTX, HTML, Markdown and
+EPUB; each file goes through extract_text_from_document and the benchmark
+reports extraction time, throughput, how much of the content and how many
+headings survived, and the chunks split_text makes of it. HTML and EPUB are
+also opened with PyMuPDF, which lays them out as pages first, to show what
+the direct parsers save over a rendering path. With embeddings enabled the
+chunks are embedded too, for the end-to-end ingestion time:
+
+    python -m benchmarks.ingestion --pages 20 200 --formats .docx .pptx .epub
+    python -m benchmarks.ingestion --files notes/*.md slides/*.pptx --skip-embeddings
+"""
+import argparse
+import datetime
+import json
+import os
+import time
+
+import fitz  # PyMuPDF
+
+from chunking import split_text, PARAGRAPH_BREAK
+from document_ingestion import extract_text_from_document, document_extension, SUPPORTED_EXTENSIONS
+from pdf_extraction import PAGE_BREAK, HEADING_PREFIX, extract_pages
+from pdf_rag_utils import embed_chunks
+
+from benchmarks.run import git_commit, summarize
+from benchmarks.synthetic_documents import make_sections, WRITERS
+from benchmarks.synthetic_pdf import make_pdf
+
+# Formats PyMuPDF can open by laying them out as pages
+RENDERED_FORMATS = {".html": "html", ".epub": "epub"}
+
+
+def normalize(text):
+    return " ".join(text.split())
+
+
+def render_and_extract(data, filetype):
+    """The rendering path: PyMuPDF paginates the document, then its pages are extracted like a PDF"""
+    with fitz.open(stream=data, filetype=filetype) as doc:
+        pages, _ = extract_pages(doc.convert_to_pdf())
+    return PAGE_BREAK.join(pages)
+
+
+def time_repeated(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = function()
+        timings.append(time.perf_counter() - start)
+    return output, timings
+
+
+def evaluate(text, timings, size_bytes, sections, skip_embeddings):
+    paragraphs = [p for page in text.split(PAGE_BREAK) for p in page.split(PARAGRAPH_BREAK) if p.strip()]
+    result = {
+        "extract": summarize(timings),
+        "mb_per_s": size_bytes / (1024 * 1024) / max(min(timings), 1e-9),
+        "chars": len(text),
+        "pages": text.count(PAGE_BREAK) + 1,
+        "paragraphs": len(paragraphs),
+        "headings": sum(p.startswith(HEADING_PREFIX) for p in paragraphs)
+    }
+    if sections is not None:
+        # Generated paragraphs found whole in the extracted text, and headings found as headings
+        normalized = normalize(text)
+        expected = [p for _, page_paragraphs in sections for p in page_paragraphs]
+        titles = [title for title, _ in sections if title]
+        found_headings = {normalize(p[len(HEADING_PREFIX):]) for p in paragraphs if p.startswith(HEADING_PREFIX)}
+        result["paragraph_recall"] = sum(normalize(p) in normalized for p in expected) / max(len(expected), 1)
+        result["heading_recall"] = sum(title in found_headings for title in titles) / max(len(titles), 1)
+    chunks, _ = split_text(text)
+    result["chunks"] = len(chunks)
+    if not skip_embeddings and chunks:
+        start = time.perf_counter()
+        embed_chunks(chunks)
+        result["embed_s"] = time.perf_counter() - start
+        result["ingest_s"] = min(timings) + result["embed_s"]
+    return result
+
+
+def documents(args):
+    """(name, extension, bytes, generated sections or None) for every document to measure"""
+    for num_pages in args.pages:
+        sections = make_sections(num_pages, seed=args.seed)
+        for extension in args.formats:
+            data = make_pdf(num_pages, seed=args.seed) if extension == ".pdf" else WRITERS[extension](sections)
+            yield f"{num_pages}p", extension, data, sections
+    for path in args.files:
+        with open(path, "rb") as f:
+            yield os.path.basename(path), document_extension(path), f.read(), None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark text extraction per upload format")
+    parser.add_argument("--pages", type=int, nargs="*", default=[20, 200], help="synthetic document sizes in pages")
+    parser.add_argument("--formats", nargs="+", default=SUPPORTED_EXTENSIONS,
+                        choices=[".pdf", *WRITERS], help="synthetic formats to generate")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic content")
+    parser.add_argument("--files", nargs="*", default=[], help="real documents to include")
+    parser.add_argument("--repeat", type=int, default=5, help="timed extractions per document")
+    parser.add_argument("--skip-embeddings", action="store_true", help="only measure extraction and chunking")
+    parser.add_argument("--output", default="bench_results_ingestion.json", help="where to write the JSON report")
+    args = parser.parse_args(argv)
+    args.formats = list(dict.fromkeys(".md" if f == ".markdown" else ".html" if f == ".htm" else f
+                                      for f in args.formats))
+
+    results = []
+    for doc_name, extension, data, sections in documents(args):
+        paths = {"direct": lambda: extract_text_from_document(data, f"document{extension}")}
+        if extension in RENDERED_FORMATS:
+            paths["pymupdf_render"] = lambda: render_and_extract(data, RENDERED_FORMATS[extension])
+        for path_name, extract in paths.items():
+            text, timings = time_repeated(extract, args.repeat)
+            if text.startswith("Error"):
+                print(f"{doc_name} {extension}: {text}")
+                continue
+            result = evaluate(text, timings, len(data), sections, args.skip_embeddings)
+            results.append({"name": "ingestion", "params": {"document": doc_name, "format": extension,
+                                                            "path": path_name, "bytes": len(data)}, **result})
+            recall = result.get("paragraph_recall")
+            print(f"{doc_name:<20} {extension:<6} {path_name:<15} {result['extract']['min_s'] * 1000:9.1f} ms  "
+                  f"{result['mb_per_s']:8.1f} MB/s  {result['pages']:5d} pages  {result['headings']:4d} headings  "
+                  f"{result['chunks']:5d} chunks  content {'-' if recall is None else f'{recall:.1%}'}  "
+                  f"embed {result.get('embed_s', 0):6.2f}s")
+
+    report = {
+        "metadata": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "config": vars(args)
+        },
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
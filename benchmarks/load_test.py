@@ -0,0 +1,175 @@
+"""Load test for the HTTP service against a local LLM stub.
+
+Starts `quiz_api` under uvicorn with ChatGroq replaced by the recorded-response
+fake, then drives it with concurrent clients and reports throughput and
+latency percentiles per endpoint:
+
+    python -m benchmarks.load_test --concurrency 32 --requests 200 --latency 1.0
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import socket
+import statistics
+import threading
+import time
+from unittest import mock
+
+import httpx
+import uvicorn
+
+import Main
+import pdf_rag_utils
+import quiz_translation
+
+from benchmarks.fake_llm import make_fake_chat_groq
+from benchmarks.synthetic_pdf import make_pdf
+from benchmarks.run import git_commit
+
+TOPICS = ["Photosynthesis", "The French Revolution", "JavaScript closures", "Climate change",
+          "Ancient Egypt", "Linear algebra", "The immune system", "Plate tectonics"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app, port):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def summarize(name, latencies, statuses, elapsed):
+    ok = [t for t, status in zip(latencies, statuses) if status == 200]
+    codes = {}
+    for status in statuses:
+        codes[str(status)] = codes.get(str(status), 0) + 1
+    return {
+        "name": name,
+        "requests": len(latencies),
+        "status_codes": codes,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "p50_s": percentile(ok, 50) if ok else None,
+        "p95_s": percentile(ok, 95) if ok else None,
+        "max_s": max(ok) if ok else None,
+        "mean_s": statistics.fmean(ok) if ok else None
+    }
+
+
+async def drive(name, make_request, total, concurrency):
+    """Send `total` requests from `concurrency` clients; returns the endpoint summary"""
+    latencies, statuses = [], []
+    counter = iter(range(total))
+
+    async def client():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                status = (await make_request(i)).status_code
+            except httpx.HTTPError:
+                status = "connection_error"
+            latencies.append(time.perf_counter() - start)
+            statuses.append(status)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    summary = summarize(name, latencies, statuses, time.perf_counter() - start)
+    print(f"{name:<16} {summary['throughput_rps']:8.1f} req/s  p50 {summary['p50_s'] or 0:.3f}s  "
+          f"p95 {summary['p95_s'] or 0:.3f}s  {summary['status_codes']}")
+    return summary
+
+
+async def run_load(base_url, args):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as http:
+        results = []
+
+        def quiz_payload(i):
+            return {"topic": TOPICS[i % len(TOPICS)], "num_questions": 5, "use_bank": args.use_bank,
+                    "q_type": ["MCQ", "True/False", "Short Answer"][i % 3]}
+
+        results.append(await drive("generate", lambda i: http.post("/quizzes", json=quiz_payload(i)),
+                                   args.requests, args.concurrency))
+
+        quiz = (await http.post("/quizzes", json=quiz_payload(0))).json()
+        results.append(await drive(
+            "pdf_export", lambda i: http.get(f"/quizzes/{quiz['id']}/pdf", params={"show_answers": i % 2 == 0}),
+            args.requests, args.concurrency
+        ))
+
+        if not args.skip_embeddings:
+            pdfs = [make_pdf(args.pages, seed=seed) for seed in range(args.documents)]
+            results.append(await drive(
+                "rag_ingest",
+                lambda i: http.post("/documents", files={"file": (f"doc{i}.pdf", pdfs[i % len(pdfs)], "application/pdf")}),
+                args.documents * 2, args.concurrency
+            ))
+            doc_ids = [(await http.post("/documents", files={"file": ("doc.pdf", pdf, "application/pdf")})).json()["document_id"]
+                       for pdf in pdfs]
+            results.append(await drive(
+                "rag_generate",
+                lambda i: http.post(f"/documents/{doc_ids[i % len(doc_ids)]}/quizzes",
+                                    json={"topic": TOPICS[i % len(TOPICS)], "num_questions": 5}),
+                args.requests, args.concurrency
+            ))
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the quiz HTTP service")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--latency", type=float, default=1.0, help="fake LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="fake LLM output rate, 0 for instant responses")
+    parser.add_argument("--pages", type=int, default=20, help="pages per synthetic PDF")
+    parser.add_argument("--documents", type=int, default=4, help="distinct PDFs to ingest")
+    parser.add_argument("--use-bank", action="store_true", help="serve from the question bank (needs embeddings)")
+    parser.add_argument("--skip-embeddings", action="store_true", help="skip the RAG ingest and generate endpoints")
+    parser.add_argument("--output", default="bench_results_load.json", help="where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    if args.skip_embeddings:
+        os.environ["QUIZ_API_PRELOAD_EMBEDDINGS"] = "0"
+    import quiz_api
+
+    llm_factory = make_fake_chat_groq(args.latency, args.tokens_per_second)
+    with mock.patch.object(Main, "ChatGroq", llm_factory), \
+            mock.patch.object(pdf_rag_utils, "ChatGroq", llm_factory), \
+            mock.patch.object(quiz_translation, "ChatGroq", llm_factory):
+        port = free_port()
+        server, thread = start_server(quiz_api.app, port)
+        try:
+            results = asyncio.run(run_load(f"http://127.0.0.1:{port}", args))
+        finally:
+            server.should_exit = True
+            thread.join()
+
+    report = {
+        "metadata": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "config": vars(args) | {"llm_workers": quiz_api.LLM_WORKERS, "cpu_workers": quiz_api.CPU_WORKERS}
+        },
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Concurrent quiz requests through the in-process llama.cpp backend.
+
+Loads the GGUF model at GGUF_MODEL_PATH with each number of instances in turn,
+sends quiz prompts from concurrent clients through LlamaCppChat, and reports
+throughput and latency percentiles per instance count:
+
+    GGUF_MODEL_PATH=models/qwen2.5-0.5b-instruct-q4_k_m.gguf \\
+        python -m benchmarks.local_llm --instances 1 2 4 --concurrency 8 --requests 32
+"""
+import argparse
+import concurrent.futures
+import datetime
+import json
+import os
+import time
+from unittest import mock
+
+import llm_backends
+from llm_backends import LlamaCppChat
+from Main import quiz_prompt, quiz_inputs
+
+from benchmarks.load_test import TOPICS, percentile
+from benchmarks.run import git_commit
+
+
+def run_requests(llm, prompts, concurrency):
+    """Send every prompt from `concurrency` threads; returns (latencies, generated tokens, elapsed seconds)"""
+    def timed(prompt):
+        start = time.perf_counter()
+        output = llm.invoke(prompt).content
+        return time.perf_counter() - start, len(output.split())
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, prompts))
+    return [latency for latency, _ in results], sum(words for _, words in results), time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark concurrent requests on the in-process llama.cpp backend")
+    parser.add_argument("--instances", type=int, nargs="+", default=[1, 2], help="LLAMA_INSTANCES values to compare")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=16, help="requests per instance count")
+    parser.add_argument("--num-questions", type=int, default=2, help="questions asked for per quiz")
+    parser.add_argument("--max-tokens", type=int, default=256, help="generated tokens per request at most")
+    parser.add_argument("--output", default="bench_results_local_llm.json", help="where to write the JSON report")
+    args = parser.parse_args(argv)
+    if not os.getenv("GGUF_MODEL_PATH"):
+        parser.error("set GGUF_MODEL_PATH to a .gguf model file")
+
+    prompts = [quiz_prompt("MCQ").format(**quiz_inputs(TOPICS[i % len(TOPICS)], "Medium", "MCQ", "English",
+                                                        args.num_questions))
+               for i in range(args.requests)]
+    llm = LlamaCppChat(temperature=0.7, max_tokens=args.max_tokens)
+    results = []
+    for instances in args.instances:
+        with mock.patch.object(llm_backends, "LLAMA_INSTANCES", instances):
+            llm_backends.get_llama_pool.cache_clear()
+            # Load the model and warm the prefix cache so neither is counted as request latency
+            run_requests(llm, prompts[:1], 1)
+            latencies, words, elapsed = run_requests(llm, prompts, args.concurrency)
+        llm_backends.get_llama_pool.cache_clear()
+        summary = {
+            "instances": instances,
+            "requests": len(latencies),
+            "throughput_rps": len(latencies) / elapsed,
+            "output_words_per_s": words / elapsed,
+            "p50_s": percentile(latencies, 50),
+            "p95_s": percentile(latencies, 95),
+            "max_s": max(latencies)
+        }
+        results.append(summary)
+        print(f"instances {instances:<3} {summary['throughput_rps']:6.2f} req/s  {summary['output_words_per_s']:7.1f} words/s  "
+              f"p50 {summary['p50_s']:.2f}s  p95 {summary['p95_s']:.2f}s")
+
+    report = {
+        "metadata": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "config": vars(args) | {"model": os.getenv("GGUF_MODEL_PATH"), "threads": llm_backends.LLAMA_THREADS}
+        },
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Rerun latency of the Streamlit app, measured with Streamlit's AppTest harness.
+
+Seeds a session with quizzes from the recorded LLM responses, then times the
+script reruns triggered by common interactions (no LLM or embedding calls):
+
+    python -m benchmarks.rerun_latency --repeat 20 --output bench_results_rerun.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+# The app script is named streamlit.py, so the repo root must come after
+# site-packages or `import streamlit` would find the app instead of the library
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:] = [p for p in sys.path if os.path.abspath(p or ".") != REPO_ROOT] + [REPO_ROOT]
+os.environ.setdefault("QUESTION_BANK_PATH", os.path.join(tempfile.mkdtemp(), "question_bank.db"))
+os.environ.setdefault("QUIZ_ATTEMPTS_PATH", os.path.join(tempfile.mkdtemp(), "quiz_attempts.db"))
+
+from streamlit.testing.v1 import AppTest
+
+from quiz_parser import parse_quiz
+from quiz_store import get_quiz_store
+
+from benchmarks.fake_llm import RECORDING_FILES, load_recording
+from benchmarks.run import git_commit, summarize
+
+APP_PATH = os.path.join(REPO_ROOT, "streamlit.py")
+
+
+def seed_quizzes():
+    """Put one quiz per question type in the shared quiz store"""
+    store = get_quiz_store()
+    quiz_ids = []
+    for q_type in RECORDING_FILES:
+        metadata = {"topic": f"Benchmark {q_type}", "difficulty": "Medium", "language": "English",
+                    "q_type": q_type, "num_questions": 10}
+        quiz_ids.append(store.add(parse_quiz(load_recording(q_type), q_type), metadata))
+    return quiz_ids
+
+
+def new_session(quiz_ids, timeout):
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state["saved_quiz_ids"] = list(quiz_ids)
+    at.session_state["current_quiz_id"] = quiz_ids[0]
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return at
+
+
+def timed(at, interaction):
+    """Run one interaction and return the rerun's wall time"""
+    start = time.perf_counter()
+    interaction(at).run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return elapsed
+
+
+def widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Streamlit rerun latency with AppTest")
+    parser.add_argument("--repeat", type=int, default=20, help="timed reruns per interaction")
+    parser.add_argument("--timeout", type=float, default=60, help="AppTest timeout per rerun (s)")
+    parser.add_argument("--output", default="bench_results_rerun.json", help="where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    quiz_ids = seed_quizzes()
+    results = []
+
+    def record(name, timings):
+        results.append({"name": name, "params": {}, **summarize(timings)})
+        print(f"{name:<28} median {results[-1]['median_s'] * 1000:8.2f} ms")
+
+    # Full page loads in Generate mode with a quiz preview
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        new_session(quiz_ids, args.timeout)
+        timings.append(time.perf_counter() - start)
+    record("initial_run", timings)
+
+    # Switching the PDF export radio in the preview
+    at = new_session(quiz_ids, args.timeout)
+    choices = ["Quiz with Answers", "Quiz Only"]
+    record("pdf_options_radio", [
+        timed(at, lambda at, i=i: widget(at.radio, "Choose PDF Content:").set_value(choices[i % 2]))
+        for i in range(args.repeat)
+    ])
+
+    # Rerun without any widget change (e.g. a button that only updates state)
+    record("plain_rerun", [timed(at, lambda at: at) for _ in range(args.repeat)])
+
+    # Entering Play mode, then switching between saved quizzes
+    at = new_session(quiz_ids, args.timeout)
+    record("enter_play_mode", [timed(at, lambda at: widget(at.button, "Take This Quiz Now").click())])
+    record("play_quiz_select", [
+        timed(at, lambda at, i=i: widget(at.selectbox, "Choose a quiz to play:").set_value(i % 2))
+        for i in range(args.repeat)
+    ])
+
+    # Submitting answers to the play form
+    at.run()
+    record("play_submit", [
+        timed(at, lambda at: widget(at.button, "Submit Quiz").click())
+        for _ in range(args.repeat)
+    ])
+
+    report = {
+        "metadata": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "config": vars(args)
+        },
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
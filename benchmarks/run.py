@@ -0,0 +1,246 @@
+"""End-to-end benchmark suite for the quiz engine.
+
+Runs every stage of the pipeline against a deterministic local stand-in for
+ChatGroq and synthetic PDFs, then writes machine-readable JSON so results can
+be compared across commits:
+
+    python -m benchmarks.run --output bench_results.json
+    python -m benchmarks.run --pages 10 100 --compare bench_results.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import Main
+import pdf_rag_utils
+import question_bank
+from Main import generate_quiz
+from pdf_rag_utils import extract_text_from_pdf, create_vector_store, generate_rag_quiz
+from pdf_utils import get_pdf_download_link
+from quiz_parser import parse_quiz
+from question_bank import QuestionBank
+from question_dedup import QuestionDedupIndex
+from quiz_analytics import QuizAnalytics
+from semantic_cache import SemanticCache
+
+from benchmarks.fake_llm import RECORDING_FILES, load_recording, make_fake_chat_groq
+from benchmarks.synthetic_pdf import make_pdf
+
+Q_TYPES = list(RECORDING_FILES)
+
+# Topic requests that should share one cached quiz, followed by unrelated topics
+CACHE_WORKLOAD = [
+    "Photosynthesis", "photosynthesis basics", "How plants make food", "Photosynthesis in plants",
+    "The French Revolution", "french revolution", "Causes of the French Revolution",
+    "JavaScript closures", "Closures in JavaScript", "Climate change", "Global warming and climate change"
+]
+
+
+def time_call(fn, repeat):
+    """Call fn `repeat` times and return (timings in seconds, last result)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def summarize(timings):
+    return {
+        "repeat": len(timings),
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.fmean(timings),
+        "max_s": max(timings)
+    }
+
+
+def check_output(name, output):
+    if isinstance(output, str) and output.startswith("Error"):
+        raise RuntimeError(f"{name} failed: {output}")
+    return output
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkSuite:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+        self.vector_stores = {}
+
+    def record(self, name, params, timings, **extra):
+        entry = {"name": name, "params": params, **summarize(timings), **extra}
+        self.results.append(entry)
+        print(f"{name:<28} {json.dumps(params):<48} median {entry['median_s'] * 1000:10.2f} ms")
+
+    def bench_generate_quiz(self):
+        for q_type in Q_TYPES:
+            timings, output = time_call(
+                lambda: check_output("generate_quiz", generate_quiz("Photosynthesis", "Medium", q_type, "English", 10)),
+                self.args.repeat
+            )
+            simulated = self.llm_factory().simulated_delay(output)
+            self.record("generate_quiz", {"q_type": q_type}, timings, simulated_llm_s=simulated)
+
+    def bench_parser(self):
+        for q_type in Q_TYPES:
+            raw_output = load_recording(q_type)
+            iterations = self.args.parser_iterations
+            timings, questions = time_call(
+                lambda: [parse_quiz(raw_output, q_type) for _ in range(iterations)][-1],
+                self.args.repeat
+            )
+            self.record("parse_quiz", {"q_type": q_type, "iterations": iterations}, timings,
+                        per_call_s=statistics.median(timings) / iterations, questions=len(questions))
+
+    def bench_semantic_cache(self):
+        if self.args.skip_embeddings:
+            return
+        cache = SemanticCache()
+        # Warm up the embedding model so its load time is not counted as lookup latency
+        cache._embed("warm up")
+        timings = []
+        # A fresh bank, so cache hits and misses do not depend on earlier runs
+        with tempfile.TemporaryDirectory() as tmp:
+            dedup = QuestionDedupIndex(os.path.join(tmp, "question_dedup.db"))
+            analytics = QuizAnalytics(os.path.join(tmp, "quiz_attempts.db"))
+            bank = QuestionBank(os.path.join(tmp, "question_bank.db"))
+            with mock.patch.object(question_bank, "get_semantic_cache", lambda: cache), \
+                    mock.patch.object(question_bank, "get_question_dedup", lambda: dedup), \
+                    mock.patch.object(question_bank, "get_quiz_analytics", lambda: analytics):
+                for topic in CACHE_WORKLOAD:
+                    start = time.perf_counter()
+                    result = bank.assemble_quiz(topic, "Medium", "MCQ", "English", 10)
+                    timings.append(time.perf_counter() - start)
+                    if result["error"]:
+                        raise RuntimeError(f"assemble_quiz failed: {result['error']}")
+        self.record("semantic_cache", {"requests": len(CACHE_WORKLOAD)}, timings, **cache.stats())
+
+    def bench_pdf_pipeline(self):
+        for num_pages in self.args.pages:
+            pdf_bytes = make_pdf(num_pages)
+            timings, text = time_call(
+                lambda: check_output("extract_text_from_pdf", extract_text_from_pdf(pdf_bytes)),
+                self.args.repeat
+            )
+            self.record("extract_text_from_pdf", {"pages": num_pages}, timings,
+                        pdf_bytes=len(pdf_bytes), text_chars=len(text))
+
+            if self.args.skip_embeddings:
+                continue
+            # Embedding is slow, so large documents are only indexed once
+            repeat = self.args.repeat if num_pages <= 100 else 1
+            timings, vector_store = time_call(lambda: create_vector_store(text), repeat)
+            if vector_store is None:
+                raise RuntimeError("create_vector_store failed")
+            self.record("create_vector_store", {"pages": num_pages}, timings,
+                        chunks=vector_store.index.ntotal)
+            self.vector_stores[num_pages] = vector_store
+
+    def bench_rag_quiz(self):
+        for num_pages, vector_store in sorted(self.vector_stores.items()):
+            timings, _ = time_call(
+                lambda: check_output("generate_rag_quiz", generate_rag_quiz(
+                    "photosynthesis", "Medium", "MCQ", vector_store, "English", 10)),
+                self.args.repeat
+            )
+            self.record("generate_rag_quiz", {"pages": num_pages}, timings)
+
+    def bench_pdf_export(self):
+        for q_type in Q_TYPES:
+            quiz_data = parse_quiz(load_recording(q_type), q_type)
+            for show_answers in (False, True):
+                timings, pdf_data = time_call(
+                    lambda: get_pdf_download_link(quiz_data, "Photosynthesis", "Medium", "English",
+                                                  show_answers=show_answers),
+                    self.args.repeat
+                )
+                self.record("get_pdf_download_link", {"q_type": q_type, "show_answers": show_answers},
+                            timings, pdf_bytes=len(pdf_data))
+
+    def run(self):
+        self.llm_factory = make_fake_chat_groq(self.args.latency, self.args.tokens_per_second)
+        with mock.patch.object(Main, "ChatGroq", self.llm_factory), \
+                mock.patch.object(pdf_rag_utils, "ChatGroq", self.llm_factory):
+            self.bench_parser()
+            self.bench_generate_quiz()
+            self.bench_semantic_cache()
+            self.bench_pdf_pipeline()
+            self.bench_rag_quiz()
+            self.bench_pdf_export()
+        return {
+            "metadata": {
+                "commit": git_commit(),
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "config": {
+                    "repeat": self.args.repeat,
+                    "pages": self.args.pages,
+                    "latency_s": self.args.latency,
+                    "tokens_per_second": self.args.tokens_per_second,
+                    "skip_embeddings": self.args.skip_embeddings
+                }
+            },
+            "results": self.results
+        }
+
+
+def result_key(entry):
+    return entry["name"], json.dumps(entry["params"], sort_keys=True)
+
+
+def compare(report, baseline_path):
+    """Print the median time of each benchmark relative to a previous report"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {result_key(entry): entry for entry in json.load(f)["results"]}
+    print(f"\nComparison against {baseline_path}:")
+    for entry in report["results"]:
+        previous = baseline.get(result_key(entry))
+        if previous is None or not previous["median_s"]:
+            continue
+        ratio = entry["median_s"] / previous["median_s"]
+        print(f"{entry['name']:<28} {json.dumps(entry['params']):<48} {ratio:6.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the quiz generation pipeline")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000],
+                        help="synthetic PDF sizes to benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--parser-iterations", type=int, default=200, help="parse calls per timed run")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="fake LLM output rate, 0 for instant responses")
+    parser.add_argument("--skip-embeddings", action="store_true", help="skip create_vector_store and RAG runs")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON report")
+    parser.add_argument("--compare", help="previous JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    report = BenchmarkSuite(args).run()
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(report['results'])} results to {args.output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
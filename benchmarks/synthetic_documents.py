@@ -0,0 +1,142 @@
+import io
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+from benchmarks.synthetic_pdf import make_paragraph, SECTION_TITLES
+
+W_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+A_NAMESPACE = "http://schemas.openxmlformats.org/drawingml/2006/main"
+P_NAMESPACE = "http://schemas.openxmlformats.org/presentationml/2006/main"
+R_NAMESPACE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_RELS = "http://schemas.openxmlformats.org/package/2006/relationships"
+OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+
+def make_sections(num_pages, seed=0, paragraphs_per_page=4, sentences_per_paragraph=(3, 6), pages_per_section=1):
+    """Deterministic content laid out like make_pdf: a (heading or None, paragraphs) pair per page"""
+    rng = random.Random(seed)
+    pages = []
+    for page_number in range(num_pages):
+        title = None
+        if page_number % pages_per_section == 0:
+            section = page_number // pages_per_section
+            title = f"{section + 1}. {SECTION_TITLES[section % len(SECTION_TITLES)]}"
+        pages.append((title, [make_paragraph(rng, sentences_per_paragraph) for _ in range(paragraphs_per_page)]))
+    return pages
+
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            # EPUB readers expect the mimetype first and uncompressed
+            archive.writestr(name, content, zipfile.ZIP_STORED if name == "mimetype" else zipfile.ZIP_DEFLATED)
+    return buffer.getvalue()
+
+
+def make_docx(pages):
+    """Minimal Word document: Heading1 paragraphs and page breaks between pages"""
+    body = []
+    for number, (title, paragraphs) in enumerate(pages):
+        page_break = '<w:r><w:br w:type="page"/></w:r>' if number else ""
+        if title:
+            body.append(f'<w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr>{page_break}'
+                        f'<w:r><w:t>{escape(title)}</w:t></w:r></w:p>')
+            page_break = ""
+        for paragraph in paragraphs:
+            body.append(f"<w:p>{page_break}<w:r><w:t>{escape(paragraph)}</w:t></w:r></w:p>")
+            page_break = ""
+    return zip_bytes({
+        "[Content_Types].xml": (
+            '<?xml version="1.0" encoding="UTF-8"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>'),
+        "_rels/.rels": (
+            f'<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="{PACKAGE_RELS}">'
+            f'<Relationship Id="rId1" Type="{OFFICE_DOCUMENT}" Target="word/document.xml"/></Relationships>'),
+        "word/document.xml": (
+            f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{W_NAMESPACE}"><w:body>'
+            f'{"".join(body)}</w:body></w:document>')
+    })
+
+
+def make_pptx(pages):
+    """Minimal PowerPoint deck: one slide per page, the heading in the title placeholder"""
+    members, slide_ids, slide_rels = {}, [], []
+    for number, (title, paragraphs) in enumerate(pages, start=1):
+        shapes = []
+        if title:
+            shapes.append(f'<p:sp><p:nvSpPr><p:cNvPr id="2" name="Title"/><p:cNvSpPr/><p:nvPr><p:ph type="title"/>'
+                          f'</p:nvPr></p:nvSpPr><p:txBody><a:p><a:r><a:t>{escape(title)}</a:t></a:r></a:p></p:txBody></p:sp>')
+        text = "".join(f"<a:p><a:r><a:t>{escape(paragraph)}</a:t></a:r></a:p>" for paragraph in paragraphs)
+        shapes.append(f'<p:sp><p:nvSpPr><p:cNvPr id="3" name="Body"/><p:cNvSpPr/><p:nvPr><p:ph idx="1"/></p:nvPr>'
+                      f'</p:nvSpPr><p:txBody>{text}</p:txBody></p:sp>')
+        members[f"ppt/slides/slide{number}.xml"] = (
+            f'<?xml version="1.0" encoding="UTF-8"?><p:sld xmlns:a="{A_NAMESPACE}" xmlns:p="{P_NAMESPACE}">'
+            f'<p:cSld><p:spTree>{"".join(shapes)}</p:spTree></p:cSld></p:sld>')
+        slide_ids.append(f'<p:sldId id="{255 + number}" r:id="rId{number}"/>')
+        slide_rels.append(f'<Relationship Id="rId{number}" Target="slides/slide{number}.xml" '
+                          f'Type="{R_NAMESPACE}/slide"/>')
+    members["ppt/presentation.xml"] = (
+        f'<?xml version="1.0" encoding="UTF-8"?><p:presentation xmlns:p="{P_NAMESPACE}" xmlns:r="{R_NAMESPACE}">'
+        f'<p:sldIdLst>{"".join(slide_ids)}</p:sldIdLst></p:presentation>')
+    members["ppt/_rels/presentation.xml.rels"] = (
+        f'<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="{PACKAGE_RELS}">{"".join(slide_rels)}</Relationships>')
+    members["_rels/.rels"] = (
+        f'<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="{PACKAGE_RELS}">'
+        f'<Relationship Id="rId1" Type="{OFFICE_DOCUMENT}" Target="ppt/presentation.xml"/></Relationships>')
+    return zip_bytes(members)
+
+
+def html_body(pages):
+    parts = []
+    for title, paragraphs in pages:
+        if title:
+            parts.append(f"<h2>{escape(title)}</h2>")
+        parts += [f"<p>{escape(paragraph)}</p>" for paragraph in paragraphs]
+    return "\n".join(parts)
+
+
+def make_html(pages):
+    return (f"<!DOCTYPE html><html><head><title>Sample</title><style>p {{ margin: 0 }}</style></head>"
+            f"<body><nav><a href='#'>Home</a></nav>\n{html_body(pages)}\n</body></html>").encode("utf-8")
+
+
+def make_markdown(pages):
+    parts = []
+    for title, paragraphs in pages:
+        if title:
+            parts.append(f"## {title}")
+        parts += paragraphs
+    return "\n\n".join(parts).encode("utf-8")
+
+
+def make_epub(pages, pages_per_chapter=5):
+    """Minimal EPUB: chapters of `pages_per_chapter` pages in the spine"""
+    chapters = [pages[i:i + pages_per_chapter] for i in range(0, len(pages), pages_per_chapter)]
+    members = {
+        "mimetype": "application/epub+zip",
+        "META-INF/container.xml": (
+            '<?xml version="1.0"?><container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+            '</rootfiles></container>')
+    }
+    manifest, spine = [], []
+    for number, chapter in enumerate(chapters, start=1):
+        members[f"OEBPS/chapter{number}.xhtml"] = (
+            f'<?xml version="1.0" encoding="UTF-8"?><html xmlns="http://www.w3.org/1999/xhtml">'
+            f'<head><title>Chapter {number}</title></head><body>{html_body(chapter)}</body></html>')
+        manifest.append(f'<item id="c{number}" href="chapter{number}.xhtml" media-type="application/xhtml+xml"/>')
+        spine.append(f'<itemref idref="c{number}"/>')
+    members["OEBPS/content.opf"] = (
+        '<?xml version="1.0" encoding="UTF-8"?><package xmlns="http://www.idpf.org/2007/opf" version="3.0" '
+        'unique-identifier="id"><metadata xmlns:dc="http://purl.org/dc/elements/1.1/"><dc:identifier id="id">sample'
+        '</dc:identifier><dc:title>Sample</dc:title><dc:language>en</dc:language></metadata>'
+        f'<manifest>{"".join(manifest)}</manifest><spine>{"".join(spine)}</spine></package>')
+    return zip_bytes(members)
+
+
+WRITERS = {".docx": make_docx, ".pptx": make_pptx, ".html": make_html, ".md": make_markdown, ".epub": make_epub}
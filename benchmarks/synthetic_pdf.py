@@ -0,0 +1,45 @@
+import random
+
+import fitz  # PyMuPDF
+
+# Small vocabulary so generated pages look like (boring) prose and chunk realistically
+VOCABULARY = (
+    "photosynthesis chlorophyll energy light cell membrane protein enzyme reaction carbon "
+    "oxygen water glucose plant leaf root stem structure process cycle molecule electron "
+    "system function growth temperature climate region population history empire trade "
+    "river city culture language economy market science method data model theory result"
+).split()
+
+SECTION_TITLES = [
+    "Introduction", "Background", "Core Concepts", "Mechanisms", "Applications",
+    "Case Studies", "Historical Context", "Experimental Methods", "Discussion", "Summary"
+]
+
+
+def make_sentence(rng):
+    words = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 18))]
+    return " ".join(words).capitalize() + "."
+
+
+def make_paragraph(rng, sentences=(3, 6)):
+    return " ".join(make_sentence(rng) for _ in range(rng.randint(*sentences)))
+
+
+def make_pdf(num_pages, seed=0, paragraphs_per_page=4, sentences_per_paragraph=(3, 6), pages_per_section=1):
+    """Build a deterministic text PDF with a heading every `pages_per_section` pages and return its bytes"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    try:
+        for page_number in range(num_pages):
+            page = doc.new_page()
+            top = 72
+            if page_number % pages_per_section == 0:
+                section = page_number // pages_per_section
+                title = SECTION_TITLES[section % len(SECTION_TITLES)]
+                page.insert_text((72, 72), f"{section + 1}. {title}", fontsize=16)
+                top = 96
+            body = "\n\n".join(make_paragraph(rng, sentences_per_paragraph) for _ in range(paragraphs_per_page))
+            page.insert_textbox(fitz.Rect(72, top, page.rect.width - 72, page.rect.height - 72), body, fontsize=10)
+        return doc.tobytes()
+    finally:
+        doc.close()
@@ -0,0 +1,112 @@
+import re
+from pdf_extraction import PAGE_BREAK, HEADING_PREFIX
+
+# Chunks are filled with whole paragraphs up to the target size; a section's
+# chunks only go below the minimum when the section itself is that short
+TARGET_CHUNK_CHARS = 1000
+MIN_CHUNK_CHARS = 300
+MAX_CHUNK_CHARS = 1500
+# Sentences repeated at the start of the next piece when a long paragraph has to be split
+OVERLAP_SENTENCES = 1
+
+PARAGRAPH_BREAK = "\n\n"
+SENTENCE_END_RE = re.compile(r"(?<=[.!?。！？])\s+")
+# A paragraph that stops without closing punctuation continues on the next page
+OPEN_ENDING_RE = re.compile(r"[^.!?:。！？)\"'”]\s*$")
+
+
+def paragraphs(pdf_text):
+    """(text, first page, last page, is_heading) per paragraph, rejoining paragraphs broken by a page turn"""
+    result = []
+    for page_number, page_text in enumerate(pdf_text.split(PAGE_BREAK), start=1):
+        for n, paragraph in enumerate(p.strip() for p in page_text.split(PARAGRAPH_BREAK)):
+            if not paragraph:
+                continue
+            is_heading = paragraph.startswith(HEADING_PREFIX)
+            continues = (n == 0 and not is_heading and result and not result[-1][3]
+                         and OPEN_ENDING_RE.search(result[-1][0]) and paragraph[:1].islower())
+            if continues:
+                text, first_page, _, _ = result[-1]
+                result[-1] = (f"{text} {paragraph}", first_page, page_number, False)
+            else:
+                result.append((paragraph, page_number, page_number, is_heading))
+    return result
+
+
+def split_sentences(paragraph, max_chars=TARGET_CHUNK_CHARS):
+    """Pieces of a long paragraph cut at sentence ends, each starting with the previous piece's last sentence"""
+    sentences = []
+    for sentence in SENTENCE_END_RE.split(paragraph):
+        # Sentences longer than a chunk (tables, run-on text) are cut at spaces
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            sentences.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            sentences.append(sentence)
+    pieces, current = [], []
+    for sentence in sentences:
+        if current and len(" ".join(current + [sentence])) > max_chars:
+            pieces.append(" ".join(current))
+            current = current[-OVERLAP_SENTENCES:] if OVERLAP_SENTENCES else []
+            if len(" ".join(current + [sentence])) > max_chars:
+                current = []
+        current.append(sentence)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def split_text(pdf_text, target_chars=TARGET_CHUNK_CHARS, min_chars=MIN_CHUNK_CHARS, max_chars=MAX_CHUNK_CHARS):
+    """Split extracted PDF text into chunks that follow the document's structure.
+
+    Chunks hold whole paragraphs of one section, so a heading always starts
+    a new chunk and definitions are not cut mid-sentence. Paragraphs are
+    added while the chunk stays under `target_chars`; a chunk that is still
+    shorter than `min_chars` may grow to `max_chars`. Only paragraphs longer
+    than that are split, at sentence ends, and only they overlap.
+
+    Returns the chunks and their metadata: the 1-based first and last page,
+    the section heading and the chunk's position in the section.
+    """
+    chunks, metadatas = [], []
+    current, section, section_chunk, first_page, last_page = [], "", 0, 1, 1
+
+    def flush():
+        nonlocal section_chunk
+        if current:
+            chunks.append(PARAGRAPH_BREAK.join(current))
+            metadatas.append({"page": first_page, "page_end": last_page, "section": section,
+                              "section_chunk": section_chunk})
+            section_chunk += 1
+            current.clear()
+
+    for text, start_page, end_page, is_heading in paragraphs(pdf_text):
+        if is_heading:
+            # Consecutive headings stay together with the first paragraph that follows them
+            if any(not part.startswith(HEADING_PREFIX) for part in current):
+                flush()
+            if not current:
+                section_chunk = 0
+            section = text[len(HEADING_PREFIX):]
+        size = sum(len(part) for part in current) + len(PARAGRAPH_BREAK) * len(current)
+        limit = max_chars if size < min_chars else target_chars
+        # A short chunk is kept for the first piece of an oversized paragraph rather than left on its own
+        if current and size + len(text) > limit and (size >= min_chars or len(text) <= max_chars):
+            flush()
+            size = 0
+        if not current:
+            first_page = start_page
+        last_page = end_page
+        if len(text) <= max_chars - size:
+            current.append(text)
+            continue
+        # Oversized paragraph: cut at sentence ends, the pieces become chunks of their own
+        pieces = split_sentences(text, target_chars)
+        current.append(pieces[0])
+        for piece in pieces[1:]:
+            flush()
+            current.append(piece)
+    flush()
+    return chunks, metadatas
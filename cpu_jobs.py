@@ -0,0 +1,212 @@
+import os
+import queue
+import ctypes
+import functools
+import itertools
+import threading
+import collections
+import multiprocessing
+import concurrent.futures
+
+# Worker processes for CPU-heavy jobs; 0 runs jobs on a thread in this process (handy for debugging)
+CPU_JOB_WORKERS = int(os.getenv("CPU_JOB_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Jobs that can be queued or running at once; each needs a cancellation slot in shared memory
+MAX_ACTIVE_JOBS = 256
+# Finished jobs kept around so sessions can collect their results
+MAX_FINISHED_JOBS = 64
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled"""
+
+
+# Worker-side state, set by the pool initializer
+_progress_queue = None
+_cancel_flags = None
+_current_job = threading.local()
+
+
+def _init_worker(progress_queue, cancel_flags):
+    global _progress_queue, _cancel_flags
+    _progress_queue = progress_queue
+    _cancel_flags = cancel_flags
+
+
+def report_progress(done, total):
+    """Report a running job's progress; raises JobCancelled if the job was cancelled"""
+    job = getattr(_current_job, "value", None)
+    if job is None:
+        return
+    job_id, slot = job
+    _progress_queue.put((job_id, done, total))
+    if _cancel_flags[slot]:
+        raise JobCancelled()
+
+
+def _run_job(job_id, slot, fn, args, kwargs):
+    if _cancel_flags[slot]:
+        raise JobCancelled()
+    _current_job.value = (job_id, slot)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _current_job.value = None
+
+
+class Job:
+    """Handle for a job running in the CPU pool"""
+
+    def __init__(self, job_id, slot, cancel_flags, future, finalize=None):
+        self.id = job_id
+        self.slot = slot
+        self.cancel_flags = cancel_flags
+        self.future = future
+        self.done_count = 0
+        self.total = 0
+        self.callbacks = []
+        self._finalize = finalize
+        self._finalized = False
+        self._result = None
+        self._lock = threading.Lock()
+
+    @property
+    def fraction(self):
+        """Share of the work done, as last reported by the worker"""
+        if self.future.done():
+            return 1.0
+        return self.done_count / self.total if self.total else 0.0
+
+    def add_progress_callback(self, callback):
+        """Call `callback(done, total)` on every progress report"""
+        self.callbacks.append(callback)
+
+    def done(self):
+        return self.future.done()
+
+    def cancelled(self):
+        if self.future.cancelled():
+            return True
+        return self.future.done() and isinstance(self.future.exception(), JobCancelled)
+
+    def cancel(self):
+        """Cancel the job; a running job stops at its next progress report"""
+        # A finished job's slot may already belong to another job
+        if not self.future.done() and not self.future.cancel():
+            self.cancel_flags[self.slot] = 1
+
+    def result(self, timeout=None):
+        """The job's result, passed through `finalize` (in this process) the first time"""
+        try:
+            raw = self.future.result(timeout)
+        except JobCancelled:
+            raise concurrent.futures.CancelledError()
+        with self._lock:
+            if not self._finalized:
+                self._result = self._finalize(raw) if self._finalize else raw
+                self._finalize = None
+                self._finalized = True
+            return self._result
+
+
+class JobManager:
+    """Process pool for CPU-bound work, with progress reports and cancellation.
+
+    Jobs run in worker processes so they don't hold the GIL of the process
+    serving the UI. Results come back pickled, so they should be compact
+    buffers such as numpy arrays or bytes.
+    """
+
+    def __init__(self, workers=CPU_JOB_WORKERS):
+        self.workers = workers
+        # Forking a process with running threads is unsafe; spawn starts clean workers
+        context = multiprocessing.get_context("spawn")
+        self.progress_queue = context.Queue() if workers > 0 else queue.SimpleQueue()
+        self.cancel_flags = context.RawArray(ctypes.c_byte, MAX_ACTIVE_JOBS)
+        self.free_slots = collections.deque(range(MAX_ACTIVE_JOBS))
+        self.jobs = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self._executor = None
+        threading.Thread(target=self._read_progress, name="cpu-jobs-progress", daemon=True).start()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            initargs = (self.progress_queue, self.cancel_flags)
+            if self.workers > 0:
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker, initargs=initargs
+                )
+            else:
+                _init_worker(*initargs)
+                self._executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="cpu-job")
+        return self._executor
+
+    def _read_progress(self):
+        while True:
+            try:
+                job_id, done, total = self.progress_queue.get()
+            except (EOFError, OSError):
+                # The queue is closed when the interpreter shuts down
+                return
+            with self.lock:
+                job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            job.done_count, job.total = done, total
+            for callback in job.callbacks:
+                try:
+                    callback(done, total)
+                except Exception as e:
+                    print(f"Error in job progress callback: {str(e)}")
+
+    def submit(self, fn, *args, finalize=None, **kwargs):
+        """Run `fn(*args, **kwargs)` in the pool and return its Job.
+
+        `fn` must be importable by the workers. It can call
+        `report_progress(done, total)` to report progress and notice
+        cancellation. `finalize(result)` runs in this process the first time
+        the result is collected, e.g. to wrap raw vectors in an index.
+        """
+        with self.lock:
+            if not self.free_slots:
+                raise RuntimeError("Too many background jobs, please try again shortly")
+            slot = self.free_slots.popleft()
+            job_id = next(self.ids)
+        self.cancel_flags[slot] = 0
+        future = self.executor.submit(_run_job, job_id, slot, fn, args, kwargs)
+        job = Job(job_id, slot, self.cancel_flags, future, finalize)
+        with self.lock:
+            self.jobs[job_id] = job
+            self._evict_finished()
+        future.add_done_callback(lambda _: self._release(job))
+        return job
+
+    def _release(self, job):
+        with self.lock:
+            self.free_slots.append(job.slot)
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done()]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        """The job with this ID, or None if it is unknown or was evicted"""
+        with self.lock:
+            return self.jobs.get(job_id)
+
+
+@functools.lru_cache(maxsize=1)
+def get_job_manager():
+    """CPU job pool shared by all sessions; created on first use, never in the workers themselves"""
+    return JobManager()
+
+
+def submit_job(fn, *args, finalize=None, **kwargs):
+    return get_job_manager().submit(fn, *args, finalize=finalize, **kwargs)
+
+
+def get_job(job_id):
+    return None if job_id is None else get_job_manager().get(job_id)
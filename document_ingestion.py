@@ -0,0 +1,285 @@
+import io
+import os
+import re
+import zipfile
+import posixpath
+import urllib.parse
+import html.parser
+import xml.etree.ElementTree as ET
+from pdf_extraction import PAGE_BREAK, HEADING_PREFIX
+from chunking import PARAGRAPH_BREAK
+from pdf_rag_utils import extract_text_from_pdf
+
+# Archive members (slides, chapters, document.xml) larger than this are refused, so a zip bomb can't exhaust memory
+MAX_MEMBER_BYTES = 200 * 1024 * 1024
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P_NS = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+OPF_NS = "{http://www.idpf.org/2007/opf}"
+CONTAINER_NS = "{urn:oasis:names:tc:opendocument:xmlns:container}"
+
+SLIDE_TITLE_TYPES = {"title", "ctrTitle"}
+HTML_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+HTML_BLOCKS = {"p", "div", "li", "dt", "dd", "td", "th", "tr", "blockquote", "pre", "section", "article",
+               "figcaption", "caption", "hr", "table", "ul", "ol", "main", "header", "footer", "aside"}
+HTML_SKIPPED = {"script", "style", "noscript", "template", "svg", "head", "nav"}
+
+MD_HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s+(.*?)\s*#*\s*$")
+MD_SETEXT_RE = re.compile(r"^\s{0,3}(=+|-+)\s*$")
+MD_FENCE_RE = re.compile(r"^\s{0,3}(```|~~~)")
+MD_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+MD_LINK_RE = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+MD_EMPHASIS_RE = re.compile(r"\*\*|__|`|(?<!\w)[*_](?=\S)|(?<=\S)[*_](?!\w)")
+
+
+def open_source(source):
+    """A binary file object for a file path or bytes"""
+    return open(source, "rb") if isinstance(source, (str, os.PathLike)) else io.BytesIO(source)
+
+
+def read_text(data):
+    for encoding in ("utf-8-sig", "cp1252"):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode("latin-1")
+
+
+def read_member(archive, name):
+    """Bytes of an archive member, refusing members that would unpack too large"""
+    if archive.getinfo(name).file_size > MAX_MEMBER_BYTES:
+        raise ValueError(f"{name} is larger than {MAX_MEMBER_BYTES // (1024 * 1024)} MB uncompressed")
+    return archive.read(name)
+
+
+def member_path(base, href):
+    """Archive path of a link relative to the member `base`"""
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), urllib.parse.unquote(href.split("#")[0])))
+
+
+def heading(text):
+    return HEADING_PREFIX + " ".join(text.split())
+
+
+def extract_docx(source):
+    """Pages of a Word document, streamed paragraph by paragraph from word/document.xml.
+
+    Paragraphs styled Title or Heading N become headings; pages follow the
+    page breaks Word recorded when it last laid out the document.
+    """
+    pages, paragraphs = [], []
+    with open_source(source) as f, zipfile.ZipFile(f) as archive:
+        if archive.getinfo("word/document.xml").file_size > MAX_MEMBER_BYTES:
+            raise ValueError("word/document.xml is too large")
+        with archive.open("word/document.xml") as document:
+            for _, element in ET.iterparse(document):
+                if element.tag != W_NS + "p":
+                    continue
+                parts, new_page = [], False
+                for node in element.iter():
+                    if node.tag == W_NS + "t" and node.text:
+                        parts.append(node.text)
+                    elif node.tag == W_NS + "tab":
+                        parts.append("\t")
+                    elif node.tag == W_NS + "lastRenderedPageBreak" or (
+                            node.tag == W_NS + "br" and node.get(W_NS + "type") == "page"):
+                        new_page = True
+                if new_page and paragraphs:
+                    pages.append(PARAGRAPH_BREAK.join(paragraphs))
+                    paragraphs = []
+                text = "".join(parts).strip()
+                style = element.find(f"{W_NS}pPr/{W_NS}pStyle")
+                style = style.get(W_NS + "val", "").lower() if style is not None else ""
+                if text:
+                    paragraphs.append(heading(text) if style.startswith(("heading", "title")) else text)
+                # Paragraphs are handled as they close, so the parsed tree never holds the whole document
+                element.clear()
+    pages.append(PARAGRAPH_BREAK.join(paragraphs))
+    return pages
+
+
+def slide_order(archive):
+    """Slide members in presentation order"""
+    try:
+        rels = ET.fromstring(read_member(archive, "ppt/_rels/presentation.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(REL_NS + "Relationship")}
+        presentation = ET.fromstring(read_member(archive, "ppt/presentation.xml"))
+        return [member_path("ppt/presentation.xml", targets[slide.get(R_NS + "id")])
+                for slide in presentation.iter(P_NS + "sldId")]
+    except (KeyError, ET.ParseError):
+        # Fall back to the slide numbers in the file names
+        names = [name for name in archive.namelist() if re.fullmatch(r"ppt/slides/slide\d+\.xml", name)]
+        return sorted(names, key=lambda name: int(re.search(r"\d+", posixpath.basename(name)).group()))
+
+
+def extract_pptx(source):
+    """Pages of a PowerPoint deck, one per slide, with slide titles as headings"""
+    pages = []
+    with open_source(source) as f, zipfile.ZipFile(f) as archive:
+        for name in slide_order(archive):
+            slide = ET.fromstring(read_member(archive, name))
+            paragraphs = []
+            for shape in slide.iter(P_NS + "sp"):
+                placeholder = shape.find(f"{P_NS}nvSpPr/{P_NS}nvPr/{P_NS}ph")
+                is_title = placeholder is not None and placeholder.get("type") in SLIDE_TITLE_TYPES
+                for paragraph in shape.iter(A_NS + "p"):
+                    text = "".join(run.text or "" for run in paragraph.iter(A_NS + "t")).strip()
+                    if text:
+                        paragraphs.append(heading(text) if is_title else text)
+            pages.append(PARAGRAPH_BREAK.join(paragraphs))
+    return pages
+
+
+class HTMLTextParser(html.parser.HTMLParser):
+    """Collects paragraphs of an HTML page; h1-h6 become headings, scripts and navigation are skipped"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.paragraphs = []
+        self.parts = []
+        self.skipping = 0
+        self.in_heading = False
+        self.preformatted = 0
+
+    def flush(self):
+        text = "".join(self.parts)
+        text = text.strip("\n") if self.preformatted else " ".join(text.split())
+        if text:
+            self.paragraphs.append(heading(text) if self.in_heading else text)
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in HTML_SKIPPED:
+            self.skipping += 1
+        elif tag in HTML_HEADINGS or tag in HTML_BLOCKS:
+            self.flush()
+            self.in_heading = tag in HTML_HEADINGS
+            self.preformatted += tag == "pre"
+
+    def handle_endtag(self, tag):
+        if tag in HTML_SKIPPED:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in HTML_HEADINGS or tag in HTML_BLOCKS:
+            self.flush()
+            self.in_heading = False
+            self.preformatted = max(0, self.preformatted - (tag == "pre"))
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+
+def html_paragraphs(markup):
+    parser = HTMLTextParser()
+    parser.feed(markup)
+    parser.close()
+    parser.flush()
+    return parser.paragraphs
+
+
+def extract_html(source):
+    """A web page as a single page of paragraphs and headings"""
+    with open_source(source) as f:
+        return [PARAGRAPH_BREAK.join(html_paragraphs(read_text(f.read())))]
+
+
+def markdown_inline(text):
+    return MD_EMPHASIS_RE.sub("", MD_LINK_RE.sub(r"\1", MD_IMAGE_RE.sub(r"\1", text)))
+
+
+def extract_markdown(source):
+    """A Markdown file as a single page; ATX and setext headings are kept, inline markup is stripped"""
+    with open_source(source) as f:
+        lines = read_text(f.read()).splitlines()
+    # YAML front matter is metadata, not content
+    if lines and lines[0].strip() == "---" and "---" in (line.strip() for line in lines[1:]):
+        lines = lines[[line.strip() for line in lines[1:]].index("---") + 2:]
+    paragraphs, current, fence = [], [], None
+
+    def flush():
+        if current:
+            paragraphs.append("\n".join(current))
+            current.clear()
+
+    for line in lines:
+        fence_match = MD_FENCE_RE.match(line)
+        if fence:
+            # Code is kept verbatim, one paragraph per block (blank lines would split it)
+            if fence_match and fence_match.group(1) == fence:
+                fence = None
+                flush()
+            elif line.strip():
+                current.append(line)
+            continue
+        if fence_match:
+            flush()
+            fence = fence_match.group(1)
+        elif MD_HEADING_RE.match(line):
+            flush()
+            paragraphs.append(heading(markdown_inline(MD_HEADING_RE.match(line).group(1))))
+        elif MD_SETEXT_RE.match(line) and len(current) == 1:
+            paragraphs.append(heading(current.pop()))
+        elif not line.strip():
+            flush()
+        else:
+            current.append(markdown_inline(line.strip()))
+    flush()
+    return [PARAGRAPH_BREAK.join(paragraphs)]
+
+
+def extract_epub(source):
+    """Pages of an EPUB book, one per document in reading (spine) order"""
+    pages = []
+    with open_source(source) as f, zipfile.ZipFile(f) as archive:
+        container = ET.fromstring(read_member(archive, "META-INF/container.xml"))
+        opf_path = container.find(f".//{CONTAINER_NS}rootfile").get("full-path")
+        package = ET.fromstring(read_member(archive, opf_path))
+        manifest = {item.get("id"): item.get("href") for item in package.iter(OPF_NS + "item")}
+        for itemref in package.iter(OPF_NS + "itemref"):
+            href = manifest.get(itemref.get("idref"))
+            if href is None or itemref.get("linear") == "no":
+                continue
+            pages.append(PARAGRAPH_BREAK.join(html_paragraphs(read_text(read_member(archive, member_path(opf_path, href))))))
+    return pages
+
+
+# Extension -> function returning a document's pages as text with HEADING_PREFIX headings
+# and PARAGRAPH_BREAK between paragraphs; add an entry to support another format
+EXTRACTORS = {
+    ".docx": extract_docx,
+    ".pptx": extract_pptx,
+    ".html": extract_html,
+    ".htm": extract_html,
+    ".md": extract_markdown,
+    ".markdown": extract_markdown,
+    ".epub": extract_epub
+}
+SUPPORTED_EXTENSIONS = [".pdf", *EXTRACTORS]
+
+
+def document_extension(filename):
+    return os.path.splitext(filename or "")[1].lower()
+
+
+def extract_text_from_document(source, filename):
+    """Extract text from any supported document (file path or bytes), like extract_text_from_pdf.
+
+    PDFs go through layout-aware extraction; other formats are read
+    directly from their markup, without rendering them to PDF first.
+    """
+    extension = document_extension(filename)
+    if extension == ".pdf":
+        return extract_text_from_pdf(source)
+    if extension not in EXTRACTORS:
+        return f"Error extracting text: unsupported file type {extension or filename!r}"
+    try:
+        pages = EXTRACTORS[extension](source)
+    except Exception as e:
+        return f"Error extracting text: {str(e)}"
+    if not any(page.strip() for page in pages):
+        return "Error extracting text: no text found in the document"
+    return PAGE_BREAK.join(pages)
@@ -0,0 +1,256 @@
+import os
+import hashlib
+import threading
+import collections
+import concurrent.futures
+import numpy as np
+import faiss
+from pdf_rag_utils import (get_embeddings, get_chunk, extract_headings, extract_keywords, tokenize,
+                           split_text, embed_chunks, build_vector_store)
+from pdf_extraction import open_pdf
+from upload_store import get_page_store
+from cpu_jobs import submit_job, report_progress
+
+MIN_SECTIONS = 2
+MAX_SECTIONS = 12
+MAX_SUGGESTED_TOPICS = 8
+KMEANS_ITERATIONS = 20
+# Indexed documents (vector store + outline) kept in memory, least recently used evicted first
+MAX_CACHED_DOCUMENTS = 8
+# Pages embedded in the first indexing stage; quizzes can be generated from them while the rest is embedded
+PARTIAL_INDEX_PAGES = int(os.getenv("PARTIAL_INDEX_PAGES", "10"))
+
+# Outline jobs run off the Streamlit script thread; one worker keeps them from competing with uploads
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="outline")
+_documents = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def document_id(pdf_bytes):
+    """Content hash used to cache a document's index and outline"""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class DocumentOutline:
+    """Sections of a document, each with the chunks that belong to it"""
+
+    def __init__(self, sections):
+        self.sections = sections
+        # Biggest sections make the best quiz topics
+        ranked = sorted(sections, key=lambda section: -len(section["chunk_ids"]))
+        self.suggested_topics = [section["title"] for section in ranked[:MAX_SUGGESTED_TOPICS]]
+
+    def find_section(self, topic):
+        """The section whose title matches the topic, if any"""
+        wanted = " ".join(tokenize(topic))
+        for section in self.sections:
+            if wanted and wanted == " ".join(tokenize(section["title"])):
+                return section
+        return None
+
+
+def get_toc_titles(pdf):
+    """Top-level entries of the PDF's table of contents (`pdf` is a file path or bytes)"""
+    try:
+        with open_pdf(pdf) as doc:
+            toc = doc.get_toc()
+    except Exception:
+        return []
+    top_level = min((level for level, _, _ in toc), default=1)
+    return [title.strip() for level, title, _ in toc if level == top_level and title.strip()]
+
+
+def build_outline(vector_store, pdf=None):
+    """Cluster a document's chunks into sections and label them.
+
+    Section titles come from the PDF's table of contents or, failing that,
+    heading-like lines in the text. Their embeddings seed k-means over the
+    chunk embeddings already stored in the FAISS index, so each cluster lines
+    up with a title. Clusters without a title are labelled by their keywords.
+    """
+    total = vector_store.index.ntotal
+    if total == 0:
+        return DocumentOutline([])
+    chunk_vectors = vector_store.index.reconstruct_n(0, total).astype(np.float32)
+    texts = [get_chunk(vector_store, i).page_content for i in range(total)]
+
+    titles = get_toc_titles(pdf) if pdf else []
+    if len(titles) < MIN_SECTIONS:
+        titles = extract_headings(texts)
+    k = max(1, min(MAX_SECTIONS, len(titles) or MIN_SECTIONS, total // 2 or 1))
+    titles = titles[:k]
+
+    # Small documents have few chunks per section, which is fine here
+    kmeans = faiss.Kmeans(chunk_vectors.shape[1], k, niter=KMEANS_ITERATIONS, seed=1234, min_points_per_centroid=1)
+    init_centroids = None
+    if len(titles) == k:
+        init_centroids = np.asarray(get_embeddings().embed_documents(titles), dtype=np.float32)
+    kmeans.train(chunk_vectors, init_centroids=init_centroids)
+    _, assignments = kmeans.index.search(chunk_vectors, 1)
+    assignments = assignments.ravel()
+
+    sections = []
+    for cluster in range(k):
+        chunk_ids = np.flatnonzero(assignments == cluster).tolist()
+        if not chunk_ids:
+            continue
+        keywords = extract_keywords([texts[i] for i in chunk_ids], vector_store, 5)
+        title = titles[cluster] if init_centroids is not None else " / ".join(keywords[:3]).title()
+        sections.append({"title": title, "chunk_ids": chunk_ids, "keywords": keywords})
+    return DocumentOutline(sections)
+
+
+def register_document(doc_id, vector_store, pdf=None):
+    """Cache an indexed document and start building its outline in the background"""
+    future = _executor.submit(build_outline, vector_store, pdf)
+    with _lock:
+        _documents[doc_id] = {"vector_store": vector_store, "outline": future}
+        _documents.move_to_end(doc_id)
+        while len(_documents) > MAX_CACHED_DOCUMENTS:
+            _, evicted = _documents.popitem(last=False)
+            evicted["outline"].cancel()
+
+
+def stage_ends(metadatas, first_pages=PARTIAL_INDEX_PAGES):
+    """Chunk counts indexed after each stage: the chunks of the first pages, then twice as many each time"""
+    total = len(metadatas)
+    end = max(1, sum(metadata["page"] <= first_pages for metadata in metadatas))
+    ends = [min(end, total)]
+    while ends[-1] < total:
+        ends.append(min(total, ends[-1] * 2))
+    return ends
+
+
+class IndexBuild:
+    """A document embedded in stages, so quizzes can use its first pages while the rest is embedded.
+
+    Each stage is a CPU job. All are submitted at once, so the first small
+    stage is done quickly and, with several workers, later stages embed in
+    parallel. collect() wraps the chunks of the stages finished so far, in
+    order, in a new FAISS store, so a store a quiz is searching is never
+    modified. With every stage collected, the store is registered as the
+    document's index and its outline starts building. Builds are not kept
+    anywhere else, so whoever started one holds it until it is collected.
+    """
+
+    def __init__(self, doc_id, chunks, metadatas, pdf_path=None):
+        self.doc_id = doc_id
+        self.chunks = chunks
+        self.metadatas = metadatas
+        self.pdf_path = pdf_path
+        self.ends = stage_ends(metadatas)
+        self.jobs = [submit_job(embed_chunks, chunks[start:end], progress=report_progress)
+                     for start, end in zip([0] + self.ends, self.ends)]
+        self.vectors = []
+        self.collected = 0
+        self.vector_store = None
+        self.lock = threading.Lock()
+
+    @property
+    def stages_done(self):
+        """Stages whose vectors can be collected: finished, and every stage before them too"""
+        return next((i for i, job in enumerate(self.jobs) if not job.done()), len(self.jobs))
+
+    @property
+    def complete(self):
+        return self.collected == len(self.jobs)
+
+    @property
+    def indexed_chunks(self):
+        return self.ends[self.collected - 1] if self.collected else 0
+
+    @property
+    def indexed_pages(self):
+        """Last page with chunks in the collected store"""
+        return self.metadatas[self.indexed_chunks - 1]["page_end"] if self.indexed_chunks else 0
+
+    @property
+    def total_pages(self):
+        return self.metadatas[-1]["page_end"] if self.metadatas else 0
+
+    @property
+    def fraction(self):
+        embedded = sum(end - start if job.done() else job.done_count
+                       for job, start, end in zip(self.jobs, [0] + self.ends, self.ends))
+        return embedded / self.ends[-1] if self.ends[-1] else 1.0
+
+    def done(self):
+        return all(job.done() for job in self.jobs)
+
+    def cancel(self):
+        for job in self.jobs:
+            job.cancel()
+
+    def collect(self):
+        """Vector store of the stages finished so far, or None before the first one.
+
+        Raises like Job.result() if a finished stage failed or was cancelled,
+        after collecting the stages that finished before it, so
+        `vector_store` still holds every page that was indexed.
+        """
+        with self.lock:
+            vectors, error = [], None
+            for job in self.jobs[self.collected:self.stages_done]:
+                try:
+                    vectors.append(job.result())
+                except Exception as e:
+                    error = e
+                    break
+            if vectors:
+                self.vectors += vectors
+                self.collected += len(vectors)
+                end = self.indexed_chunks
+                self.vector_store = build_vector_store(self.chunks[:end], np.vstack(self.vectors), self.metadatas[:end])
+                if self.complete:
+                    register_document(self.doc_id, self.vector_store, self.pdf_path)
+                    # The full store holds its own copies of the vectors and chunks
+                    self.vectors, self.chunks = [], None
+            if error is not None:
+                raise error
+            return self.vector_store
+
+    def result(self):
+        """Wait for every stage and return the full vector store"""
+        for job in self.jobs:
+            job.result()
+        return self.collect()
+
+
+def start_indexing(doc_id, pdf_path=None):
+    """Embed a document's chunks in the CPU pool and return its IndexBuild.
+
+    The text is read from the page store, so the document's pages must have
+    been saved there first. The build's full vector store is registered (so
+    its outline starts building) by the time it is first collected.
+    """
+    chunks, metadatas = split_text(get_page_store().document_text(doc_id))
+    return IndexBuild(doc_id, chunks, metadatas, pdf_path)
+
+
+def get_vector_store(doc_id):
+    """Vector store of a previously indexed document, or None"""
+    with _lock:
+        entry = _documents.get(doc_id)
+        if entry is None:
+            return None
+        _documents.move_to_end(doc_id)
+        return entry["vector_store"]
+
+
+def get_outline(doc_id):
+    """The document's outline once the background job has finished, otherwise None"""
+    with _lock:
+        entry = _documents.get(doc_id)
+    if entry is None or not entry["outline"].done() or entry["outline"].cancelled():
+        return None
+    try:
+        return entry["outline"].result()
+    except Exception as e:
+        print(f"Error building document outline: {str(e)}")
+        return None
+
+
+def outline_pending(doc_id):
+    with _lock:
+        entry = _documents.get(doc_id)
+    return entry is not None and not entry["outline"].done()
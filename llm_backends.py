@@ -0,0 +1,150 @@
+import os
+import queue
+import functools
+from typing import Any, List, Optional
+import httpx
+from dotenv import load_dotenv
+from pydantic import Field
+from langchain_core.language_models.chat_models import SimpleChatModel
+
+# Settings below come from .env too, so it must be loaded before they are read
+load_dotenv()
+
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "local")
+LOCAL_LLM_API_KEY = os.getenv("LOCAL_LLM_API_KEY", "")
+# Ask the server to keep the prompt's KV cache for the next request (llama.cpp server); other servers ignore it
+LOCAL_LLM_CACHE_PROMPT = os.getenv("LOCAL_LLM_CACHE_PROMPT", "1") == "1"
+LOCAL_LLM_MAX_TOKENS = int(os.getenv("LOCAL_LLM_MAX_TOKENS", "4096"))
+LOCAL_LLM_TIMEOUT_SECONDS = 600
+
+LLAMA_CONTEXT = int(os.getenv("LLAMA_CONTEXT", "8192"))
+# Prompt tokens evaluated per forward pass; larger batches evaluate long prompts faster
+LLAMA_BATCH = int(os.getenv("LLAMA_BATCH", "512"))
+LLAMA_THREADS = int(os.getenv("LLAMA_THREADS", str(os.cpu_count() or 1)))
+# KV states of recent prompt prefixes kept in RAM, so prompts sharing a template skip its evaluation
+LLAMA_PREFIX_CACHE_MB = int(os.getenv("LLAMA_PREFIX_CACHE_MB", "1024"))
+# Model instances answering requests in parallel. The weights are memory-mapped and shared; each instance
+# adds its own context (KV cache) and gets an equal share of LLAMA_THREADS and LLAMA_PREFIX_CACHE_MB
+LLAMA_INSTANCES = max(1, int(os.getenv("LLAMA_INSTANCES", "1")))
+
+
+def llm_backend():
+    """groq (hosted, default), openai (a local OpenAI-compatible server: llama.cpp server, vLLM, Ollama,
+    LM Studio) or llamacpp (a GGUF model loaded in this process, needs llama-cpp-python).
+
+    Read whenever a client is created, like LOCAL_LLM_URL and GGUF_MODEL_PATH,
+    so setting it after import takes effect.
+    """
+    return os.getenv("LLM_BACKEND", "groq")
+
+
+MESSAGE_ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+
+def to_openai_messages(messages):
+    return [{"role": MESSAGE_ROLES.get(message.type, "user"), "content": str(message.content)} for message in messages]
+
+
+@functools.lru_cache(maxsize=1)
+def get_http_client():
+    """HTTP client shared by all local-server requests so connections are reused"""
+    headers = {"Authorization": f"Bearer {LOCAL_LLM_API_KEY}"} if LOCAL_LLM_API_KEY else {}
+    return httpx.Client(timeout=LOCAL_LLM_TIMEOUT_SECONDS, headers=headers,
+                        limits=httpx.Limits(max_connections=64, max_keepalive_connections=64))
+
+
+class OpenAICompatibleChat(SimpleChatModel):
+    """Chat model served by a local OpenAI-compatible server.
+
+    The server batches concurrent requests itself (llama.cpp `--parallel`,
+    vLLM continuous batching). With `cache_prompt` llama.cpp keeps each
+    slot's KV cache, so a request sharing the previous prompt's prefix only
+    evaluates its new tokens; vLLM does the same with `--enable-prefix-caching`.
+    """
+
+    base_url: str = Field(default_factory=lambda: os.getenv("LOCAL_LLM_URL", "http://127.0.0.1:8080/v1"))
+    model_name: str = LOCAL_LLM_MODEL
+    temperature: float = 0.7
+    max_tokens: int = LOCAL_LLM_MAX_TOKENS
+    cache_prompt: bool = LOCAL_LLM_CACHE_PROMPT
+
+    @property
+    def _llm_type(self):
+        return "openai-compatible"
+
+    def _call(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        payload = {
+            "model": self.model_name,
+            "messages": to_openai_messages(messages),
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+        if stop:
+            payload["stop"] = stop
+        if self.cache_prompt:
+            payload["cache_prompt"] = True
+        response = get_http_client().post(f"{self.base_url.rstrip('/')}/chat/completions", json=payload)
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+
+@functools.lru_cache(maxsize=1)
+def get_llama_pool():
+    """Load the GGUF model's LLAMA_INSTANCES instances once per process; returns the queue of idle instances"""
+    try:
+        import llama_cpp
+    except ImportError:
+        raise RuntimeError("LLM_BACKEND=llamacpp needs llama-cpp-python (pip install llama-cpp-python)")
+    model_path = os.getenv("GGUF_MODEL_PATH", "")
+    if not model_path:
+        raise RuntimeError("Set GGUF_MODEL_PATH to a .gguf model file to use LLM_BACKEND=llamacpp")
+    # Last in, first out: under light load requests go to the instance whose prefix cache is warmest
+    pool = queue.LifoQueue()
+    for _ in range(LLAMA_INSTANCES):
+        llama = llama_cpp.Llama(model_path=model_path, n_ctx=LLAMA_CONTEXT, n_batch=LLAMA_BATCH,
+                                n_threads=max(1, LLAMA_THREADS // LLAMA_INSTANCES), verbose=False)
+        if LLAMA_PREFIX_CACHE_MB:
+            capacity = LLAMA_PREFIX_CACHE_MB * 1024 * 1024 // LLAMA_INSTANCES
+            llama.set_cache(llama_cpp.LlamaRAMCache(capacity_bytes=capacity))
+        pool.put(llama)
+    return pool
+
+
+class LlamaCppChat(SimpleChatModel):
+    """Chat model running a GGUF model on this machine's CPU with llama.cpp.
+
+    All clients share a pool of LLAMA_INSTANCES loaded instances whatever
+    their temperature. An instance has a single context and decodes one
+    prompt at a time, so concurrent requests run in parallel up to the
+    number of instances and wait for a free one beyond that; prompts are not
+    batched within an instance. Each instance reuses the KV cache of the
+    longest matching prompt prefix it has seen, which is why prompts put
+    their static instructions first.
+    """
+
+    temperature: float = 0.7
+    max_tokens: int = LOCAL_LLM_MAX_TOKENS
+
+    @property
+    def _llm_type(self):
+        return "llama-cpp"
+
+    def _call(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        pool = get_llama_pool()
+        llama = pool.get()
+        try:
+            result = llama.create_chat_completion(messages=to_openai_messages(messages), temperature=self.temperature,
+                                                  max_tokens=self.max_tokens, stop=stop)
+        finally:
+            pool.put(llama)
+        return result["choices"][0]["message"]["content"]
+
+
+LOCAL_BACKENDS = {"openai": OpenAICompatibleChat, "llamacpp": LlamaCppChat}
+
+
+def create_local_chat_model(temperature, backend=None):
+    backend = backend or llm_backend()
+    if backend not in LOCAL_BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND {backend!r}, expected groq, {' or '.join(LOCAL_BACKENDS)}")
+    return LOCAL_BACKENDS[backend](temperature=temperature)
@@ -0,0 +1,223 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import functools
+import threading
+import collections
+import fitz  # PyMuPDF
+from cpu_jobs import submit_job
+
+# Separates pages in extracted text so chunks can be traced back to their page
+PAGE_BREAK = "\f"
+HEADING_PREFIX = "## "
+# Blocks at least this much larger than body text are headings
+HEADING_SIZE_RATIO = 1.15
+MAX_HEADING_WORDS = 12
+# Blocks wider than this share of the page span all columns
+SPANNING_WIDTH = 0.6
+# Pages with less text than this but with images are treated as scanned
+MIN_PAGE_CHARS = 20
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "ocr_cache.db")
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+OCR_DPI = 300
+# Longer documents are rejected before extraction so one upload can't exhaust memory
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "2000"))
+
+HYPHENATED_RE = re.compile(r"(\w)-$")
+
+Block = collections.namedtuple("Block", "x0 y0 x1 y1 text size")
+
+
+def open_pdf(source):
+    """Open a PDF from a file path, which MuPDF reads lazily, or from bytes"""
+    if isinstance(source, (str, os.PathLike)):
+        return fitz.open(source, filetype="pdf")
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def text_blocks(page, textpage=None):
+    """Text blocks of a page with their bounding box, joined lines and largest font size"""
+    blocks = []
+    for block in page.get_text("dict", textpage=textpage)["blocks"]:
+        if block["type"] != 0:
+            continue
+        text, size = "", 0.0
+        for line in block["lines"]:
+            line_text = "".join(span["text"] for span in line["spans"]).strip()
+            if not line_text:
+                continue
+            size = max([size] + [span["size"] for span in line["spans"] if span["text"].strip()])
+            # Rejoin words hyphenated across lines
+            if HYPHENATED_RE.search(text):
+                text = text[:-1] + line_text
+            else:
+                text = f"{text} {line_text}" if text else line_text
+        if text:
+            blocks.append(Block(*block["bbox"], text, size))
+    return blocks
+
+
+def order_columns(blocks):
+    """Group horizontally overlapping blocks into columns; read columns left to right"""
+    columns = []
+    for block in sorted(blocks, key=lambda b: b.x0):
+        for column in columns:
+            if block.x0 < column["x1"] and block.x1 > column["x0"]:
+                column["x0"], column["x1"] = min(column["x0"], block.x0), max(column["x1"], block.x1)
+                column["blocks"].append(block)
+                break
+        else:
+            columns.append({"x0": block.x0, "x1": block.x1, "blocks": [block]})
+    columns.sort(key=lambda column: column["x0"])
+    return [block for column in columns for block in sorted(column["blocks"], key=lambda b: b.y0)]
+
+
+def reading_order(blocks, page_width):
+    """Order blocks as a person reads them.
+
+    Blocks spanning most of the page width (titles, full-width paragraphs)
+    split the page into horizontal bands; inside each band the columns are
+    read one after another instead of line by line across the page.
+    """
+    ordered, band = [], []
+    for block in sorted(blocks, key=lambda b: (b.y0, b.x0)):
+        if block.x1 - block.x0 >= SPANNING_WIDTH * page_width:
+            ordered += order_columns(band)
+            ordered.append(block)
+            band = []
+        else:
+            band.append(block)
+    return ordered + order_columns(band)
+
+
+def body_font_size(pages):
+    """Most common font size, weighted by characters, over all pages"""
+    sizes = collections.Counter()
+    for blocks in pages:
+        for block in blocks:
+            sizes[round(block.size, 1)] += len(block.text)
+    return sizes.most_common(1)[0][0] if sizes else 0.0
+
+
+def format_page(blocks, body_size):
+    """Page text with one paragraph per block and headings marked"""
+    paragraphs = []
+    for block in blocks:
+        is_heading = (body_size and block.size >= body_size * HEADING_SIZE_RATIO
+                      and len(block.text.split()) <= MAX_HEADING_WORDS)
+        paragraphs.append(HEADING_PREFIX + block.text if is_heading else block.text)
+    return "\n\n".join(paragraphs)
+
+
+def page_hash(doc, page):
+    """Hash of a page's content stream and images, stable across re-uploads"""
+    digest = hashlib.sha256(page.read_contents())
+    for image in page.get_images(full=True):
+        digest.update(doc.xref_stream_raw(image[0]) or b"")
+    return digest.hexdigest()
+
+
+def single_page_pdf(doc, page_number):
+    """One page as a standalone PDF, so OCR workers don't receive the whole document"""
+    with fitz.open() as page_doc:
+        page_doc.insert_pdf(doc, from_page=page_number, to_page=page_number)
+        return page_doc.tobytes()
+
+
+def ocr_page(page_pdf, language=OCR_LANGUAGE, dpi=OCR_DPI):
+    """OCR a single-page PDF with Tesseract and return its text in reading order"""
+    with fitz.open(stream=page_pdf, filetype="pdf") as doc:
+        page = doc[0]
+        textpage = page.get_textpage_ocr(language=language, dpi=dpi, full=True)
+        blocks = reading_order(text_blocks(page, textpage), page.rect.width)
+    return "\n\n".join(block.text for block in blocks)
+
+
+@functools.lru_cache(maxsize=1)
+def ocr_available():
+    """Whether Tesseract (and its language data) is installed"""
+    try:
+        fitz.get_tessdata()
+        return True
+    except Exception:
+        return False
+
+
+class OCRCache:
+    """OCR text of scanned pages, keyed by page hash and language"""
+
+    def __init__(self, path=OCR_CACHE_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages (page_hash TEXT NOT NULL, language TEXT NOT NULL, text TEXT NOT NULL, "
+            "created_at REAL NOT NULL, PRIMARY KEY (page_hash, language))"
+        )
+
+    def get_many(self, page_hashes, language=OCR_LANGUAGE):
+        if not page_hashes:
+            return {}
+        placeholders = ",".join("?" * len(page_hashes))
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT page_hash, text FROM pages WHERE language = ? AND page_hash IN ({placeholders})",
+                (language, *page_hashes)
+            ).fetchall()
+        return dict(rows)
+
+    def put(self, page_hash, text, language=OCR_LANGUAGE):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", (page_hash, language, text, time.time()))
+            self.conn.commit()
+
+
+@functools.lru_cache(maxsize=1)
+def get_ocr_cache():
+    """OCR cache shared by all sessions"""
+    return OCRCache()
+
+
+def extract_pages(pdf):
+    """Text of every page in reading order, with headings marked and scanned pages OCRed.
+
+    `pdf` is a file path or the PDF's bytes. Returns (pages, stats). Pages with hardly any text but with images are
+    OCRed in parallel in the CPU job pool; results are cached by page hash,
+    so uploading the same scan again costs nothing.
+    """
+    stats = {"pages": 0, "scanned_pages": 0, "ocr_cached": 0, "ocr_unavailable": 0}
+    with open_pdf(pdf) as doc:
+        if doc.page_count > MAX_PDF_PAGES:
+            raise ValueError(f"the PDF has {doc.page_count} pages, the limit is {MAX_PDF_PAGES}")
+        page_blocks, scanned = [], {}
+        for page in doc:
+            blocks = text_blocks(page)
+            if sum(len(block.text) for block in blocks) < MIN_PAGE_CHARS and page.get_images():
+                scanned[page.number] = page_hash(doc, page)
+            page_blocks.append(reading_order(blocks, page.rect.width))
+        body_size = body_font_size(page_blocks)
+        pages = [format_page(blocks, body_size) for blocks in page_blocks]
+        stats["pages"], stats["scanned_pages"] = len(pages), len(scanned)
+        if not scanned:
+            return pages, stats
+
+        cache = get_ocr_cache()
+        cached = cache.get_many(list(set(scanned.values())))
+        jobs = {}
+        for page_number, digest in scanned.items():
+            if digest in cached:
+                pages[page_number] = cached[digest]
+                stats["ocr_cached"] += 1
+            elif ocr_available():
+                jobs[page_number] = submit_job(ocr_page, single_page_pdf(doc, page_number))
+            else:
+                stats["ocr_unavailable"] += 1
+
+    for page_number, job in jobs.items():
+        try:
+            pages[page_number] = job.result()
+            cache.put(scanned[page_number], pages[page_number])
+        except Exception as e:
+            print(f"Error running OCR on page {page_number + 1}: {str(e)}")
+    return pages, stats
@@ -1,107 +1,68 @@
 import os
 import io
+import re
+import math
+import weakref
+import threading
+import functools
+import collections
+import numpy as np
 import fitz  # PyMuPDF
 import tempfile
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_groq import ChatGroq
 from langchain.chains import LLMChain
 from langchain.chains.retrieval_qa.base import RetrievalQA
 from dotenv import load_dotenv
+from pdf_extraction import extract_pages, PAGE_BREAK
+from chunking import split_text
+from llm_backends import llm_backend, create_local_chat_model
 
 load_dotenv()
 
-def extract_text_from_pdf(pdf_bytes):
-    """Extract text from PDF bytes"""
-    text = ""
-    try:
-        # Open the PDF from memory
-        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-            for page in doc:
-                text += page.get_text()
-        return text
-    except Exception as e:
-        return f"Error extracting text: {str(e)}"
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+LLM_MODEL_NAME = "deepseek-r1-distill-llama-70b"
+# Chunks embedded per call; progress is reported after each batch
+EMBEDDING_BATCH_SIZE = 64
 
-def create_vector_store(pdf_text):
-    """Create a vector store from the PDF text"""
-    try:
-        # Split the text into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len
-        )
-        chunks = text_splitter.split_text(pdf_text)
-        
-        # Create embeddings and vector store
-        embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        
-        # Create and return the vector store
-        vector_store = FAISS.from_texts(chunks, embeddings)
-        return vector_store
-    except Exception as e:
-        print(f"Error creating vector store: {str(e)}")
-        return None
+# Retrieval fan-out: one sub-query per few questions, a few chunks per sub-query
+QUESTIONS_PER_SUBQUERY = 2
+CHUNKS_PER_SUBQUERY = 2
+SEED_CHUNKS = 5
+MAX_CONTEXT_CHUNKS = 16
 
-def generate_rag_quiz(topic, difficulty, q_type, vector_store, language="English", num_questions=5):
-    """Generate quiz questions using RAG with Groq LLM"""
-    try:
-        # Initialize the LLM
-        llm = ChatGroq(
-            temperature=0.7,
-            api_key=os.getenv("GROQ_API_KEY"),
-            model_name="deepseek-r1-distill-llama-70b"
-        )
-        
-        # Create retriever
-        retriever = vector_store.as_retriever(search_kwargs={"k": 5})
-        
-        # First, retrieve relevant documents about the topic
-        search_query = f"information about {topic}"
-        relevant_docs = retriever.get_relevant_documents(search_query)
-        
-        # Extract the text from the documents
-        context_text = "\n\n".join([doc.page_content for doc in relevant_docs])
-        
-        # Create template based on question type
-        if q_type == "MCQ":
-            prompt_template = """You are a quiz generation expert. Using the provided context, create {num_questions} {difficulty} MCQ quiz questions on the topic: {topic} in {language} language.
-            
-Context from document:
-{context}
+WORD_RE = re.compile(r"[^\W\d_]{3,}")
+# Headings marked during extraction ("## Results"), numbered ("2.3 Cell Structure") or short Title Case lines
+HEADING_RE = re.compile(r"^\s*(#+\s+)?(\d+(?:\.\d+)*\.?\s+)?([A-Z][^\n.!?,;:]{2,70})\s*$", re.MULTILINE)
+STOPWORDS = set("""
+the and for are but not you all any can had her was one our out has have him his how its may new now
+own see two way who did get she too use this that with from they will would there their what about
+which when make like time just know take into year your some could them than then look only come
+over think also back after first well even want because these give most very been were more such
+other each many must between through during before while where under however therefore thus
+""".split())
 
-Format each question as follows:
-### Question X
-**Question:** [Question text here in {language}]
+# Output format per question type
+QUESTION_FORMATS = {
+    "MCQ": """### Question X
+**Question:** [Question text here]
 
 Options:
-A) [Option A in {language}]
-B) [Option B in {language}]
-C) [Option C in {language}]
-D) [Option D in {language}]
+A) [Option A]
+B) [Option B]
+C) [Option C]
+D) [Option D]
 
 **Answer:** [Correct letter]
 
 **Hint:** [Hint text here]
 
-**Explanation:** [Explanation text here]
-
-Use ONLY information from the context to create accurate questions. If the context doesn't contain enough information about {topic}, create basic questions based on the available information.
-The entire quiz should be in {language}, including all questions, options, hints, and explanations.
-"""
-        elif q_type == "True/False":
-            prompt_template = """You are a quiz generation expert. Using the provided context, create {num_questions} {difficulty} True/False quiz questions on the topic: {topic} in {language} language.
-            
-Context from document:
-{context}
-
-Format each question as follows:
-### Question X
-**Question:** [Question text here in {language}]
+**Explanation:** [Explanation text here]""",
+    "True/False": """### Question X
+**Question:** [Question text here]
 
 Options:
 A) True
@@ -111,73 +72,294 @@ B) False
 
 **Hint:** [Hint text here]
 
-**Explanation:** [Explanation text here]
+**Explanation:** [Explanation text here]""",
+    "Short Answer": """### Question X
+**Question:** [Question text here]
 
-Use ONLY information from the context to create accurate questions. If the context doesn't contain enough information about {topic}, create basic questions based on the available information.
-The entire quiz should be in {language}, including all questions, options, hints, and explanations.
-"""
-        elif q_type == "Short Answer":
-            prompt_template = """You are a quiz generation expert. Using the provided context, create {num_questions} {difficulty} Short Answer quiz questions on the topic: {topic} in {language} language.
-            
-Context from document:
-{context}
+**Answer:** [Short answer text]
 
-Format each question as follows:
-### Question X
-**Question:** [Question text here in {language}]
+**Hint:** [Hint text here]
 
-**Answer:** [Short answer text in {language}]
+**Explanation:** [Explanation text here]"""
+}
 
-**Hint:** [Hint text here]
+# Quiz prompts keep their static instructions first and the request's values last, so a backend
+# that reuses the KV cache of a shared prompt prefix (llama.cpp, vLLM) only evaluates the tail
+QUIZ_PROMPT = """You are a quiz generation expert.
+
+Format each question as follows:
+{question_format}
 
-**Explanation:** [Explanation text here]
+Please ensure all questions are well-formatted and clearly indicate the correct answer, hint, and explanation.
+The entire quiz should be in the requested language, including all questions, options, hints, and explanations.
 
-Use ONLY information from the context to create accurate questions. If the context doesn't contain enough information about {topic}, create basic questions based on the available information.
-The entire quiz should be in {language}, including all questions, options, hints, and explanations.
+Generate {num_questions} {difficulty} {q_type} quiz questions on the topic: {topic} in {language} language.
 """
-        else:
-            # Default to MCQ
-            prompt_template = """You are a quiz generation expert. Using the provided context, create {num_questions} {difficulty} MCQ quiz questions on the topic: {topic} in {language} language.
-            
+
+RAG_QUIZ_PROMPT = """You are a quiz generation expert. You create quiz questions using the provided context.
+
+Format each question as follows:
+{question_format}
+
+Use ONLY information from the context to create accurate questions. The context is grouped into focus areas; base each question on the focus area assigned to it. If the context doesn't contain enough information about the topic, create basic questions based on the available information.
+The entire quiz should be in the requested language, including all questions, options, hints, and explanations.
+
 Context from document:
 {context}
 
-Format each question as follows:
-### Question X
-**Question:** [Question text here in {language}]
+Create {num_questions} {difficulty} {q_type} quiz questions on the topic: {topic} in {language} language.
+"""
 
-Options:
-A) [Option A in {language}]
-B) [Option B in {language}]
-C) [Option C in {language}]
-D) [Option D in {language}]
+# Appended to quiz prompts for targeted follow-up requests
+AVOID_QUESTIONS_PROMPT = """
+Do not repeat or paraphrase any of these existing questions:
+{avoid_questions}
+"""
 
-**Answer:** [Correct letter]
+# Document frequencies per vector store, computed once and dropped with the store
+_term_stats = weakref.WeakKeyDictionary()
+# Chat model clients shared across requests so their HTTP connections are reused
+_llm_clients = {}
+_llm_lock = threading.Lock()
 
-**Hint:** [Hint text here]
+def quiz_prompt_template(template, q_type, avoid_questions=False):
+    """A quiz prompt template with the question type's output format filled in (MCQ for unknown types)"""
+    q_format = QUESTION_FORMATS.get(q_type, QUESTION_FORMATS["MCQ"])
+    prompt = template.replace("{question_format}", q_format)
+    return prompt + AVOID_QUESTIONS_PROMPT if avoid_questions else prompt
 
-**Explanation:** [Explanation text here]
+@functools.lru_cache(maxsize=1)
+def get_embeddings():
+    """Load the sentence-transformers embedding model once per process"""
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
 
-Use ONLY information from the context to create accurate questions. If the context doesn't contain enough information about {topic}, create basic questions based on the available information.
-The entire quiz should be in {language}, including all questions, options, hints, and explanations.
-"""
+def get_llm(chat_model_class, temperature=0.7):
+    """Shared chat model client for a model class and temperature.
+
+    Chat model clients are thread-safe, and reusing one keeps its HTTP
+    connection pool warm instead of opening new connections per quiz.
+    With LLM_BACKEND set to a local backend, that backend's model is used
+    instead of `chat_model_class`.
+    """
+    backend = llm_backend()
+    key = (backend, chat_model_class, temperature)
+    with _llm_lock:
+        llm = _llm_clients.get(key)
+        if llm is None:
+            if backend != "groq":
+                llm = _llm_clients[key] = create_local_chat_model(temperature, backend)
+            else:
+                llm = _llm_clients[key] = chat_model_class(
+                    temperature=temperature,
+                    api_key=os.getenv("GROQ_API_KEY"),
+                    model_name=LLM_MODEL_NAME
+                )
+    return llm
+
+def extract_text_from_pdf(pdf):
+    """Extract text from a PDF file path or bytes in reading order, one page per PAGE_BREAK-separated part"""
+    try:
+        pages, stats = extract_pages(pdf)
+        if stats["ocr_unavailable"]:
+            print(f"Skipped OCR for {stats['ocr_unavailable']} scanned page(s): Tesseract is not installed")
+        if not any(page.strip() for page in pages):
+            if stats["ocr_unavailable"]:
+                return "Error extracting text: the PDF appears to be scanned and OCR (Tesseract) is not installed"
+            return "Error extracting text: no text found in the PDF"
+        return PAGE_BREAK.join(pages)
+    except Exception as e:
+        return f"Error extracting text: {str(e)}"
+
+def embed_chunks(chunks, progress=None):
+    """Embed chunks in batches into one float32 array, calling `progress(done, total)` after each batch"""
+    embeddings = get_embeddings()
+    batches = []
+    for start in range(0, len(chunks), EMBEDDING_BATCH_SIZE):
+        batches.append(np.asarray(embeddings.embed_documents(chunks[start:start + EMBEDDING_BATCH_SIZE]), dtype=np.float32))
+        if progress:
+            progress(min(start + EMBEDDING_BATCH_SIZE, len(chunks)), len(chunks))
+    return np.vstack(batches) if batches else np.empty((0, 0), dtype=np.float32)
+
+def build_vector_store(chunks, vectors, metadatas=None):
+    """Wrap precomputed chunk embeddings in a FAISS vector store"""
+    return FAISS.from_embeddings(zip(chunks, vectors.tolist()), get_embeddings(), metadatas=metadatas)
+
+def create_vector_store(pdf_text):
+    """Create a vector store from the PDF text"""
+    try:
+        chunks, metadatas = split_text(pdf_text)
+        return build_vector_store(chunks, embed_chunks(chunks), metadatas)
+    except Exception as e:
+        print(f"Error creating vector store: {str(e)}")
+        return None
+
+def get_chunk(vector_store, index_id):
+    """Look up the Document stored at a FAISS row"""
+    return vector_store.docstore.search(vector_store.index_to_docstore_id[index_id])
+
+def tokenize(text):
+    return [word for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS]
+
+def get_term_stats(vector_store):
+    """Document frequency of every term over the store's chunks (cached per store)"""
+    stats = _term_stats.get(vector_store)
+    if stats is None:
+        document_frequency = collections.Counter()
+        for i in range(vector_store.index.ntotal):
+            document_frequency.update(set(tokenize(get_chunk(vector_store, i).page_content)))
+        stats = (document_frequency, vector_store.index.ntotal)
+        _term_stats[vector_store] = stats
+    return stats
+
+def is_title_case(text):
+    words = [word for word in text.split() if len(word) > 3]
+    return bool(words) and sum(word[0].isupper() for word in words) / len(words) >= 0.6
+
+def extract_headings(texts):
+    """Heading-like lines in the given chunks, in order of appearance"""
+    headings = []
+    for text in texts:
+        for match in HEADING_RE.finditer(text):
+            marked, numbered, heading = match.group(1), match.group(2), match.group(3).strip()
+            # Wrapped body text also starts lines with capitals, so unmarked lines need numbering or Title Case
+            if len(heading.split()) <= 8 and (marked or numbered or is_title_case(heading)) and heading not in headings:
+                headings.append(heading)
+    return headings
+
+def extract_keywords(texts, vector_store, n):
+    """Top TF-IDF terms of the given chunks relative to the whole document"""
+    document_frequency, total = get_term_stats(vector_store)
+    term_frequency = collections.Counter(word for text in texts for word in tokenize(text))
+    scores = {
+        term: count * math.log((1 + total) / (1 + document_frequency[term]))
+        for term, count in term_frequency.items()
+    }
+    return [term for term, _ in sorted(scores.items(), key=lambda item: -item[1])[:n]]
+
+def expand_query(topic, seed_texts, vector_store, num_subqueries):
+    """Derive sub-queries for a topic from headings, then keywords, of its best chunks"""
+    focus_areas = extract_headings(seed_texts)[:num_subqueries]
+    if len(focus_areas) < num_subqueries:
+        # Skip keywords already covered by the topic or a heading
+        covered = set(tokenize(topic)) | {word for area in focus_areas for word in tokenize(area)}
+        keywords = [k for k in extract_keywords(seed_texts, vector_store, num_subqueries * 2) if k not in covered]
+        focus_areas += keywords[:num_subqueries - len(focus_areas)]
+    return [(area, f"{topic} {area}") for area in focus_areas]
+
+def allocate_section(section, vector_store, num_questions):
+    """Split a precomputed outline section's chunks into focus areas without searching the index.
+
+    The outline may come from the full document while `vector_store` holds
+    only the chunks of its first pages (a partial index, whose rows are the
+    full index's first rows), so chunks past the end of the store are left out.
+    """
+    chunk_ids = [i for i in section["chunk_ids"] if i < vector_store.index.ntotal][:MAX_CONTEXT_CHUNKS]
+    if not chunk_ids:
+        return []
+    num_areas = max(1, min(math.ceil(num_questions / QUESTIONS_PER_SUBQUERY), len(chunk_ids)))
+    groups = np.array_split(np.asarray(chunk_ids), num_areas)
+    return [
+        (f"{section['title']} (part {n + 1})", [get_chunk(vector_store, int(i)) for i in group])
+        for n, group in enumerate(groups)
+    ]
+
+def retrieve_for_quiz(topic, vector_store, num_questions, outline=None):
+    """Retrieve chunks for a quiz, spread across sub-topics so coverage grows with num_questions.
+
+    If the topic names a section of the document's precomputed outline, that
+    section's chunks in the store are used directly. Returns a list of
+    (focus area, documents) pairs, one per sub-query.
+    """
+    section = outline.find_section(topic) if outline else None
+    allocations = allocate_section(section, vector_store, num_questions) if section else []
+    if allocations:
+        return allocations
+
+    embeddings = get_embeddings()
+    total = vector_store.index.ntotal
+
+    # Seed retrieval for the topic as a whole
+    topic_vector = np.asarray([embeddings.embed_query(f"information about {topic}")], dtype=np.float32)
+    _, seed_ids = vector_store.index.search(topic_vector, min(SEED_CHUNKS, total))
+    seed_ids = [i for i in seed_ids[0] if i >= 0]
+    seed_docs = [get_chunk(vector_store, i) for i in seed_ids]
+
+    num_subqueries = max(1, math.ceil(num_questions / QUESTIONS_PER_SUBQUERY) - 1)
+    subqueries = expand_query(topic, [doc.page_content for doc in seed_docs], vector_store, num_subqueries)
+    if not subqueries:
+        return [(topic, seed_docs)]
+
+    # One batched embedding call and one vectorized FAISS search for every sub-query
+    query_vectors = np.asarray(embeddings.embed_documents([query for _, query in subqueries]), dtype=np.float32)
+    _, neighbor_ids = vector_store.index.search(query_vectors, min(CHUNKS_PER_SUBQUERY * 2, total))
+
+    # Allocate distinct chunks to each sub-query, keeping the seeds for the topic itself
+    used = set(seed_ids[:CHUNKS_PER_SUBQUERY])
+    allocations = [(topic, [get_chunk(vector_store, i) for i in seed_ids[:CHUNKS_PER_SUBQUERY]])]
+    budget = MAX_CONTEXT_CHUNKS - len(used)
+    for (area, _), ids in zip(subqueries, neighbor_ids):
+        chosen = [i for i in ids if i >= 0 and i not in used][:min(CHUNKS_PER_SUBQUERY, budget)]
+        if not chosen:
+            continue
+        used.update(chosen)
+        budget -= len(chosen)
+        allocations.append((area, [get_chunk(vector_store, i) for i in chosen]))
+    return allocations
+
+def format_context(allocations, num_questions):
+    """Lay out retrieved chunks as focus areas, each with its share of the questions"""
+    sections = []
+    start = 1
+    for n, (area, docs) in enumerate(allocations):
+        # Spread the questions as evenly as possible over the focus areas
+        count = num_questions // len(allocations) + (1 if n < num_questions % len(allocations) else 0)
+        if count == 0:
+            questions = "background only"
+        elif count == 1:
+            questions = f"question {start}"
+        else:
+            questions = f"questions {start}-{start + count - 1}"
+        start += count
+        chunks = "\n\n".join(doc.page_content for doc in docs)
+        sections.append(f"Focus area {n + 1}: {area} ({questions})\n{chunks}")
+    return "\n\n---\n\n".join(sections)
+
+def generate_rag_quiz(topic, difficulty, q_type, vector_store, language="English", num_questions=5, outline=None, avoid_questions=None):
+    """Generate quiz questions using RAG with Groq LLM"""
+    try:
+        # Initialize the LLM
+        llm = get_llm(ChatGroq)
+        
+        # Retrieve chunks for several sub-topics so longer quizzes don't repeat themselves
+        allocations = retrieve_for_quiz(topic, vector_store, num_questions, outline)
+        context_text = format_context(allocations, num_questions)
+        
+        # Template based on question type, defaulting to MCQ
+        prompt_template = quiz_prompt_template(RAG_QUIZ_PROMPT, q_type, avoid_questions)
+        input_variables = ["context", "topic", "difficulty", "q_type", "num_questions", "language"]
+        if avoid_questions:
+            input_variables.append("avoid_questions")
         
         # Create a simple LLMChain instead of RetrievalQA
         prompt = PromptTemplate(
             template=prompt_template,
-            input_variables=["context", "topic", "difficulty", "num_questions", "language"]
+            input_variables=input_variables
         )
         
         llm_chain = LLMChain(llm=llm, prompt=prompt)
         
         # Execute the chain with all parameters explicitly
-        response = llm_chain.invoke({
+        inputs = {
             "context": context_text,
             "topic": topic,
             "difficulty": difficulty,
+            "q_type": q_type if q_type in QUESTION_FORMATS else "MCQ",
             "num_questions": num_questions,
             "language": language
-        })
+        }
+        if avoid_questions:
+            inputs["avoid_questions"] = "\n".join(f"- {question}" for question in avoid_questions)
+        response = llm_chain.invoke(inputs)
         
         # Return the text output
         return response["text"]
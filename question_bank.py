@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import sqlite3
+import functools
+import threading
+import numpy as np
+from pdf_rag_utils import get_embeddings
+from Main import generate_quiz
+from quiz_parser import parse_quiz, question_id
+from quiz_validation import validate_question, MAX_REPAIR_ROUNDS
+from semantic_cache import get_semantic_cache
+from quiz_analytics import get_quiz_analytics
+from question_dedup import get_question_dedup
+
+BANK_PATH = os.getenv("QUESTION_BANK_PATH", "question_bank.db")
+
+# Cosine similarity above which two topics are considered the same subject
+TOPIC_MATCH_THRESHOLD = 0.75
+# Banked questions older than this are never served again
+MAX_QUESTION_AGE_DAYS = 90
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS topics (
+    id INTEGER PRIMARY KEY,
+    topic TEXT NOT NULL,
+    language TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    q_type TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    UNIQUE (topic, language, difficulty, q_type)
+);
+CREATE TABLE IF NOT EXISTS questions (
+    id TEXT NOT NULL,
+    topic_id INTEGER NOT NULL REFERENCES topics(id),
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    served_count INTEGER NOT NULL DEFAULT 0,
+    last_served_at REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (id, topic_id)
+);
+CREATE INDEX IF NOT EXISTS questions_topic ON questions (topic_id, served_count, last_served_at);
+"""
+
+
+def is_bankable(question, q_type):
+    """Only keep questions that pass validation"""
+    return not validate_question(question, q_type)
+
+
+class QuestionBank:
+    """Parsed questions from past generations, indexed by topic embedding.
+
+    Topics are matched semantically within the same language, difficulty and
+    question type. Questions are served least-recently-served first and never
+    twice to the same session, so repeat visitors get fresh quizzes; a
+    paraphrase of a question the session has seen counts as seen. Play mode
+    statistics break ties and hold back questions with a suspect answer key.
+    """
+
+    def __init__(self, path=BANK_PATH, threshold=TOPIC_MATCH_THRESHOLD, max_age_days=MAX_QUESTION_AGE_DAYS):
+        self.threshold = threshold
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.prune()
+        self._load_topic_index()
+
+    def _load_topic_index(self):
+        """Keep topic embeddings in memory, grouped by (language, difficulty, q_type)"""
+        self.topic_index = {}
+        rows = self.conn.execute("SELECT id, language, difficulty, q_type, embedding FROM topics").fetchall()
+        for topic_id, language, difficulty, q_type, embedding in rows:
+            self._index_topic(topic_id, (language, difficulty, q_type), np.frombuffer(embedding, dtype=np.float32))
+
+    def _index_topic(self, topic_id, key, vector):
+        ids, matrix = self.topic_index.get(key, ([], np.empty((0, vector.shape[0]), dtype=np.float32)))
+        self.topic_index[key] = (ids + [topic_id], np.vstack([matrix, vector]))
+
+    def _embed(self, topic):
+        vector = np.asarray(get_embeddings().embed_query(topic), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _matching_topics(self, vector, language, difficulty, q_type):
+        """Topic IDs similar to the topic embedded as `vector`, most similar first"""
+        entry = self.topic_index.get((language, difficulty, q_type))
+        if entry is None:
+            return []
+        ids, matrix = entry
+        scores = matrix @ vector
+        order = np.argsort(-scores)
+        return [ids[i] for i in order if scores[i] >= self.threshold]
+
+    def _topic_id(self, topic, language, difficulty, q_type):
+        row = self.conn.execute(
+            "SELECT id FROM topics WHERE topic = ? AND language = ? AND difficulty = ? AND q_type = ?",
+            (topic, language, difficulty, q_type)
+        ).fetchone()
+        if row:
+            return row[0]
+        vector = self._embed(topic)
+        cursor = self.conn.execute(
+            "INSERT INTO topics (topic, language, difficulty, q_type, embedding) VALUES (?, ?, ?, ?, ?)",
+            (topic, language, difficulty, q_type, vector.tobytes())
+        )
+        self._index_topic(cursor.lastrowid, (language, difficulty, q_type), vector)
+        return cursor.lastrowid
+
+    def _pick_questions(self, topic, difficulty, q_type, language, count, exclude_ids=()):
+        """Up to `count` banked questions to serve for a topic, and the (id, topic_id) rows they came from.
+
+        Only the topic match and the row query hold the bank's lock; the topic
+        is embedded, and paraphrases are looked up in the duplicate index
+        (which may embed questions it has not indexed yet), without it.
+        """
+        if count <= 0:
+            return [], []
+        vector = self._embed(topic.strip())
+        with self.lock:
+            topic_ids = self._matching_topics(vector, language, difficulty, q_type)
+            if not topic_ids:
+                return [], []
+
+            placeholders = ",".join("?" * len(topic_ids))
+            rows = self.conn.execute(
+                f"SELECT id, data, served_count, last_served_at, topic_id FROM questions "
+                f"WHERE topic_id IN ({placeholders}) AND created_at >= ?",
+                (*topic_ids, time.time() - self.max_age_seconds)
+            ).fetchall()
+
+        # Least served first; among equally served, prefer questions whose play statistics fit the difficulty
+        scores = get_quiz_analytics().question_scores()
+        rows.sort(key=lambda row: (row[2], -scores.get(row[0], (0.5, False))[0], row[3]))
+
+        # Skip questions players' answers suggest are broken
+        rows = [row for row in rows if not scores.get(row[0], (0.5, False))[1]]
+        questions, served = [], []
+        dedup = get_question_dedup()
+        seen = dedup.resolve(exclude_ids)
+        # Resolve paraphrases a batch at a time, so only the rows about to be served are looked up
+        start = 0
+        while len(questions) < count and start < len(rows):
+            batch_rows = rows[start:start + count]
+            batch = [dict(json.loads(data), id=qid) for qid, data, _, _, _ in batch_rows]
+            start += count
+            for row, question, canonical_id in zip(batch_rows, batch, dedup.canonical_ids(batch)):
+                if len(questions) < count and canonical_id not in seen:
+                    seen.add(canonical_id)
+                    questions.append(question)
+                    served.append((row[0], row[4]))
+        return questions, served
+
+    def mark_served(self, rows):
+        """Count the banked questions of these (id, topic_id) rows as served now"""
+        if not rows:
+            return
+        with self.lock:
+            now = time.time()
+            self.conn.executemany(
+                "UPDATE questions SET served_count = served_count + 1, last_served_at = ? WHERE id = ? AND topic_id = ?",
+                [(now, qid, topic_id) for qid, topic_id in rows]
+            )
+            self.conn.commit()
+
+    def find_questions(self, topic, difficulty, q_type, language, count, exclude_ids=()):
+        """Serve up to `count` banked questions for a topic, marking them as served"""
+        questions, rows = self._pick_questions(topic, difficulty, q_type, language, count, exclude_ids)
+        self.mark_served(rows)
+        return questions
+
+    def add_questions(self, topic, difficulty, q_type, language, questions):
+        """Store freshly generated questions and return them with their bank IDs"""
+        stored = []
+        with self.lock:
+            topic_id = self._topic_id(topic.strip(), language, difficulty, q_type)
+            now = time.time()
+            for question in questions:
+                question = dict(question, id=question_id(question))
+                if is_bankable(question, q_type):
+                    data = {key: value for key, value in question.items() if key != "id"}
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO questions (id, topic_id, data, created_at, last_served_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (question["id"], topic_id, json.dumps(data, ensure_ascii=False), now, now)
+                    )
+                stored.append(question)
+            self.conn.commit()
+        return stored
+
+    def prune(self):
+        """Delete questions that are past the freshness window"""
+        with self.lock:
+            self.conn.execute("DELETE FROM questions WHERE created_at < ?", (time.time() - self.max_age_seconds,))
+            self.conn.commit()
+
+    def assemble_quiz(self, topic, difficulty, q_type, language="English", num_questions=5, exclude_ids=(),
+                      record=True):
+        """Build a quiz from the bank, asking the LLM only for the questions it is missing.
+
+        A quiz assembled for a near-duplicate request is served whole from the
+        semantic cache, unless the session has seen any of its questions.
+        Returns a dict with the parsed `questions`, how many came `from_bank`,
+        and an `error` message if the LLM call failed.
+
+        With record=False, for quizzes that may never be shown, nothing is
+        marked as served, banked or cached until record_quiz() is called with
+        the result.
+        """
+        dedup = get_question_dedup()
+        seen = dedup.resolve(exclude_ids)
+        cache = get_semantic_cache()
+        cached = cache.lookup(topic, difficulty, q_type, language, num_questions,
+                              accept=lambda quiz: seen.isdisjoint(dedup.resolve([q["id"] for q in quiz])))
+        if cached is not None:
+            return {"questions": [dict(q) for q in cached], "from_bank": len(cached), "error": None}
+
+        start = time.perf_counter()
+        questions, served = self._pick_questions(topic, difficulty, q_type, language, num_questions, exclude_ids)
+        from_bank = len(questions)
+        missing = num_questions - from_bank
+        error = None
+
+        known_ids = set(dedup.canonical_ids(questions)) | seen
+        generated = []
+        for _ in range(1 + MAX_REPAIR_ROUNDS):
+            if missing <= 0:
+                break
+            # Ask only for the missing questions, avoiding the ones already in the quiz
+            raw_output = generate_quiz(topic, difficulty, q_type, language, missing,
+                                       avoid_questions=[q["question"] for q in questions])
+            if raw_output.startswith("Error generating quiz:"):
+                error = raw_output
+                break
+            parsed = [dict(q, id=question_id(q)) for q in parse_quiz(raw_output, q_type)]
+            generated += parsed
+            # Keep only valid questions we have not served yet, in any wording
+            new_questions = []
+            for question, canonical_id in zip(parsed, dedup.canonical_ids(parsed)):
+                if len(new_questions) < missing and canonical_id not in known_ids and not validate_question(question, q_type):
+                    known_ids.add(canonical_id)
+                    new_questions.append(question)
+            questions += new_questions
+            missing -= len(new_questions)
+
+        result = {"questions": questions, "from_bank": from_bank, "error": error}
+        pending = {"request": (topic, difficulty, q_type, language, num_questions), "served": served,
+                   "generated": generated, "generate_s": time.perf_counter() - start}
+        if record:
+            self._record(result, **pending)
+        else:
+            result["pending"] = pending
+        return result
+
+    def _record(self, result, request, served, generated, generate_s):
+        topic, difficulty, q_type, language, num_questions = request
+        self.mark_served(served)
+        if generated:
+            self.add_questions(topic, difficulty, q_type, language, generated)
+        if len(result["questions"]) == num_questions:
+            get_semantic_cache().store(topic, difficulty, q_type, language, num_questions,
+                                       [dict(q) for q in result["questions"]], generate_s=generate_s)
+
+    def record_quiz(self, result):
+        """Mark a quiz assembled with record=False as served, and bank and cache its questions"""
+        pending = result.pop("pending", None)
+        if pending is not None:
+            self._record(result, **pending)
+
+
+@functools.lru_cache(maxsize=1)
+def get_question_bank():
+    """Process-wide question bank shared by all sessions"""
+    return QuestionBank()
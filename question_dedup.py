@@ -0,0 +1,265 @@
+import os
+import re
+import zlib
+import hashlib
+import sqlite3
+import unicodedata
+import functools
+import threading
+import numpy as np
+from pdf_rag_utils import get_embeddings
+from quiz_parser import normalize_question_text, question_id, PARSE_ERROR_TEXT
+
+DEDUP_PATH = os.getenv("QUESTION_DEDUP_PATH", "question_dedup.db")
+# Also compare embeddings, which catch paraphrases that share few words (one embedding per new question)
+DEDUP_EMBEDDINGS = os.getenv("QUESTION_DEDUP_EMBEDDINGS", "1") == "1"
+
+# MinHash over the words and word pairs of the normalized text; 16 bands of 4 values make
+# questions sharing about half their shingles candidates, and the estimate must reach the threshold.
+# A word dropped from or added to a ten-word question still passes; two added words rarely do
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+JACCARD_THRESHOLD = 0.7
+# Random-hyperplane LSH over embeddings: 16 bands of 16 sign bits find most pairs above
+# cosine 0.9 while unrelated questions on the same topic rarely share a band
+HYPERPLANE_BANDS = 16
+HYPERPLANE_BITS = 16
+COSINE_THRESHOLD = 0.9
+# Questions kept per bucket; a bucket this full only holds common words (or common
+# embedding directions) and stops taking members, so a lookup reads a bounded number of rows
+MAX_BUCKET_SIZE = 32
+# Candidates verified per question, those sharing the most buckets first
+MAX_CANDIDATES = 32
+
+MERSENNE_PRIME = (1 << 61) - 1
+HASH_MASK = (1 << 32) - 1
+# Band numbers are stored in the top bits of a bucket key, the band's hash in the rest
+BAND_SHIFT = 48
+# Bumped when stored rows change meaning; an index written by another version is dropped and
+# rebuilt as questions are parsed again
+SCHEMA_VERSION = 3
+
+# Words that change the answer when only one of two questions has them
+NEGATIONS = frozenset("not no never none neither nor except false incorrect least cannot without "
+                      "isn aren wasn weren don doesn didn won wouldn shouldn couldn".split())
+# Words after which a Roman numeral is a number, in any case ("Part II", "type iv", "World War I")
+NUMBERING_WORDS = frozenset("part chapter phase type stage step book volume act scene section article "
+                            "class grade level round war".split())
+ROMAN_NUMERAL_RE = re.compile(r"(?=[ivxlcdm]{1,7}$)m*(c[md]|d?c{0,3})(x[cl]|l?x{0,3})(i[xv]|v?i{0,3})", re.IGNORECASE)
+WORD_RE = re.compile(r"\w+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    canonical_id TEXT NOT NULL,
+    words TEXT NOT NULL,
+    numbers TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    embedding BLOB
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    key INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    PRIMARY KEY (key, row)
+) WITHOUT ROWID;
+"""
+
+
+def shingles(text):
+    """Words keep one substituted word from outweighing the rest; word pairs keep some word order"""
+    words = normalize_question_text(text).split()
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])} or {""}
+
+
+def numbers(text):
+    """Numbers in a question, case-folded: words with a digit, and Roman numerals in a numbering context.
+
+    A Roman numeral counts after a numbering word ("Part II", "World War I")
+    or in capitals after a capitalized word ("Henry VIII"), so words such as
+    "mix", "civil" or the pronoun "I" are not read as numbers.
+    """
+    words = WORD_RE.findall(unicodedata.normalize("NFKC", text))
+    found = set()
+    for previous, word in zip([""] + words, words):
+        if any(c.isdigit() for c in word):
+            found.add(word.casefold())
+        elif ROMAN_NUMERAL_RE.fullmatch(word) and (
+                previous.casefold() in NUMBERING_WORDS
+                or (len(word) > 1 and word.isupper() and previous[:1].isupper())):
+            found.add(word.casefold())
+    return found
+
+
+def same_question(words, other_words, question_numbers, other_numbers, cosine, cosine_threshold=COSINE_THRESHOLD):
+    """Whether two questions with matching signatures can be the same, judged by the words they differ in.
+
+    A negation only one of them has ("is a mammal" / "is not a mammal") or
+    different numbers ("World War I" / "World War II") make them different
+    questions, and so does one word swapped for another ("binary search" /
+    "linear search", "Australia" / "Austria"). Other rewordings that replace
+    words count only if the embeddings agree.
+    """
+    only_here, only_there = words - other_words, other_words - words
+    if question_numbers != other_numbers or any(word in NEGATIONS for word in only_here | only_there):
+        return False
+    if only_here and only_there:
+        if len(only_here) == len(only_there) == 1:
+            return False
+        return cosine is not None and cosine >= cosine_threshold
+    return True
+
+
+def bucket_key(band, value):
+    return (band << BAND_SHIFT) | (value & ((1 << BAND_SHIFT) - 1))
+
+
+class QuestionDedupIndex:
+    """Index of every question the app has generated, to find repeats and paraphrases.
+
+    Each question gets a canonical ID: the ID of the first indexed question
+    it duplicates, or its own. Candidates come from LSH buckets (MinHash
+    bands of words and word pairs and, with embeddings, sign bits of random
+    projections) and are verified against the Jaccard and cosine
+    thresholds, then by the words the two questions differ in (see
+    same_question). A lookup reads a fixed number of buckets of at most
+    MAX_BUCKET_SIZE questions and checks at most MAX_CANDIDATES of them, so
+    it costs the same with a thousand or a million indexed questions. The
+    index is kept in SQLite and grows as questions are parsed.
+    """
+
+    def __init__(self, path=DEDUP_PATH, use_embeddings=DEDUP_EMBEDDINGS,
+                 jaccard_threshold=JACCARD_THRESHOLD, cosine_threshold=COSINE_THRESHOLD):
+        self.use_embeddings = use_embeddings
+        self.jaccard_threshold = jaccard_threshold
+        self.cosine_threshold = cosine_threshold
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # Every parse commits new rows into large B-trees; the write-ahead log keeps those commits cheap
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS questions; DROP TABLE IF EXISTS buckets;")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.executescript(SCHEMA)
+        # Fixed seeds, so signatures stay comparable across restarts
+        rng = np.random.RandomState(1)
+        self.perm_a = rng.randint(1, HASH_MASK, MINHASH_PERMUTATIONS, dtype=np.uint64)
+        self.perm_b = rng.randint(0, HASH_MASK, MINHASH_PERMUTATIONS, dtype=np.uint64)
+        self.planes = None
+
+    def _signature(self, text):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype=np.uint64)
+        permuted = ((hashes[:, None] * self.perm_a + self.perm_b) % MERSENNE_PRIME) & HASH_MASK
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _embed(self, texts):
+        vectors = np.asarray(get_embeddings().embed_documents(texts), dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def _bucket_keys(self, signature, vector):
+        rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+        keys = [
+            bucket_key(band, int.from_bytes(hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(),
+                                                            digest_size=8).digest(), "big"))
+            for band in range(MINHASH_BANDS)
+        ]
+        if vector is not None:
+            if self.planes is None:
+                self.planes = np.random.RandomState(2).standard_normal(
+                    (HYPERPLANE_BANDS * HYPERPLANE_BITS, vector.shape[0])).astype(np.float32)
+            bits = (self.planes @ vector > 0).reshape(HYPERPLANE_BANDS, HYPERPLANE_BITS)
+            weights = 1 << np.arange(HYPERPLANE_BITS)
+            keys += [bucket_key(MINHASH_BANDS + band, int(value)) for band, value in enumerate(bits @ weights)]
+        return keys
+
+    def _known(self, ids):
+        """Canonical IDs of the indexed questions among `ids`"""
+        ids = list(set(ids))
+        known = {}
+        # Stay below SQLite's limit on query parameters
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            known.update(self.conn.execute(
+                f"SELECT id, canonical_id FROM questions WHERE id IN ({','.join('?' * len(batch))})", batch
+            ).fetchall())
+        return known
+
+    def _find_duplicate(self, words, question_numbers, signature, vector, keys):
+        """Canonical ID of the closest indexed question above a threshold, or None"""
+        candidates = self.conn.execute(
+            f"SELECT q.canonical_id, q.words, q.numbers, q.signature, q.embedding FROM questions q JOIN ("
+            f"SELECT row, COUNT(*) AS shared FROM buckets WHERE key IN ({','.join('?' * len(keys))}) "
+            f"GROUP BY row ORDER BY shared DESC LIMIT ?) c ON c.row = q.row",
+            (*keys, MAX_CANDIDATES)
+        ).fetchall()
+        best, best_score = None, 0.0
+        for canonical_id, candidate_words, candidate_numbers, candidate_signature, candidate_embedding in candidates:
+            jaccard = float(np.mean(np.frombuffer(candidate_signature, dtype=np.uint32) == signature))
+            # Scores are compared relative to their threshold, so the two measures rank together
+            score = jaccard / self.jaccard_threshold
+            cosine = None
+            if vector is not None and candidate_embedding is not None:
+                cosine = float(np.frombuffer(candidate_embedding, dtype=np.float16).astype(np.float32) @ vector)
+                score = max(score, cosine / self.cosine_threshold)
+            if (score >= 1.0 and score > best_score
+                    and same_question(words, set(candidate_words.split()), question_numbers,
+                                      set(candidate_numbers.split()), cosine, self.cosine_threshold)):
+                best, best_score = canonical_id, score
+        return best
+
+    def canonical_ids(self, questions):
+        """Canonical ID of each question dict, indexing the questions not seen before.
+
+        Questions without text keep their own ID and are not indexed.
+        """
+        ids = [q.get("id") or question_id(q) for q in questions]
+        with self.lock:
+            known = self._known(ids)
+        new = {}
+        for qid, question in zip(ids, questions):
+            text = question.get("question", "")
+            if qid not in known and text and text != PARSE_ERROR_TEXT:
+                new.setdefault(qid, text)
+        if new:
+            # Embed outside the lock; another thread may index the same questions meanwhile
+            vectors = self._embed(list(new.values())) if self.use_embeddings else [None] * len(new)
+            with self.lock:
+                known.update(self._known(new))
+                for (qid, text), vector in zip(new.items(), vectors):
+                    if qid in known:
+                        continue
+                    words = normalize_question_text(text)
+                    question_numbers = numbers(text)
+                    signature = self._signature(text)
+                    keys = self._bucket_keys(signature, vector)
+                    # Questions of the same batch are already in the tables, so they are matched too
+                    canonical_id = self._find_duplicate(set(words.split()), question_numbers, signature, vector,
+                                                        keys) or qid
+                    embedding = vector.astype(np.float16).tobytes() if vector is not None else None
+                    row = self.conn.execute(
+                        "INSERT INTO questions (id, canonical_id, words, numbers, signature, embedding) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (qid, canonical_id, words, " ".join(sorted(question_numbers)), signature.tobytes(), embedding)
+                    ).lastrowid
+                    full = {key for key, size in self.conn.execute(
+                        f"SELECT key, COUNT(*) FROM buckets WHERE key IN ({','.join('?' * len(keys))}) GROUP BY key",
+                        keys
+                    ) if size >= MAX_BUCKET_SIZE}
+                    self.conn.executemany("INSERT OR IGNORE INTO buckets (key, row) VALUES (?, ?)",
+                                          [(key, row) for key in keys if key not in full])
+                    known[qid] = canonical_id
+                self.conn.commit()
+        return [known.get(qid, qid) for qid in ids]
+
+    def resolve(self, ids):
+        """Canonical IDs of question IDs; IDs that were never indexed stand for themselves"""
+        with self.lock:
+            known = self._known(ids)
+        return {known.get(qid, qid) for qid in ids}
+
+
+@functools.lru_cache(maxsize=1)
+def get_question_dedup():
+    """Process-wide duplicate index shared by all sessions"""
+    return QuestionDedupIndex()
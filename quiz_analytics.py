@@ -0,0 +1,190 @@
+import os
+import time
+import sqlite3
+import functools
+import threading
+import numpy as np
+import pandas as pd
+
+ATTEMPTS_PATH = os.getenv("QUIZ_ATTEMPTS_PATH", "quiz_attempts.db")
+
+# Answer letters are scored as small integer codes so a whole attempt is compared in one operation
+LETTER_CODES = {"A": 0, "B": 1, "C": 2, "D": 3}
+UNANSWERED = -1
+INVALID = -2
+
+# Questions need this many answers before their statistics influence serving
+MIN_ATTEMPTS = 20
+# Share of correct answers we aim for at each difficulty
+TARGET_P_CORRECT = {"Easy": (0.7, 0.95), "Medium": (0.4, 0.8), "Hard": (0.2, 0.6)}
+# Strong students getting a question wrong more often than weak ones points to a bad answer key
+MIN_DISCRIMINATION = -0.2
+# How long bank serving reuses computed question scores
+SCORES_TTL_SECONDS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    quiz_id TEXT NOT NULL,
+    topic TEXT,
+    difficulty TEXT,
+    q_type TEXT,
+    language TEXT,
+    score INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS answers (
+    attempt_id INTEGER NOT NULL REFERENCES attempts(id),
+    position INTEGER NOT NULL,
+    question_id TEXT NOT NULL,
+    selected TEXT,
+    correct_answer TEXT,
+    is_correct INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_question ON answers (question_id);
+"""
+
+
+def encode_answers(answers):
+    """Map answer letters to integer codes"""
+    return np.fromiter(
+        (UNANSWERED if a is None else LETTER_CODES.get(a, INVALID) for a in answers),
+        dtype=np.int8, count=len(answers)
+    )
+
+
+def score_attempt(correct_answers, user_answers):
+    """Score an attempt in one vectorized comparison; returns (per-question correctness, score)"""
+    correct = encode_answers(correct_answers)
+    selected = encode_answers(user_answers)
+    # A missing or unparseable answer key can never be matched
+    is_correct = (selected == correct) & (correct >= 0)
+    return is_correct, int(is_correct.sum())
+
+
+class QuizAnalytics:
+    """Attempts log with per-question, per-topic and per-quiz statistics"""
+
+    def __init__(self, path=ATTEMPTS_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._scores = None
+        self._scores_at = 0.0
+
+    def record_attempt(self, session_id, quiz, user_answers):
+        """Score a Play mode submission, log it, and return (per-question correctness, score)"""
+        metadata = quiz.metadata
+        is_correct, score = score_attempt([q.answer for q in quiz.questions], user_answers)
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO attempts (session_id, quiz_id, topic, difficulty, q_type, language, score, total, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, quiz.id, metadata.get("topic"), metadata.get("difficulty"), metadata.get("q_type"),
+                 metadata.get("language"), score, len(quiz.questions), time.time())
+            )
+            self.conn.executemany(
+                "INSERT INTO answers (attempt_id, position, question_id, selected, correct_answer, is_correct) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(cursor.lastrowid, i, q.id, answer, q.answer, int(correct))
+                 for i, (q, answer, correct) in enumerate(zip(quiz.questions, user_answers, is_correct))]
+            )
+            self.conn.commit()
+        return is_correct, score
+
+    def load_answers(self, question_ids=None):
+        """One row per answered question, joined with its attempt"""
+        query = (
+            "SELECT a.id AS attempt_id, a.session_id, a.quiz_id, a.topic, a.difficulty, a.score, a.total, "
+            "s.position, s.question_id, s.selected, s.correct_answer, s.is_correct "
+            "FROM answers s JOIN attempts a ON a.id = s.attempt_id"
+        )
+        params = ()
+        if question_ids:
+            query += f" WHERE s.question_id IN ({','.join('?' * len(question_ids))})"
+            params = tuple(question_ids)
+        with self.lock:
+            return pd.read_sql_query(query, self.conn, params=params)
+
+    def load_attempts(self):
+        with self.lock:
+            return pd.read_sql_query("SELECT * FROM attempts", self.conn)
+
+    def question_difficulty(self, answers=None):
+        """Per question: attempts, share answered correctly, and discrimination.
+
+        Discrimination is the correlation between getting the question right
+        and the rest of the attempt's score, computed for all questions at once.
+        """
+        answers = self.load_answers() if answers is None else answers
+        if answers.empty:
+            return pd.DataFrame(columns=["question_id", "attempts", "p_correct", "discrimination"]).set_index("question_id")
+        answers = answers.assign(rest_score=(answers["score"] - answers["is_correct"]) / (answers["total"] - 1).clip(lower=1))
+        grouped = answers.groupby("question_id")
+        stats = grouped.agg(attempts=("is_correct", "size"), p_correct=("is_correct", "mean"))
+        # Vectorized point-biserial correlation per question
+        x = answers["is_correct"] - grouped["is_correct"].transform("mean")
+        y = answers["rest_score"] - grouped["rest_score"].transform("mean")
+        products = pd.DataFrame({"question_id": answers["question_id"], "xy": x * y, "xx": x * x, "yy": y * y})
+        sums = products.groupby("question_id")[["xy", "xx", "yy"]].sum()
+        denominator = np.sqrt(sums["xx"] * sums["yy"])
+        stats["discrimination"] = (sums["xy"] / denominator.where(denominator > 0)).fillna(0.0)
+        return stats
+
+    def distractor_rates(self, answers=None):
+        """Share of answers that picked each option, per question (unanswered excluded)"""
+        answers = self.load_answers() if answers is None else answers
+        answered = answers.dropna(subset=["selected"])
+        if answered.empty:
+            return pd.DataFrame()
+        return pd.crosstab(answered["question_id"], answered["selected"], normalize="index")
+
+    def topic_mastery(self, session_id=None, answers=None):
+        """Share of correct answers per topic, optionally for one session"""
+        answers = self.load_answers() if answers is None else answers
+        if session_id is not None:
+            answers = answers[answers["session_id"] == session_id]
+        return answers.groupby("topic")["is_correct"].agg(attempts="size", mastery="mean").sort_values("mastery")
+
+    def score_distribution(self, bins=10, attempts=None):
+        """Histogram of percentage scores over all attempts"""
+        attempts = self.load_attempts() if attempts is None else attempts
+        percentages = 100 * attempts["score"].to_numpy() / np.maximum(attempts["total"].to_numpy(), 1)
+        counts, edges = np.histogram(percentages, bins=bins, range=(0, 100))
+        return pd.DataFrame({"from": edges[:-1], "to": edges[1:], "attempts": counts})
+
+    def question_scores(self):
+        """Per-question serving scores for the question bank, cached for a short while.
+
+        Returns {question_id: (fit, flagged)}. `fit` is 1 when the share of
+        correct answers lies in the target band for the question's difficulty
+        and drops towards 0 the further it strays. `flagged` marks questions
+        whose answer key is probably wrong.
+        """
+        with self.lock:
+            if self._scores is not None and time.time() - self._scores_at < SCORES_TTL_SECONDS:
+                return self._scores
+        answers = self.load_answers()
+        scores = {}
+        if not answers.empty:
+            stats = self.question_difficulty(answers)
+            stats["difficulty"] = answers.groupby("question_id")["difficulty"].first()
+            stats = stats[stats["attempts"] >= MIN_ATTEMPTS]
+            # astype: mapping an empty string column keeps its string dtype
+            low = stats["difficulty"].map(lambda d: TARGET_P_CORRECT.get(d, (0.0, 1.0))[0]).astype(float)
+            high = stats["difficulty"].map(lambda d: TARGET_P_CORRECT.get(d, (0.0, 1.0))[1]).astype(float)
+            distance = np.maximum(low - stats["p_correct"], 0) + np.maximum(stats["p_correct"] - high, 0)
+            fit = (1 - 2 * distance).clip(lower=0)
+            flagged = stats["discrimination"] < MIN_DISCRIMINATION
+            scores = {qid: (float(f), bool(flag)) for qid, f, flag in zip(stats.index, fit, flagged)}
+        with self.lock:
+            self._scores, self._scores_at = scores, time.time()
+        return scores
+
+
+@functools.lru_cache(maxsize=1)
+def get_quiz_analytics():
+    """Attempts log shared by all sessions"""
+    return QuizAnalytics()
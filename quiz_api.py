@@ -0,0 +1,264 @@
+"""HTTP/JSON service exposing the quiz engine.
+
+    uvicorn quiz_api:app --host 0.0.0.0 --port 8000
+
+Request handlers stay on the event loop; blocking work runs on two bounded
+thread pools, one for LLM calls and one for CPU-bound steps (text
+extraction, and waiting on embedding and PDF rendering, which run in the
+CPU job processes). When a pool's queue is full the
+request is rejected with 503 instead of piling up. The embedding model, the
+LLM clients, indexed documents and generated quizzes are shared by all
+requests.
+"""
+import os
+import asyncio
+import functools
+import contextlib
+import concurrent.futures
+from typing import List, Literal, Optional
+from fastapi import FastAPI, File, HTTPException, Response, UploadFile
+from pydantic import BaseModel, Field
+from pdf_rag_utils import generate_rag_quiz, get_embeddings
+from Main import generate_quiz
+from pdf_utils import get_pdf_download_link
+from quiz_parser import parse_quiz
+from quiz_validation import repair_quiz
+from question_dedup import get_question_dedup
+from question_bank import get_question_bank
+from semantic_cache import get_semantic_cache
+from quiz_analytics import get_quiz_analytics
+from document_outline import start_indexing, get_vector_store, get_outline, outline_pending
+from quiz_store import get_quiz_store
+from cpu_jobs import submit_job
+from upload_store import spool_upload, get_page_store, UploadTooLarge
+from document_ingestion import extract_text_from_document, document_extension, SUPPORTED_EXTENSIONS
+
+# LLM calls mostly wait on the network, so they get many more threads than CPU-bound work
+LLM_WORKERS = int(os.getenv("QUIZ_API_LLM_WORKERS", "32"))
+CPU_WORKERS = int(os.getenv("QUIZ_API_CPU_WORKERS", str(os.cpu_count() or 2)))
+# Jobs allowed to wait per worker before new requests are turned away
+QUEUE_PER_WORKER = int(os.getenv("QUIZ_API_QUEUE_PER_WORKER", "16"))
+MAX_UPLOAD_BYTES = int(os.getenv("QUIZ_API_MAX_UPLOAD_MB", "50")) * 1024 * 1024
+PRELOAD_EMBEDDINGS = os.getenv("QUIZ_API_PRELOAD_EMBEDDINGS", "1") == "1"
+
+
+class WorkerPool:
+    """Thread pool with a cap on queued jobs"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.max_pending = workers * (1 + QUEUE_PER_WORKER)
+        self.pending = 0  # only touched from the event loop thread
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+    async def run(self, fn, *args, **kwargs):
+        if self.pending >= self.max_pending:
+            raise HTTPException(status_code=503, detail=f"Server busy ({self.name} queue full), retry later")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.pending -= 1
+
+    def stats(self):
+        return {"workers": self.workers, "pending": self.pending, "max_pending": self.max_pending}
+
+
+llm_pool = WorkerPool("llm", LLM_WORKERS)
+cpu_pool = WorkerPool("cpu", CPU_WORKERS)
+# Uploads of the same document share one indexing job
+_ingest_jobs = {}
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Create the shared singletons up front; lru_cache would build one per thread if first calls raced
+    get_question_bank()
+    get_semantic_cache()
+    get_quiz_analytics()
+    get_quiz_store()
+    get_page_store()
+    get_question_dedup()
+    if PRELOAD_EMBEDDINGS:
+        # Load the embedding model before the first upload instead of during it
+        try:
+            await cpu_pool.run(get_embeddings)
+        except Exception as e:
+            print(f"Error preloading embedding model: {str(e)}")
+    yield
+    llm_pool.executor.shutdown(wait=False, cancel_futures=True)
+    cpu_pool.executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="AI Quiz Generator API", lifespan=lifespan)
+
+
+class QuizRequest(BaseModel):
+    topic: str = Field(min_length=1)
+    difficulty: Literal["Easy", "Medium", "Hard"] = "Medium"
+    q_type: Literal["MCQ", "True/False", "Short Answer"] = "MCQ"
+    language: str = "English"
+    num_questions: int = Field(5, ge=1, le=15)
+    # Serve matching questions from the question bank before calling the LLM
+    use_bank: bool = True
+    exclude_ids: List[str] = []
+
+
+class RagQuizRequest(BaseModel):
+    topic: Optional[str] = None
+    difficulty: Literal["Easy", "Medium", "Hard"] = "Medium"
+    q_type: Literal["MCQ", "True/False", "Short Answer"] = "MCQ"
+    language: str = "English"
+    num_questions: int = Field(5, ge=1, le=10)
+    # Questions the client has already shown; repeats and paraphrases of them are regenerated
+    exclude_ids: List[str] = []
+
+
+def quiz_response(quiz, **extra):
+    return {"id": quiz.id, "metadata": quiz.metadata, "questions": quiz.question_dicts(), **extra}
+
+
+def store_quiz(questions, metadata, **extra):
+    store = get_quiz_store()
+    return quiz_response(store.get(store.add(questions, metadata)), **extra)
+
+
+def generate_questions(request):
+    """Blocking quiz generation; returns (questions, served from bank, error)"""
+    if request.use_bank:
+        result = get_question_bank().assemble_quiz(
+            request.topic, request.difficulty, request.q_type, request.language, request.num_questions,
+            exclude_ids=set(request.exclude_ids)
+        )
+        return result["questions"], result["from_bank"], result["error"]
+
+    raw_output = generate_quiz(request.topic, request.difficulty, request.q_type, request.language,
+                               request.num_questions)
+    if raw_output.startswith("Error"):
+        return [], 0, raw_output
+    dedup = get_question_dedup()
+    questions, _ = repair_quiz(
+        parse_quiz(raw_output, request.q_type), request.q_type,
+        lambda count, avoid_questions: generate_quiz(request.topic, request.difficulty, request.q_type,
+                                                     request.language, count, avoid_questions=avoid_questions),
+        duplicate_keys=dedup.canonical_ids, seen_keys=dedup.resolve(request.exclude_ids)
+    )
+    return questions, 0, None
+
+
+def generate_rag_questions(doc_id, vector_store, topic, request):
+    """Blocking PDF-based quiz generation; returns (questions, repair stats, error)"""
+    def rag_quiz(count, avoid_questions=None):
+        return generate_rag_quiz(topic, request.difficulty, request.q_type, vector_store, request.language, count,
+                                 outline=get_outline(doc_id), avoid_questions=avoid_questions)
+
+    raw_output = rag_quiz(request.num_questions)
+    if raw_output.startswith("Error"):
+        return [], None, raw_output
+    dedup = get_question_dedup()
+    questions, repair_stats = repair_quiz(parse_quiz(raw_output, request.q_type), request.q_type, rag_quiz,
+                                          duplicate_keys=dedup.canonical_ids,
+                                          seen_keys=dedup.resolve(request.exclude_ids))
+    return questions, repair_stats, None
+
+
+def index_document(doc_id, path, extension):
+    """Blocking text extraction and embedding of a spooled document"""
+    pdf_text = extract_text_from_document(path, path)
+    if pdf_text.startswith("Error"):
+        raise ValueError(pdf_text)
+    get_page_store().save_text(doc_id, pdf_text)
+    # Embedding runs in the CPU job processes; this thread only waits for it
+    start_indexing(doc_id, path if extension == ".pdf" else None).result()
+
+
+def render_pdf(*args, **kwargs):
+    """Blocking PDF rendering in the CPU job processes"""
+    return submit_job(get_pdf_download_link, *args, **kwargs).result()
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "pools": {"llm": llm_pool.stats(), "cpu": cpu_pool.stats()}}
+
+
+@app.post("/quizzes")
+async def create_quiz(request: QuizRequest):
+    questions, from_bank, error = await llm_pool.run(generate_questions, request)
+    if not questions:
+        raise HTTPException(status_code=502, detail=error or "No questions could be generated")
+    metadata = {"topic": request.topic, "difficulty": request.difficulty, "language": request.language,
+                "q_type": request.q_type, "num_questions": request.num_questions}
+    return store_quiz(questions, metadata, from_bank=from_bank, warning=error)
+
+
+@app.get("/quizzes/{quiz_id}")
+async def get_quiz(quiz_id: str):
+    quiz = get_quiz_store().get(quiz_id)
+    if quiz is None:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    return quiz_response(quiz)
+
+
+@app.get("/quizzes/{quiz_id}/pdf")
+async def export_quiz_pdf(quiz_id: str, show_answers: bool = False):
+    quiz = get_quiz_store().get(quiz_id)
+    if quiz is None:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    metadata = quiz.metadata
+    pdf_data = await cpu_pool.run(render_pdf, quiz.question_dicts(), metadata["topic"],
+                                  metadata["difficulty"], metadata["language"], show_answers=show_answers)
+    file_name = f"{metadata['topic'].replace(' ', '_')}_quiz.pdf"
+    return Response(pdf_data, media_type="application/pdf",
+                    headers={"Content-Disposition": f'attachment; filename="{file_name}"'})
+
+
+@app.post("/documents")
+async def ingest_document(file: UploadFile = File(...)):
+    extension = document_extension(file.filename)
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=415, detail=f"Unsupported file type, expected one of {', '.join(SUPPORTED_EXTENSIONS)}")
+    try:
+        doc_id, path = await cpu_pool.run(spool_upload, file.file, MAX_UPLOAD_BYTES, extension)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    cached = get_vector_store(doc_id) is not None
+    if not cached:
+        job = _ingest_jobs.get(doc_id)
+        if job is None:
+            job = _ingest_jobs[doc_id] = asyncio.ensure_future(cpu_pool.run(index_document, doc_id, path, extension))
+            job.add_done_callback(lambda _: _ingest_jobs.pop(doc_id, None))
+        try:
+            await asyncio.shield(job)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    return {"document_id": doc_id, "filename": file.filename, "cached": cached,
+            "outline_pending": outline_pending(doc_id)}
+
+
+@app.get("/documents/{doc_id}/outline")
+async def get_document_outline(doc_id: str):
+    if get_vector_store(doc_id) is None:
+        raise HTTPException(status_code=404, detail="Document not found, upload it again")
+    outline = get_outline(doc_id)
+    if outline is None:
+        return {"pending": outline_pending(doc_id), "suggested_topics": [], "sections": []}
+    sections = [{"title": s["title"], "chunks": len(s["chunk_ids"]), "keywords": s["keywords"]}
+                for s in outline.sections]
+    return {"pending": False, "suggested_topics": outline.suggested_topics, "sections": sections}
+
+
+@app.post("/documents/{doc_id}/quizzes")
+async def create_rag_quiz(doc_id: str, request: RagQuizRequest):
+    vector_store = get_vector_store(doc_id)
+    if vector_store is None:
+        raise HTTPException(status_code=404, detail="Document not found, upload it again")
+    topic = request.topic or "the main ideas of the document"
+    questions, repair_stats, error = await llm_pool.run(generate_rag_questions, doc_id, vector_store, topic, request)
+    if not questions:
+        raise HTTPException(status_code=502, detail=error or "No questions could be generated")
+    metadata = {"topic": topic, "difficulty": request.difficulty, "language": request.language,
+                "q_type": request.q_type, "num_questions": request.num_questions, "source": f"PDF: {doc_id[:12]}"}
+    return store_quiz(questions, metadata, repair=repair_stats)
@@ -0,0 +1,75 @@
+import re
+import hashlib
+import unicodedata
+
+# Pre-compiled patterns for the "### Question X" markdown format the prompts ask for
+QUESTION_SPLIT_RE = re.compile(r'###\s*Question\s*\d+')
+QUESTION_RE = re.compile(r'\*\*Question:\*\*\s*(.*?)(?:\n|$)', re.DOTALL)
+MCQ_OPTION_RE = re.compile(r'([A-D])\)\s*(.+?)(?:\n|$)')
+MCQ_ANSWER_RE = re.compile(r'\*\*Answer:\*\*\s*([A-D])')
+TF_ANSWER_RE = re.compile(r'\*\*Answer:\*\*\s*([AB])')
+SHORT_ANSWER_RE = re.compile(r'\*\*Answer:\*\*\s*(.+)')
+HINT_RE = re.compile(r'\*\*Hint:\*\*\s*(.+)')
+EXPLANATION_RE = re.compile(r'\*\*Explanation:\*\*\s*(.+)')
+NON_WORD_RE = re.compile(r'[^\w\s]')
+WHITESPACE_RE = re.compile(r'\s+')
+
+PARSE_ERROR_TEXT = "Question parsing error"
+
+
+def normalize_question_text(text):
+    """Normalize question text for comparisons (case, punctuation, spacing)"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = NON_WORD_RE.sub(" ", text)
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def question_id(question):
+    """Stable ID for a question dict, derived from its normalized question text"""
+    normalized = normalize_question_text(question["question"])
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def parse_question(q, q_type="MCQ"):
+    """Parse a single question block into a question dict"""
+    # Extract question text
+    question_match = QUESTION_RE.search(q)
+    question_text = question_match.group(1).strip() if question_match else PARSE_ERROR_TEXT
+
+    # Extract options and answer based on question type
+    options_dict = {}
+    if q_type == "True/False":
+        options_dict = {"A": "True", "B": "False"}
+        answer_match = TF_ANSWER_RE.search(q)
+    elif q_type == "Short Answer":
+        # No options for short answer
+        answer_match = SHORT_ANSWER_RE.search(q)
+    else:
+        # Default to MCQ if unknown type
+        options = MCQ_OPTION_RE.findall(q)
+        options_dict = {letter: text.strip() for letter, text in options}
+        answer_match = MCQ_ANSWER_RE.search(q)
+    correct_answer = answer_match.group(1).strip() if answer_match else None
+
+    hint = HINT_RE.search(q)
+    hint_text = hint.group(1).strip() if hint else "No hint provided"
+    explanation = EXPLANATION_RE.search(q)
+    explanation_text = explanation.group(1).strip() if explanation else "No explanation provided"
+
+    return {
+        "question": question_text,
+        "options": options_dict,
+        "answer": correct_answer,
+        "hint": hint_text,
+        "explanation": explanation_text
+    }
+
+
+def parse_quiz(raw_output, q_type="MCQ"):
+    """Parse raw LLM output into a list of question dicts"""
+    questions = QUESTION_SPLIT_RE.split(raw_output)
+    if len(questions) <= 1:
+        return []
+
+    # Skip the text before the first question (e.g. the model's reasoning)
+    return [parse_question(q, q_type) for q in questions[1:]]
@@ -0,0 +1,126 @@
+import os
+import time
+import functools
+import threading
+import collections
+import concurrent.futures
+from question_bank import get_question_bank
+
+# Prefetches run on their own small pool so they never take more than this many LLM calls from interactive users
+PREFETCH_WORKERS = int(os.getenv("QUIZ_PREFETCH_WORKERS", "1"))
+# Whether Play mode prefetches follow-up quizzes unless the player turns it off
+PREFETCH_BY_DEFAULT = os.getenv("QUIZ_PREFETCH", "1") == "1"
+# Follow-up quizzes a session can have queued, running or ready at once
+MAX_PREFETCHES_PER_SESSION = 2
+# Ready quizzes that were never played are dropped after this long
+PREFETCH_TTL_SECONDS = 30 * 60
+
+VARIANT_FIELDS = ("topic", "difficulty", "q_type", "language", "num_questions")
+HARDER = {"Easy": "Medium", "Medium": "Hard"}
+
+
+def follow_up_variants(metadata):
+    """Quiz settings a player likely wants next: the same topic again, then one level harder"""
+    same = {field: metadata[field] for field in VARIANT_FIELDS}
+    variants = [same]
+    if same["difficulty"] in HARDER:
+        variants.append({**same, "difficulty": HARDER[same["difficulty"]]})
+    return variants
+
+
+def variant_key(variant):
+    return tuple(variant[field] for field in VARIANT_FIELDS)
+
+
+class Prefetch:
+    def __init__(self, variant, future):
+        self.variant = variant
+        self.future = future
+        self.created_at = time.monotonic()
+
+    @property
+    def state(self):
+        """One of pending, ready or failed"""
+        if not self.future.done():
+            return "pending"
+        if self.future.cancelled() or self.future.exception() or not self.future.result()["questions"]:
+            return "failed"
+        return "ready"
+
+
+class QuizPrefetcher:
+    """Generates the quizzes a player will probably ask for next while they play.
+
+    Each session gets at most MAX_PREFETCHES_PER_SESSION prefetches; queuing
+    more cancels the oldest. A cancelled prefetch that is already waiting on
+    the LLM finishes in the background, but its result is discarded.
+    """
+
+    def __init__(self, workers=PREFETCH_WORKERS, per_session=MAX_PREFETCHES_PER_SESSION, ttl=PREFETCH_TTL_SECONDS):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self.per_session = per_session
+        self.ttl = ttl
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def start(self, session_id, metadata, exclude_ids=()):
+        """Queue the follow-up variants of a quiz that this session doesn't have yet"""
+        exclude_ids = frozenset(exclude_ids)
+        with self.lock:
+            self._expire()
+            prefetches = self.sessions.setdefault(session_id, collections.OrderedDict())
+            for variant in follow_up_variants(metadata):
+                key = variant_key(variant)
+                # Failed prefetches stay until they expire so a broken LLM isn't retried on every rerun
+                if key in prefetches:
+                    continue
+                # The quiz being played now matters more than older prefetches
+                while len(prefetches) >= self.per_session:
+                    _, oldest = prefetches.popitem(last=False)
+                    oldest.future.cancel()
+                future = self.executor.submit(self._generate, variant, exclude_ids)
+                prefetches[key] = Prefetch(variant, future)
+
+    def _generate(self, variant, exclude_ids):
+        # Left out of the bank's served counts until a player takes the quiz
+        return get_question_bank().assemble_quiz(**variant, exclude_ids=exclude_ids, record=False)
+
+    def status(self, session_id):
+        """(variant, state) of the session's prefetches, oldest first"""
+        with self.lock:
+            prefetches = list(self.sessions.get(session_id, {}).values())
+        return [(prefetch.variant, prefetch.state) for prefetch in prefetches]
+
+    def claim(self, session_id, variant):
+        """Take a ready prefetch out of the session; returns the assemble_quiz result or None"""
+        with self.lock:
+            prefetches = self.sessions.get(session_id, {})
+            prefetch = prefetches.get(variant_key(variant))
+            if prefetch is None or prefetch.state != "ready":
+                return None
+            del prefetches[variant_key(variant)]
+        result = prefetch.future.result()
+        get_question_bank().record_quiz(result)
+        return result
+
+    def cancel(self, session_id):
+        """Cancel and drop all of a session's prefetches"""
+        with self.lock:
+            prefetches = self.sessions.pop(session_id, {})
+        for prefetch in prefetches.values():
+            prefetch.future.cancel()
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for session_id in list(self.sessions):
+            prefetches = self.sessions[session_id]
+            for key in [key for key, prefetch in prefetches.items() if prefetch.created_at < cutoff]:
+                prefetches.pop(key).future.cancel()
+            if not prefetches:
+                del self.sessions[session_id]
+
+
+@functools.lru_cache(maxsize=1)
+def get_quiz_prefetcher():
+    """Prefetcher shared by all sessions"""
+    return QuizPrefetcher()
@@ -0,0 +1,129 @@
+import sys
+import json
+import hashlib
+import threading
+import functools
+import collections
+import weakref
+from dataclasses import dataclass
+from quiz_parser import question_id
+
+# Quizzes kept in the shared store before the least recently used are dropped
+MAX_QUIZZES = 5000
+
+
+def intern_text(text):
+    """Intern short repeated strings (letters, placeholders, metadata) so sessions share them"""
+    return sys.intern(text) if isinstance(text, str) and len(text) <= 64 else text
+
+
+@dataclass(frozen=True, slots=True, weakref_slot=True)
+class Question:
+    id: str
+    question: str
+    options: tuple  # ((letter, text), ...)
+    answer: object
+    hint: str
+    explanation: str
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            id=intern_text(data.get("id") or question_id(data)),
+            question=data["question"],
+            options=tuple((intern_text(letter), intern_text(text)) for letter, text in (data.get("options") or {}).items()),
+            answer=intern_text(data.get("answer")),
+            hint=intern_text(data.get("hint", "No hint provided")),
+            explanation=intern_text(data.get("explanation", "No explanation provided"))
+        )
+
+    def as_dict(self):
+        """The question as the plain dict the parser and PDF export use"""
+        return {
+            "id": self.id,
+            "question": self.question,
+            "options": dict(self.options),
+            "answer": self.answer,
+            "hint": self.hint,
+            "explanation": self.explanation
+        }
+
+    def to_row(self):
+        return [self.id, self.question, [list(option) for option in self.options], self.answer, self.hint, self.explanation]
+
+
+@dataclass(frozen=True, slots=True, weakref_slot=True)
+class Quiz:
+    id: str
+    metadata_items: tuple  # ((key, value), ...)
+    questions: tuple  # (Question, ...)
+
+    @property
+    def metadata(self):
+        return dict(self.metadata_items)
+
+    def question_dicts(self):
+        return [q.as_dict() for q in self.questions]
+
+
+def make_quiz(questions, metadata, quiz_id=None):
+    questions = tuple(q if isinstance(q, Question) else Question.from_dict(q) for q in questions)
+    metadata_items = tuple(sorted((intern_text(k), intern_text(v)) for k, v in metadata.items()))
+    if quiz_id is None:
+        # Content-addressed, so storing the same quiz twice keeps one copy
+        content = json.dumps([metadata_items, [q.to_row() for q in questions]], ensure_ascii=False)
+        quiz_id = hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+    return Quiz(quiz_id, metadata_items, questions)
+
+
+class QuizStore:
+    """Process-wide store of immutable quizzes; sessions keep quiz IDs and references, never copies.
+
+    Identical questions are shared between quizzes, so a question served by
+    the question bank to many sessions is held in memory once. The store
+    holds the MAX_QUIZZES most recently stored quizzes; an older quiz stays
+    available for as long as something else, such as a session that saved
+    it, still holds a reference to it.
+    """
+
+    def __init__(self, max_quizzes=MAX_QUIZZES):
+        self.max_quizzes = max_quizzes
+        self.lock = threading.Lock()
+        self._quizzes = collections.OrderedDict()
+        # Every quiz still referenced anywhere, including those evicted from _quizzes
+        self._live = weakref.WeakValueDictionary()
+        self._questions = weakref.WeakValueDictionary()
+
+    def _share_questions(self, questions):
+        shared = []
+        for question in questions:
+            existing = self._questions.get(question.id)
+            if existing is None or existing != question:
+                self._questions[question.id] = existing = question
+            shared.append(existing)
+        return tuple(shared)
+
+    def add(self, questions, metadata):
+        """Store a quiz and return its ID"""
+        quiz = make_quiz(questions, metadata)
+        with self.lock:
+            existing = self._quizzes.get(quiz.id) or self._live.get(quiz.id)
+            if existing is None:
+                existing = Quiz(quiz.id, quiz.metadata_items, self._share_questions(quiz.questions))
+                self._live[quiz.id] = existing
+            self._quizzes[quiz.id] = existing
+            self._quizzes.move_to_end(quiz.id)
+            while len(self._quizzes) > self.max_quizzes:
+                self._quizzes.popitem(last=False)
+        return quiz.id
+
+    def get(self, quiz_id):
+        """The quiz with this ID, or None if it is unknown or was evicted and is no longer referenced"""
+        with self.lock:
+            return self._quizzes.get(quiz_id) or self._live.get(quiz_id)
+
+
+@functools.lru_cache(maxsize=1)
+def get_quiz_store():
+    """Quiz store shared by all sessions"""
+    return QuizStore()
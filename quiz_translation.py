@@ -0,0 +1,147 @@
+import os
+import re
+import json
+import functools
+import concurrent.futures
+from dotenv import load_dotenv
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain_groq import ChatGroq
+from pdf_rag_utils import get_llm
+
+load_dotenv()
+
+# Strings per translation request; keeps responses short enough to come back as valid JSON
+BATCH_SIZE = 40
+MAX_PARALLEL_REQUESTS = 8
+# Optional offline model, e.g. "facebook/nllb-200-distilled-600M" (needs `transformers`)
+LOCAL_MODEL_NAME = os.getenv("QUIZ_TRANSLATION_MODEL")
+
+# FLORES-200 codes used by NLLB models for the languages offered in the app
+NLLB_CODES = {
+    "English": "eng_Latn", "French": "fra_Latn", "Japanese": "jpn_Jpan", "Korean": "kor_Hang",
+    "Arabic": "arb_Arab", "Hindi": "hin_Deva", "Dutch": "nld_Latn", "Swedish": "swe_Latn",
+    "Danish": "dan_Latn", "Greek": "ell_Grek", "Malayalam": "mal_Mlym", "Tamil": "tam_Taml",
+    "Kannada": "kan_Knda", "Turkish": "tur_Latn", "Hungarian": "hun_Latn", "Thai": "tha_Thai",
+    "Vietnamese": "vie_Latn"
+}
+
+# Static instructions first so backends with a prefix cache reuse them across batches
+TRANSLATION_PROMPT = """Translate every string in the JSON array at the end of this message.
+Keep the meaning, numbers, formulas, code and proper names unchanged.
+Return ONLY a JSON array with the translated strings, in the same order.
+
+Translate from {source_language} to {target_language}. The array has {count} strings:
+{strings}
+"""
+
+THINK_RE = re.compile(r"<think>.*?</think>", re.DOTALL)
+
+
+def quiz_strings(questions, q_type):
+    """The translatable text of a quiz, flattened in a fixed order"""
+    strings = []
+    for q in questions:
+        strings.append(q["question"])
+        strings.extend(text for _, text in sorted((q.get("options") or {}).items()))
+        # MCQ and True/False answers are option letters; short answers are text
+        if q_type == "Short Answer":
+            strings.append(q["answer"] or "")
+        strings.append(q.get("hint", ""))
+        strings.append(q.get("explanation", ""))
+    return strings
+
+
+def rebuild_questions(questions, q_type, translated):
+    """Put translated strings back into copies of the original questions"""
+    it = iter(translated)
+    rebuilt = []
+    for q in questions:
+        new_q = {"question": next(it)}
+        new_q["options"] = {letter: next(it) for letter, _ in sorted((q.get("options") or {}).items())}
+        new_q["answer"] = next(it) if q_type == "Short Answer" else q["answer"]
+        new_q["hint"] = next(it)
+        new_q["explanation"] = next(it)
+        rebuilt.append(new_q)
+    return rebuilt
+
+
+def parse_json_array(raw_output, count):
+    """Extract the JSON array of strings from the model's reply"""
+    text = THINK_RE.sub("", raw_output)
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end == -1:
+        raise ValueError("no JSON array in translation response")
+    values = json.loads(text[start:end + 1])
+    if len(values) != count:
+        raise ValueError(f"expected {count} translated strings, got {len(values)}")
+    return [str(value) for value in values]
+
+
+def translate_batch_llm(strings, source_language, target_language):
+    llm = get_llm(ChatGroq, temperature=0.2)
+    chain = PromptTemplate.from_template(TRANSLATION_PROMPT) | llm | StrOutputParser()
+    raw_output = chain.invoke({
+        "source_language": source_language,
+        "target_language": target_language,
+        "count": len(strings),
+        "strings": json.dumps(strings, ensure_ascii=False, indent=0)
+    })
+    return parse_json_array(raw_output, len(strings))
+
+
+@functools.lru_cache(maxsize=1)
+def get_local_translator():
+    """Local translation pipeline, or None if no offline model is configured or installed"""
+    if not LOCAL_MODEL_NAME:
+        return None
+    try:
+        from transformers import pipeline
+    except ImportError:
+        return None
+    return pipeline("translation", model=LOCAL_MODEL_NAME)
+
+
+def translate_batch_local(translator, strings, source_language, target_language):
+    # Empty strings are passed through; the model would invent text for them
+    to_translate = [s for s in strings if s.strip()]
+    outputs = translator(
+        to_translate,
+        src_lang=NLLB_CODES[source_language],
+        tgt_lang=NLLB_CODES[target_language],
+        max_length=512
+    )
+    translated = iter(output["translation_text"] for output in outputs)
+    return [next(translated) if s.strip() else s for s in strings]
+
+
+def translate_quiz(questions, q_type, source_language, target_languages):
+    """Translate one quiz into several languages in parallel batched requests.
+
+    Uses the local offline model when one is configured and supports both
+    languages, otherwise the LLM. Returns {language: questions} for the
+    languages that succeeded and {language: error message} for the rest.
+    """
+    strings = quiz_strings(questions, q_type)
+    batches = [strings[i:i + BATCH_SIZE] for i in range(0, len(strings), BATCH_SIZE)]
+    translator = get_local_translator()
+
+    def translate_batch(batch, target_language):
+        if translator and source_language in NLLB_CODES and target_language in NLLB_CODES:
+            return translate_batch_local(translator, batch, source_language, target_language)
+        return translate_batch_llm(batch, source_language, target_language)
+
+    targets = [language for language in target_languages if language != source_language]
+    translations, errors = {}, {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_PARALLEL_REQUESTS) as executor:
+        futures = {
+            language: [executor.submit(translate_batch, batch, language) for batch in batches]
+            for language in targets
+        }
+        for language, language_futures in futures.items():
+            try:
+                translated = [s for future in language_futures for s in future.result()]
+                translations[language] = rebuild_questions(questions, q_type, translated)
+            except Exception as e:
+                errors[language] = f"Error translating quiz: {str(e)}"
+    return translations, errors
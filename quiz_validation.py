@@ -0,0 +1,102 @@
+from quiz_parser import parse_quiz, normalize_question_text, PARSE_ERROR_TEXT
+
+MCQ_LETTERS = ("A", "B", "C", "D")
+TRUE_FALSE_LETTERS = ("A", "B")
+# Follow-up requests made for broken questions before giving up on them
+MAX_REPAIR_ROUNDS = 1
+
+
+def validate_question(question, q_type="MCQ"):
+    """Problems that make a question unusable; an empty list means it is fine.
+
+    Missing hints or explanations are not reported: the question can still be
+    played, so it is not worth an LLM call.
+    """
+    issues = []
+    text = question.get("question", "")
+    if not text or text == PARSE_ERROR_TEXT:
+        issues.append("question text missing")
+
+    answer = question.get("answer")
+    options = question.get("options") or {}
+    if q_type == "Short Answer":
+        if not answer:
+            issues.append("answer missing")
+        return issues
+
+    letters = TRUE_FALSE_LETTERS if q_type == "True/False" else MCQ_LETTERS
+    if answer not in letters:
+        issues.append("answer missing")
+    elif answer not in options:
+        issues.append(f"answer {answer} is not one of the options")
+    if q_type != "True/False":
+        if tuple(sorted(options)) != MCQ_LETTERS:
+            issues.append(f"expected 4 options, got {len(options)}")
+        normalized = [normalize_question_text(option) for option in options.values()]
+        if any(not option for option in normalized):
+            issues.append("empty option")
+        elif len(set(normalized)) < len(normalized):
+            issues.append("duplicate options")
+    return issues
+
+
+def text_keys(questions):
+    """Duplicate keys that only match identical questions: the normalized text"""
+    return [normalize_question_text(question.get("question", "")) for question in questions]
+
+
+def find_broken_questions(questions, q_type="MCQ", duplicate_keys=text_keys, seen_keys=()):
+    """Map the index of every malformed or duplicate question to its problems.
+
+    Questions whose `duplicate_keys` match an earlier question or one of
+    `seen_keys` are duplicates; pass QuestionDedupIndex.canonical_ids to
+    also catch paraphrases.
+    """
+    broken = {}
+    seen = set(seen_keys)
+    for i, (question, key) in enumerate(zip(questions, duplicate_keys(questions))):
+        issues = validate_question(question, q_type)
+        if key in seen:
+            issues.append("duplicate question")
+        seen.add(key)
+        if issues:
+            broken[i] = issues
+    return broken
+
+
+def repair_quiz(questions, q_type, regenerate, max_rounds=MAX_REPAIR_ROUNDS, duplicate_keys=text_keys, seen_keys=()):
+    """Replace broken questions with ones from small follow-up requests.
+
+    `regenerate(count, avoid_questions)` must return raw LLM output for
+    `count` new questions that differ from `avoid_questions`. Replacements go
+    into the broken questions' slots; questions still broken after
+    `max_rounds` are dropped. Duplicates are found as in
+    find_broken_questions. Returns (questions, stats).
+    """
+    questions = list(questions)
+    broken = find_broken_questions(questions, q_type, duplicate_keys, seen_keys)
+    stats = {"broken": len(broken), "repaired": 0, "dropped": 0, "requests": 0}
+
+    for _ in range(max_rounds):
+        if not broken:
+            break
+        valid = [q for i, q in enumerate(questions) if i not in broken]
+        raw_output = regenerate(len(broken), [q["question"] for q in valid])
+        stats["requests"] += 1
+        if raw_output.startswith("Error"):
+            break
+
+        known = set(duplicate_keys(valid)) | set(seen_keys)
+        replacements = []
+        candidates = parse_quiz(raw_output, q_type)
+        for candidate, key in zip(candidates, duplicate_keys(candidates)):
+            if not validate_question(candidate, q_type) and key not in known:
+                known.add(key)
+                replacements.append(candidate)
+        for i, replacement in zip(sorted(broken), replacements):
+            questions[i] = replacement
+            stats["repaired"] += 1
+        broken = find_broken_questions(questions, q_type, duplicate_keys, seen_keys)
+
+    stats["dropped"] = len(broken)
+    return [q for i, q in enumerate(questions) if i not in broken], stats
@@ -0,0 +1,120 @@
+import time
+import functools
+import threading
+import numpy as np
+import faiss
+from pdf_rag_utils import get_embeddings
+
+# Cosine similarity above which two topic requests are treated as the same quiz
+SIMILARITY_THRESHOLD = 0.85
+MAX_ENTRIES = 2000
+ENTRY_TTL_SECONDS = 7 * 24 * 3600
+# HNSW graph degree; the index is small, so this is plenty
+HNSW_NEIGHBORS = 32
+
+
+class SemanticCache:
+    """Cache of generated quizzes keyed by the meaning of the topic.
+
+    "Photosynthesis", "photosynthesis basics" and "how plants make food" embed
+    close together, so they share one cached quiz. Difficulty, question type,
+    language and question count must match exactly; only the topic is fuzzy.
+    The question bank stores each quiz it assembles as a list of parsed
+    question dicts.
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, max_entries=MAX_ENTRIES, ttl=ENTRY_TTL_SECONDS):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.partitions = {}
+        self.stats_data = {"hits": 0, "misses": 0, "lookup_s": 0.0, "generate_s": 0.0}
+
+    def _embed(self, topic):
+        vector = np.asarray([get_embeddings().embed_query(topic.strip())], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _new_partition(self, dim):
+        index = faiss.IndexHNSWFlat(dim, HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+        return {"index": index, "entries": []}
+
+    def _nearest(self, key, vector, k=4):
+        """Cache entries above the similarity threshold, most similar first"""
+        partition = self.partitions.get(key)
+        if partition is None or not partition["entries"]:
+            return []
+        scores, ids = partition["index"].search(vector, min(k, len(partition["entries"])))
+        return [partition["entries"][i] for score, i in zip(scores[0], ids[0]) if i >= 0 and score >= self.threshold]
+
+    def _lookup(self, key, vector):
+        """Unexpired cached outputs for a request, most similar first"""
+        now = time.time()
+        return [entry["output"] for entry in self._nearest(key, vector) if now - entry["created_at"] <= self.ttl]
+
+    def _store(self, key, vector, topic, output):
+        partition = self.partitions.get(key)
+        if partition is None:
+            partition = self.partitions[key] = self._new_partition(vector.shape[1])
+        partition["index"].add(vector)
+        partition["entries"].append({"topic": topic, "vector": vector, "output": output, "created_at": time.time()})
+        if len(partition["entries"]) > self.max_entries:
+            self._rebuild(key)
+
+    def _rebuild(self, key):
+        """HNSW cannot delete, so drop expired and oldest entries by rebuilding the partition"""
+        partition = self.partitions[key]
+        now = time.time()
+        entries = [e for e in partition["entries"] if now - e["created_at"] <= self.ttl][-self.max_entries // 2:]
+        rebuilt = self._new_partition(partition["index"].d)
+        if entries:
+            rebuilt["index"].add(np.vstack([e["vector"] for e in entries]))
+        rebuilt["entries"] = entries
+        self.partitions[key] = rebuilt
+
+    def lookup(self, topic, difficulty, q_type, language="English", num_questions=5, accept=None):
+        """Output cached for a near-duplicate request, or None.
+
+        Cached outputs `accept` rejects are skipped, so a caller can pass over
+        a quiz it must not serve again; only an accepted output counts as a hit.
+        """
+        key = (difficulty, q_type, language, num_questions)
+        start = time.perf_counter()
+        vector = self._embed(topic)
+        with self.lock:
+            outputs = self._lookup(key, vector)
+        output = next((output for output in outputs if accept is None or accept(output)), None)
+        with self.lock:
+            self.stats_data["lookup_s"] += time.perf_counter() - start
+            self.stats_data["hits" if output is not None else "misses"] += 1
+        return output
+
+    def store(self, topic, difficulty, q_type, language, num_questions, output, generate_s=0.0):
+        """Cache the output produced after a miss, which took `generate_s` seconds"""
+        key = (difficulty, q_type, language, num_questions)
+        vector = self._embed(topic)
+        with self.lock:
+            self.stats_data["generate_s"] += generate_s
+            self._store(key, vector, topic, output)
+
+    def stats(self):
+        """Hit rate and mean latencies of cache lookups and LLM calls on a miss"""
+        with self.lock:
+            hits, misses = self.stats_data["hits"], self.stats_data["misses"]
+            requests = hits + misses
+            return {
+                "requests": requests,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / requests if requests else 0.0,
+                "mean_lookup_ms": 1000 * self.stats_data["lookup_s"] / requests if requests else 0.0,
+                "mean_generate_ms": 1000 * self.stats_data["generate_s"] / misses if misses else 0.0,
+                "entries": sum(len(p["entries"]) for p in self.partitions.values())
+            }
+
+
+@functools.lru_cache(maxsize=1)
+def get_semantic_cache():
+    """Process-wide semantic cache shared by all sessions"""
+    return SemanticCache()
@@ -1,10 +1,24 @@
 import streamlit as st
-import re
+import os
 import json
 import time
-from Main import generate_quiz
-from pdf_rag_utils import extract_text_from_pdf, create_vector_store, generate_rag_quiz
+import uuid
+import concurrent.futures
+from pdf_rag_utils import generate_rag_quiz
 from pdf_utils import get_pdf_download_link, create_download_button
+from quiz_parser import parse_quiz, question_id
+from quiz_validation import repair_quiz
+from question_dedup import get_question_dedup
+from question_bank import get_question_bank
+from semantic_cache import get_semantic_cache
+from document_outline import start_indexing, get_vector_store, get_outline, outline_pending
+from cpu_jobs import submit_job, get_job
+from upload_store import spool_upload, get_page_store, UploadTooLarge
+from document_ingestion import extract_text_from_document, document_extension, SUPPORTED_EXTENSIONS
+from quiz_store import get_quiz_store
+from quiz_analytics import get_quiz_analytics, score_attempt, SCORES_TTL_SECONDS
+from quiz_translation import translate_quiz
+from quiz_prefetch import get_quiz_prefetcher, PREFETCH_BY_DEFAULT
 
 # Set page config
 st.set_page_config(
@@ -18,32 +32,199 @@ GENERATE_MODE = "Generate Quiz"
 PLAY_MODE = "Play Quiz"
 RAG_MODE = "PDF-Based Quiz"
 
+# How often pages poll background jobs (PDF indexing and rendering)
+JOB_POLL_SECONDS = 0.5
+# Characters of a page shown in the text preview
+PREVIEW_CHARS = 2000
+
+LANGUAGES = [
+    "English", "French", "Japanese", "Korean", "Arabic", "Hindi",
+    "Dutch", "Swedish", "Danish", "Greek", "Malayalam", "Tamil", "Kannada",
+    "Turkish", "Hungarian", "Thai", "Vietnamese"
+]
+
 # Initialize session state variables
-if "quiz_data" not in st.session_state:
-    st.session_state.quiz_data = []
+if "current_quiz_id" not in st.session_state:
+    st.session_state.current_quiz_id = None
 if "user_answers" not in st.session_state:
     st.session_state.user_answers = []
 if "quiz_submitted" not in st.session_state:
     st.session_state.quiz_submitted = False
 if "current_mode" not in st.session_state:
     st.session_state.current_mode = GENERATE_MODE
-if "saved_quizzes" not in st.session_state:
-    st.session_state.saved_quizzes = []
-if "quiz_metadata" not in st.session_state:
-    st.session_state.quiz_metadata = {
-        "topic": "",
-        "difficulty": "Medium",
-        "language": "English",
-        "q_type": "MCQ"
-    }
-if "pdf_text" not in st.session_state:
-    st.session_state.pdf_text = None
+if "saved_quiz_ids" not in st.session_state:
+    st.session_state.saved_quiz_ids = []
+if "saved_quiz_refs" not in st.session_state:
+    # References to the saved quizzes, so other sessions filling the shared store cannot evict them
+    st.session_state.saved_quiz_refs = {}
 if "vector_store" not in st.session_state:
     st.session_state.vector_store = None
 if "pdf_uploaded" not in st.session_state:
     st.session_state.pdf_uploaded = False
 if "pdf_filename" not in st.session_state:
     st.session_state.pdf_filename = ""
+if "pdf_file_id" not in st.session_state:
+    st.session_state.pdf_file_id = None
+if "seen_question_ids" not in st.session_state:
+    st.session_state.seen_question_ids = set()
+if "attempt_counts" not in st.session_state:
+    # Attempts this session recorded per quiz; they version the cached statistics of that quiz
+    st.session_state.attempt_counts = {}
+if "pdf_doc_id" not in st.session_state:
+    st.session_state.pdf_doc_id = None
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if "index_build" not in st.session_state:
+    # Staged indexing of the uploaded document, held until its full index is collected
+    st.session_state.index_build = None
+if "index_coverage" not in st.session_state:
+    # (last indexed page, total pages) while quizzes use a partial index
+    st.session_state.index_coverage = None
+if "prefetch_enabled" not in st.session_state:
+    st.session_state.prefetch_enabled = PREFETCH_BY_DEFAULT
+
+def set_rag_topic(topic):
+    """Fill the PDF quiz topic field with a suggested topic"""
+    st.session_state.rag_topic = topic
+
+def add_saved_quiz(questions, metadata):
+    """Put a quiz in the shared quiz store and the session's saved quizzes"""
+    quiz_store = get_quiz_store()
+    quiz_id = quiz_store.add(questions, metadata)
+    if quiz_id not in st.session_state.saved_quiz_ids:
+        st.session_state.saved_quiz_ids.append(quiz_id)
+    st.session_state.saved_quiz_refs[quiz_id] = quiz_store.get(quiz_id)
+    return quiz_id
+
+def save_quiz(questions, metadata):
+    """Put a quiz in the shared quiz store and make it the session's current quiz"""
+    quiz_id = add_saved_quiz(questions, metadata)
+    st.session_state.current_quiz_id = quiz_id
+    st.session_state.user_answers = [None] * len(questions)
+    st.session_state.quiz_submitted = False
+    st.session_state.attempt_result = None
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(job_id, label):
+    """Poll a background job without blocking the page; rerun the page once it finishes"""
+    job = get_job(job_id)
+    if job is None or job.done():
+        st.rerun()
+    text = f"{label} ({job.done_count}/{job.total})" if job.total else label
+    st.progress(job.fraction, text=text)
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def prefetch_progress(session_id):
+    """Wait for follow-up quizzes being prepared; rerun the page once none are pending"""
+    if all(state != "pending" for _, state in get_quiz_prefetcher().status(session_id)):
+        st.rerun()
+    st.caption("⏳ Preparing your next quiz in the background...")
+
+def toggle_prefetch():
+    if not st.session_state.prefetch_enabled:
+        get_quiz_prefetcher().cancel(st.session_state.session_id)
+
+def play_prefetched(variant):
+    """Make a prefetched follow-up quiz the one being played"""
+    result = get_quiz_prefetcher().claim(st.session_state.session_id, variant)
+    if result:
+        st.session_state.seen_question_ids.update(q["id"] for q in result["questions"])
+        save_quiz(result["questions"], dict(variant))
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def index_progress(build, label):
+    """Poll an index build; rerun the page when more of the document is searchable or the build ends"""
+    if build.done() or build.stages_done > build.collected:
+        st.rerun()
+    st.progress(build.fraction, text=f"{label} ({build.indexed_pages}/{build.total_pages} pages searchable)")
+
+def cancel_indexing():
+    if st.session_state.index_build:
+        st.session_state.index_build.cancel()
+
+def pdf_job_usable(job):
+    """Rendering jobs that failed or were cancelled are submitted again"""
+    return not job.done() or (not job.cancelled() and job.future.exception() is None)
+
+@st.cache_resource(max_entries=256, validate=pdf_job_usable, show_spinner=False)
+def render_quiz_pdf(quiz_id, show_answers):
+    """PDF rendering job for a quiz, shared by every session that exports it"""
+    quiz = get_quiz_store().get(quiz_id)
+    metadata = quiz.metadata
+    return submit_job(get_pdf_download_link, quiz.question_dicts(), metadata["topic"],
+                      metadata["difficulty"], metadata["language"], show_answers=show_answers)
+
+@st.fragment
+def pdf_options(quiz_id, radio_key, file_suffix):
+    """PDF download controls; switching the radio reruns only this fragment"""
+    quiz = get_quiz_store().get(quiz_id)
+    if quiz is None:
+        return
+    st.markdown("### 📄 PDF Options")
+    pdf_choice = st.radio(
+        "Choose PDF Content:",
+        ["Quiz Only", "Quiz with Answers"],
+        horizontal=True,
+        key=radio_key
+    )
+    
+    # Render the PDF in the CPU pool and offer it once ready
+    job = render_quiz_pdf(quiz_id, pdf_choice == "Quiz with Answers")
+    if not job.done():
+        job_progress(job.id, "Rendering PDF...")
+        return
+    file_name = f"{quiz.metadata['topic'].replace(' ', '_')}{file_suffix}"
+    try:
+        st.markdown(create_download_button(job.result(), file_name), unsafe_allow_html=True)
+    except Exception as e:
+        st.error(f"Error creating PDF: {str(e)}")
+
+@st.cache_data(max_entries=1000, show_spinner=False)
+def quiz_label(quiz_id):
+    """Display name of a saved quiz in Play mode"""
+    quiz = get_quiz_store().get(quiz_id)
+    metadata = quiz.metadata
+    topic = metadata.get("topic", "Untitled Quiz")
+    difficulty = metadata.get("difficulty", "Medium")
+    q_type = metadata.get("q_type", "MCQ")
+    num_q = len(quiz.questions)
+    source = metadata.get("source", "Custom")
+    
+    # Create a display name
+    if "PDF" in source:
+        display_name = f"{topic} (PDF-based, {difficulty}, {q_type}, {num_q} questions)"
+    else:
+        display_name = f"{topic} ({difficulty}, {q_type}, {num_q} questions)"
+    if "translation_group" in metadata:
+        display_name += f" - {metadata['language']}"
+    return display_name
+
+@st.cache_data(ttl=SCORES_TTL_SECONDS, max_entries=1000, show_spinner=False)
+def question_stats_rows(question_ids, version=0):
+    """Attempts and share of correct answers for each question of a quiz.
+
+    `version` changes when the session records an attempt at the quiz, so
+    its own answers show at once without clearing other quizzes' entries.
+    """
+    analytics = get_quiz_analytics()
+    question_stats = analytics.question_difficulty(analytics.load_answers(list(question_ids)))
+    rows = []
+    for i, qid in enumerate(question_ids):
+        if qid in question_stats.index:
+            stats = question_stats.loc[qid]
+            rows.append({"Question": i + 1, "Attempts": int(stats["attempts"]),
+                         "Answered correctly": f"{stats['p_correct']:.0%}"})
+    return rows
+
+@st.cache_data(ttl=SCORES_TTL_SECONDS, max_entries=1000, show_spinner=False)
+def session_mastery(session_id, version=0):
+    return get_quiz_analytics().topic_mastery(session_id)
+
+def current_quiz():
+    """The session's current quiz from the shared quiz store, if any"""
+    if st.session_state.current_quiz_id is None:
+        return None
+    return get_quiz_store().get(st.session_state.current_quiz_id)
 
 # Create sidebar navigation
 with st.sidebar:
@@ -78,6 +259,12 @@ with st.sidebar:
     - Customize number of questions
     - Download as PDF
     """)
+    
+    # Semantic cache performance
+    with st.expander("⚡ Cache Statistics"):
+        cache_stats = get_semantic_cache().stats()
+        st.metric("Hit rate", f"{cache_stats['hit_rate']:.0%}", help=f"{cache_stats['hits']} hits / {cache_stats['requests']} requests")
+        st.caption(f"Lookup: {cache_stats['mean_lookup_ms']:.1f} ms · Quiz on miss: {cache_stats['mean_generate_ms']:.0f} ms · {cache_stats['entries']} cached quizzes")
 
 # Main area content based on mode
 if st.session_state.current_mode == GENERATE_MODE:
@@ -94,35 +281,39 @@ if st.session_state.current_mode == GENERATE_MODE:
         with col1:
             topic = st.text_input("📚 Topic", placeholder="e.g., Ancient Egypt, JavaScript, Climate Change")
             difficulty = st.selectbox("🎯 Difficulty", ["Easy", "Medium", "Hard"])
-            language = st.selectbox("🌍 Language", [
-                "English", "French", "Japanese", "Korean", "Arabic", "Hindi", 
-                "Dutch", "Swedish","Danish", "Greek", "Malayalam","Tamil","Kannada",
-                "Turkish", "Hungarian", "Thai", "Vietnamese"
-            ])
+            language = st.selectbox("🌍 Language", LANGUAGES)
         
         with col2:
             q_type = st.selectbox("❓ Question type", ["MCQ", "True/False", "Short Answer"])
             num_questions = st.slider("🔢 Number of questions", min_value=3, max_value=15, value=5)
-            st.write("")  # Spacer
+            translate_to = st.multiselect("🌐 Also translate into", LANGUAGES)
         
         generate_button = st.form_submit_button("Generate Quiz", use_container_width=True)
     
     # Generate quiz when form is submitted
     if generate_button and topic.strip():
         with st.spinner(f"Generating {num_questions} quiz questions in {language}..."):
-            raw_output = generate_quiz(topic, difficulty, q_type, language, num_questions)
-            print(raw_output)
+            # Serve what we can from the question bank; the LLM only fills the gap
+            result = get_question_bank().assemble_quiz(
+                topic, difficulty, q_type, language, num_questions,
+                exclude_ids=st.session_state.seen_question_ids
+            )
             
-            # Check if raw_output is an error message
-            if raw_output.startswith("Error generating quiz:"):
-                st.error(raw_output)
+            # Check if generation failed
+            if result["error"] and not result["questions"]:
+                st.error(result["error"])
             else:
-                st.session_state.quiz_data = []
+                if result["error"]:
+                    st.warning(f"Only {len(result['questions'])} of {num_questions} questions could be prepared. {result['error']}")
+                if result["from_bank"]:
+                    st.info(f"⚡ {result['from_bank']} of {num_questions} questions served instantly from the question bank")
+                
+                st.session_state.current_quiz_id = None
                 st.session_state.user_answers = []
                 st.session_state.quiz_submitted = False
                 
                 # Save metadata
-                st.session_state.quiz_metadata = {
+                quiz_metadata = {
                     "topic": topic,
                     "difficulty": difficulty,
                     "language": language,
@@ -130,126 +321,46 @@ if st.session_state.current_mode == GENERATE_MODE:
                     "num_questions": num_questions
                 }
     
-                # Parse questions from raw LLM output with improved regex
-                questions = re.split(r'###\s*Question\s*\d+', raw_output)
-                if len(questions) > 1:  # Skip first empty split
-                    questions = questions[1:]
-                    
-                    for q in questions:
-                        # Extract question text
-                        question_match = re.search(r'\*\*Question:\*\*\s*(.*?)(?:\n|$)', q, re.DOTALL)
-                        question_text = question_match.group(1).strip() if question_match else "Question parsing error"
-                        
-                        # Extract options and answer based on question type
-                        options_dict = {}
-                        correct_answer = None
-                        q_type = st.session_state.quiz_metadata.get("q_type", "MCQ")
-                        
-                        if q_type == "MCQ":
-                            options = re.findall(r'([A-D])\)\s*(.+?)(?:\n|$)', q)
-                            options_dict = {letter: text.strip() for letter, text in options}
-                            answer_match = re.search(r'\*\*Answer:\*\*\s*([A-D])', q)
-                            hint= re.search(r'\*\*Hint:\*\*\s*(.+)', q)
-                            if hint:
-                                hint_text = hint.group(1).strip()
-                            else:       
-                                hint_text = "No hint provided"
-                            explanation = re.search(r'\*\*Explanation:\*\*\s*(.+)', q)
-                            if explanation:
-                                explanation_text = explanation.group(1).strip()
-                            else:
-                                explanation_text = "No explanation provided"
-                            # Extract the correct answer    
-                            if answer_match:
-                                correct_answer = answer_match.group(1).strip()
-                            else:   
-                                correct_answer = "No answer provided"
-
-
-                        elif q_type == "True/False":
-                            options_dict = {"A": "True", "B": "False"}
-                            answer_match = re.search(r'\*\*Answer:\*\*\s*([AB])', q)
-                            hint= re.search(r'\*\*Hint:\*\*\s*(.+)', q)
-                            if hint:
-                                hint_text = hint.group(1).strip()
-                            else:       
-                                hint_text = "No hint provided"
-                            explanation = re.search(r'\*\*Explanation:\*\*\s*(.+)', q)
-                            if explanation:
-                                explanation_text = explanation.group(1).strip()
-                            else:
-                                explanation_text = "No explanation provided"
-                            correct_answer = answer_match.group(1).strip() if answer_match else None
-
-                        elif q_type == "Short Answer":
-                            # No options for short answer
-                            answer_match = re.search(r'\*\*Answer:\*\*\s*(.+)', q)
-                            hint= re.search(r'\*\*Hint:\*\*\s*(.+)', q)
-                            if hint:
-                                hint_text = hint.group(1).strip()
-                            else:       
-                                hint_text = "No hint provided"
-                            explanation = re.search(r'\*\*Explanation:\*\*\s*(.+)', q)
-                            if explanation:
-                                explanation_text = explanation.group(1).strip()
-                            else:
-                                explanation_text = "No explanation provided"
-                            correct_answer = answer_match.group(1).strip() if answer_match else None
-                        
-                        st.session_state.quiz_data.append({
-                            "question": question_text,
-                            "options": options_dict,
-                            "answer": correct_answer,
-                            "hint": hint_text,
-                            "explanation": explanation_text
-                        })
-                    
-                    st.session_state.user_answers = [None] * len(st.session_state.quiz_data)
+                if result["questions"]:
+                    st.session_state.seen_question_ids.update(q["id"] for q in result["questions"])
                     
                     # Save quiz for later use
-                    new_quiz = {
-                        "metadata": st.session_state.quiz_metadata.copy(),
-                        "questions": st.session_state.quiz_data.copy()
-                    }
-                    st.session_state.saved_quizzes.append(new_quiz)
+                    save_quiz(result["questions"], quiz_metadata)
+                    
+                    # Translate the finished quiz instead of generating it again per language
+                    targets = [lang for lang in translate_to if lang != language]
+                    if targets:
+                        with st.spinner(f"Translating quiz into {', '.join(targets)}..."):
+                            translations, errors = translate_quiz(result["questions"], q_type, language, targets)
+                        for target, questions in translations.items():
+                            add_saved_quiz(questions, {
+                                **quiz_metadata,
+                                "language": target,
+                                "source_language": language,
+                                "translation_group": st.session_state.current_quiz_id
+                            })
+                        if translations:
+                            st.info(f"🌐 Also saved in {', '.join(translations)} - find them in Play Quiz mode")
+                        for target, error in errors.items():
+                            st.warning(f"{target}: {error}")
     
     # Display quiz preview and options
-    if st.session_state.quiz_data:
+    quiz = current_quiz()
+    if quiz:
+        quiz_metadata = quiz.metadata
         st.divider()
-        st.subheader(f"🧠 {st.session_state.quiz_metadata['topic'].title()} Quiz Preview")
+        st.subheader(f"🧠 {quiz_metadata['topic'].title()} Quiz Preview")
         
         # Options for the quiz
         col1, col2 = st.columns(2)
         with col1:
             # PDF Download options
-            st.markdown("### 📄 PDF Options")
-            pdf_options = st.radio(
-                "Choose PDF Content:",
-                ["Quiz Only", "Quiz with Answers"],
-                horizontal=True
-            )
-            
-            # Get PDF data
-            show_answers = pdf_options == "Quiz with Answers"
-            pdf_data = get_pdf_download_link(
-                st.session_state.quiz_data, 
-                st.session_state.quiz_metadata["topic"],
-                st.session_state.quiz_metadata["difficulty"],
-                st.session_state.quiz_metadata["language"],
-                show_answers=show_answers
-            )
-            
-            # Create download button
-            file_name = f"{st.session_state.quiz_metadata['topic'].replace(' ', '_')}_quiz.pdf"
-            st.markdown(
-                create_download_button(pdf_data, file_name),
-                unsafe_allow_html=True
-            )
+            pdf_options(quiz.id, "pdf_options", "_quiz.pdf")
         
         with col2:
             # Play options
             st.markdown("### 🎮 Play Options")
-            if st.session_state.quiz_metadata.get("q_type") != "Short Answer":
+            if quiz_metadata.get("q_type") != "Short Answer":
                 if st.button("Take This Quiz Now", type="primary", use_container_width=True):
                     st.session_state.current_mode = PLAY_MODE
                     st.session_state.quiz_submitted = False
@@ -259,21 +370,21 @@ if st.session_state.current_mode == GENERATE_MODE:
         
         # Display quiz preview
         with st.expander("Quiz Preview", expanded=True):
-            for i, q in enumerate(st.session_state.quiz_data):
-                st.markdown(f"**Q{i+1}: {q['question']}**")
+            for i, q in enumerate(quiz.questions):
+                st.markdown(f"**Q{i+1}: {q.question}**")
                 
                 # Display options
-                if q['options'] and isinstance(q['options'], dict):
-                    for letter, text in q['options'].items():
+                if q.options:
+                    for letter, text in q.options:
                         st.markdown(f"{letter}) {text}")
                 
                 # Show correct answer in the preview
-                if q['answer']:
-                    st.markdown(f"<span style='color:green'>Correct answer: {q['answer']}</span>", unsafe_allow_html=True)
+                if q.answer:
+                    st.markdown(f"<span style='color:green'>Correct answer: {q.answer}</span>", unsafe_allow_html=True)
                 # Show hint and explanation
-                if q.get('hint') or q.get('explanation'):   
-                    st.markdown(f"<span style='color:blue'>Hint: {q.get('hint', 'No hint provided')}</span>", unsafe_allow_html=True)
-                    st.markdown(f"<span style='color:purple'>Explanation: {q.get('explanation', 'No explanation provided')}</span>", unsafe_allow_html=True)
+                if q.hint or q.explanation:   
+                    st.markdown(f"<span style='color:blue'>Hint: {q.hint}</span>", unsafe_allow_html=True)
+                    st.markdown(f"<span style='color:purple'>Explanation: {q.explanation}</span>", unsafe_allow_html=True)
 
         # Save quiz button
                 st.divider()
@@ -283,70 +394,145 @@ elif st.session_state.current_mode == RAG_MODE:
     st.title("📄 PDF-Based Quiz Generator")
     
     st.markdown("""
-    Generate custom quizzes based on your own PDF documents. Upload a PDF, choose a topic, and let AI create relevant questions from your content.
+    Generate custom quizzes based on your own documents. Upload a PDF, Word, PowerPoint, HTML, Markdown or EPUB file, choose a topic, and let AI create relevant questions from your content.
     """)
     
-    # PDF Upload Section
-    st.subheader("1️⃣ Upload Your PDF Document")
+    # Document Upload Section
+    st.subheader("1️⃣ Upload Your Document")
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        uploaded_file = st.file_uploader("Choose a PDF file", type="pdf")
+        uploaded_file = st.file_uploader("Choose a PDF, Word, PowerPoint, HTML, Markdown or EPUB file",
+                                         type=[extension.lstrip(".") for extension in SUPPORTED_EXTENSIONS])
     
     with col2:
         if st.session_state.pdf_uploaded:
-            st.success(f"✅ PDF Uploaded: {st.session_state.pdf_filename}")
+            st.success(f"✅ Document Uploaded: {st.session_state.pdf_filename}")
     
-    # Process uploaded PDF
-    if uploaded_file is not None and (not st.session_state.pdf_uploaded or uploaded_file.name != st.session_state.pdf_filename):
-        with st.spinner("Processing PDF..."):
+    # Process uploaded document (file_id changes with every upload, even of the same file)
+    if uploaded_file is not None and uploaded_file.file_id != st.session_state.pdf_file_id:
+        with st.spinner("Processing document..."):
             # Save the filename
             st.session_state.pdf_filename = uploaded_file.name
+            st.session_state.pdf_file_id = uploaded_file.file_id
+            
+            # A new upload replaces a document that is still being indexed
+            cancel_indexing()
+            st.session_state.index_build = None
+            st.session_state.index_coverage = None
+            st.session_state.pop("preview_page", None)
             
-            # Read PDF content
-            pdf_bytes = uploaded_file.getvalue()
-            pdf_text = extract_text_from_pdf(pdf_bytes)
+            # Copy the upload to disk; extraction and the outline read it from there
+            extension = document_extension(uploaded_file.name)
+            try:
+                st.session_state.pdf_doc_id, doc_path = spool_upload(uploaded_file, extension=extension)
+            except UploadTooLarge as e:
+                st.session_state.pdf_doc_id, doc_path = None, None
+                st.error(str(e))
+            cached_store = get_vector_store(st.session_state.pdf_doc_id) if doc_path else None
+            pdf_text = "" if cached_store or not doc_path else extract_text_from_document(doc_path, uploaded_file.name)
             
-            if pdf_text.startswith("Error extracting text:"):
+            if not doc_path:
+                st.session_state.pdf_uploaded = False
+                st.session_state.vector_store = None
+            elif cached_store:
+                # Same document was indexed before, reuse its index and outline
+                st.session_state.vector_store = cached_store
+                st.session_state.pdf_uploaded = True
+                st.success(f"✅ Document processed successfully: {uploaded_file.name}")
+            elif pdf_text.startswith("Error extracting text:"):
                 st.error(pdf_text)
                 st.session_state.pdf_uploaded = False
-                st.session_state.pdf_text = None
                 st.session_state.vector_store = None
             else:
-                # Create vector store
-                st.session_state.pdf_text = pdf_text
-                
-                # Show a small preview of the extracted text
-                with st.expander("PDF Text Preview"):
-                    st.text(pdf_text[:500] + "..." if len(pdf_text) > 500 else pdf_text)
+                # Pages are kept on disk; the preview and the indexing job read them back
+                get_page_store().save_text(st.session_state.pdf_doc_id, pdf_text)
+                st.session_state.pdf_uploaded = False
+                st.session_state.vector_store = None
                 
-                # Create vector store
-                st.session_state.vector_store = create_vector_store(pdf_text)
-                if st.session_state.vector_store:
-                    st.session_state.pdf_uploaded = True
-                    st.success(f"✅ PDF processed successfully: {uploaded_file.name}")
-                else:
-                    st.error("Failed to create vector store from PDF")
-                    st.session_state.pdf_uploaded = False
+                # Embed in the CPU pool; the page polls the build instead of waiting for it
+                # PDF bookmarks seed the outline; other formats rely on their headings
+                pdf_path = doc_path if extension == ".pdf" else None
+                st.session_state.index_build = start_indexing(st.session_state.pdf_doc_id, pdf_path)
+    
+    # Preview of the extracted text, one page at a time
+    page_count = get_page_store().page_count(st.session_state.pdf_doc_id) if st.session_state.pdf_doc_id else 0
+    if page_count:
+        with st.expander("Text Preview"):
+            preview_page = st.number_input("Page", min_value=1, max_value=page_count, value=1, key="preview_page")
+            page_text = get_page_store().get_page(st.session_state.pdf_doc_id, preview_page)
+            st.text(page_text[:PREVIEW_CHARS] + "..." if len(page_text) > PREVIEW_CHARS else page_text)
+    
+    # Collect the pages embedded so far; quizzes can use them while the rest of the document is embedded
+    index_build = st.session_state.index_build
+    if index_build is not None:
+        try:
+            index_build.collect()
+        except concurrent.futures.CancelledError:
+            st.session_state.index_build = None
+            st.info("Document processing cancelled. Upload the file again to index all of it.")
+        except Exception as e:
+            st.session_state.index_build = None
+            print(f"Error creating vector store: {str(e)}")
+            st.error("Failed to create vector store from PDF")
+        # Pages indexed before a cancel or a failure stay usable
+        st.session_state.vector_store = index_build.vector_store
+        st.session_state.pdf_uploaded = index_build.vector_store is not None
+        if index_build.complete:
+            # The outline and topic suggestions start building in the background once the full index is collected
+            st.session_state.index_build = None
+            st.session_state.index_coverage = None
+            st.success(f"✅ Document processed successfully: {st.session_state.pdf_filename}")
+        else:
+            if index_build.vector_store is not None:
+                st.session_state.index_coverage = (index_build.indexed_pages, index_build.total_pages)
+            if st.session_state.index_build is not None:
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    index_progress(index_build, f"Embedding {st.session_state.pdf_filename}...")
+                with col2:
+                    st.button("✖ Cancel", key="cancel_indexing", on_click=cancel_indexing)
     
     # Quiz Generation Form - only show if PDF uploaded
     if st.session_state.pdf_uploaded and st.session_state.vector_store:
         st.divider()
         st.subheader("2️⃣ Configure Your Quiz")
         
+        # Freshness of the index the next quiz will be generated from
+        if st.session_state.index_coverage:
+            indexed_pages, total_pages = st.session_state.index_coverage
+            if st.session_state.index_build:
+                st.info(f"⏳ Still indexing: questions come from pages 1–{indexed_pages} of {total_pages} for now. "
+                        "Quizzes you generate later use more of the document automatically.")
+            else:
+                st.info(f"Only pages 1–{indexed_pages} of {total_pages} were indexed before processing stopped.")
+        
+        # Topic suggestions from the document outline
+        outline = get_outline(st.session_state.pdf_doc_id)
+        if outline and outline.suggested_topics:
+            st.markdown("**💡 Suggested topics from your document:**")
+            suggestion_cols = st.columns(min(4, len(outline.suggested_topics)))
+            for i, suggested_topic in enumerate(outline.suggested_topics):
+                with suggestion_cols[i % len(suggestion_cols)]:
+                    st.button(suggested_topic, key=f"suggested_topic_{i}", use_container_width=True,
+                              on_click=set_rag_topic, args=(suggested_topic,))
+        elif outline_pending(st.session_state.pdf_doc_id):
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.caption("⏳ Analysing document sections to suggest topics...")
+            with col2:
+                st.button("🔄 Refresh", key="refresh_outline")
+        
         with st.form("pdf_quiz_form"):
             col1, col2 = st.columns(2)
             
             with col1:
                 topic = st.text_input("📚 Topic or Focus Area", 
-                                      placeholder="Specify a topic from your PDF or leave blank for general questions")
+                                      placeholder="Specify a topic from your PDF or leave blank for general questions",
+                                      key="rag_topic")
                 difficulty = st.selectbox("🎯 Difficulty", ["Easy", "Medium", "Hard"])
-                language = st.selectbox("🌍 Language", [
-                "English", "French", "Japanese", "Korean", "Arabic", "Hindi", 
-                "Dutch", "Swedish","Danish", "Greek", "Malayalam","Tamil","Kannada",
-                "Turkish", "Hungarian", "Thai", "Vietnamese"
-            ])
+                language = st.selectbox("🌍 Language", LANGUAGES)
             
             with col2:
                 q_type = st.selectbox("❓ Question type", ["MCQ", "True/False", "Short Answer"])
@@ -359,7 +545,7 @@ elif st.session_state.current_mode == RAG_MODE:
         if generate_button:
             # Use the PDF filename as default topic if none provided
             if not topic.strip():
-                topic = st.session_state.pdf_filename.replace(".pdf", "").replace("_", " ").title()
+                topic = os.path.splitext(st.session_state.pdf_filename)[0].replace("_", " ").title()
             
             with st.spinner(f"Generating {num_questions} {difficulty} questions from your PDF..."):
                 raw_output = generate_rag_quiz(
@@ -368,19 +554,20 @@ elif st.session_state.current_mode == RAG_MODE:
                     q_type, 
                     st.session_state.vector_store,
                     language, 
-                    num_questions
+                    num_questions,
+                    outline=get_outline(st.session_state.pdf_doc_id)
                 )
                 
                 # Check if raw_output is an error message
                 if raw_output.startswith("Error generating RAG quiz:"):
                     st.error(raw_output)
                 else:
-                    st.session_state.quiz_data = []
+                    st.session_state.current_quiz_id = None
                     st.session_state.user_answers = []
                     st.session_state.quiz_submitted = False
                     
                     # Save metadata
-                    st.session_state.quiz_metadata = {
+                    quiz_metadata = {
                         "topic": topic,
                         "difficulty": difficulty,
                         "language": language,
@@ -388,123 +575,48 @@ elif st.session_state.current_mode == RAG_MODE:
                         "num_questions": num_questions,
                         "source": f"PDF: {st.session_state.pdf_filename}"
                     }
+                    if st.session_state.index_coverage:
+                        quiz_metadata["source"] += " (pages 1–{} of {}, partial index)".format(*st.session_state.index_coverage)
         
-                    # Parse questions from raw LLM output with improved regex
-                    questions = re.split(r'###\s*Question\s*\d+', raw_output)
-                    if len(questions) > 1:  # Skip first empty split
-                        questions = questions[1:]
-                        
-                        for q in questions:
-                            # Extract question text
-                            question_match = re.search(r'\*\*Question:\*\*\s*(.*?)(?:\n|$)', q, re.DOTALL)
-                            question_text = question_match.group(1).strip() if question_match else "Question parsing error"
-                            
-                            # Extract options and answer based on question type
-                            options_dict = {}
-                            correct_answer = None
-                            q_type = st.session_state.quiz_metadata.get("q_type", "MCQ")
-                            
-                            if q_type == "MCQ":
-                                options = re.findall(r'([A-D])\)\s*(.+?)(?:\n|$)', q)
-                                options_dict = {letter: text.strip() for letter, text in options}
-                                answer_match = re.search(r'\*\*Answer:\*\*\s*([A-D])', q)
-                                hint = re.search(r'\*\*Hint:\*\*\s*(.+)', q)
-                                if hint:
-                                    hint_text = hint.group(1).strip()
-                                else:       
-                                    hint_text = "No hint provided"
-                                explanation = re.search(r'\*\*Explanation:\*\*\s*(.+)', q)
-                                if explanation:
-                                    explanation_text = explanation.group(1).strip()
-                                else:
-                                    explanation_text = "No explanation provided"
-                                # Extract the correct answer
-                                correct_answer = answer_match.group(1).strip() if answer_match else None
-                            elif q_type == "True/False":
-                                options_dict = {"A": "True", "B": "False"}
-                                answer_match = re.search(r'\*\*Answer:\*\*\s*([AB])', q)
-                                hint= re.search(r'\*\*Hint:\*\*\s*(.+)', q)
-                                if hint:
-                                    hint_text = hint.group(1).strip()
-                                else:       
-                                    hint_text = "No hint provided"
-                                explanation = re.search(r'\*\*Explanation:\*\*\s*(.+)', q)
-                                if explanation:
-                                    explanation_text = explanation.group(1).strip()
-                                else:
-                                    explanation_text = "No explanation provided"
-                                correct_answer = answer_match.group(1).strip() if answer_match else None
-                            elif q_type == "Short Answer":
-                                # No options for short answer
-                                answer_match = re.search(r'\*\*Answer:\*\*\s*(.+)', q)
-                                hint= re.search(r'\*\*Hint:\*\*\s*(.+)', q)
-                                if hint:
-                                    hint_text = hint.group(1).strip()
-                                else:       
-                                    hint_text = "No hint provided"
-                                explanation = re.search(r'\*\*Explanation:\*\*\s*(.+)', q)
-                                if explanation:
-                                    explanation_text = explanation.group(1).strip()
-                                else:
-                                    explanation_text = "No explanation provided"
-                                correct_answer = answer_match.group(1).strip() if answer_match else None
-                            
-                            st.session_state.quiz_data.append({
-                                "question": question_text,
-                                "options": options_dict,
-                                "answer": correct_answer,
-                                "hint": hint_text,
-                                "explanation": explanation_text
-                            })
-                        
-                        st.session_state.user_answers = [None] * len(st.session_state.quiz_data)
-                        
+                    # Parse questions from raw LLM output
+                    # Validate locally and regenerate only the broken questions
+                    # Repeats and paraphrases of questions this session has seen count as broken too
+                    dedup = get_question_dedup()
+                    questions, repair_stats = repair_quiz(
+                        parse_quiz(raw_output, q_type), q_type,
+                        lambda count, avoid_questions: generate_rag_quiz(
+                            topic, difficulty, q_type, st.session_state.vector_store, language, count,
+                            outline=get_outline(st.session_state.pdf_doc_id), avoid_questions=avoid_questions
+                        ),
+                        duplicate_keys=dedup.canonical_ids, seen_keys=dedup.resolve(st.session_state.seen_question_ids)
+                    )
+                    if repair_stats["repaired"]:
+                        st.info(f"🔧 Regenerated {repair_stats['repaired']} malformed or duplicate question(s)")
+                    if repair_stats["dropped"]:
+                        st.warning(f"Dropped {repair_stats['dropped']} question(s) that could not be repaired")
+                    if questions:
+                        st.session_state.seen_question_ids.update(map(question_id, questions))
                         # Save quiz for later use
-                        new_quiz = {
-                            "metadata": st.session_state.quiz_metadata.copy(),
-                            "questions": st.session_state.quiz_data.copy()
-                        }
-                        st.session_state.saved_quizzes.append(new_quiz)
+                        save_quiz(questions, quiz_metadata)
         
         # Display RAG-based quiz preview and options
-        if st.session_state.quiz_data:
+        quiz = current_quiz()
+        if quiz:
+            quiz_metadata = quiz.metadata
             st.divider()
-            st.subheader(f"🧠 {st.session_state.quiz_metadata['topic'].title()} Quiz Preview")
-            st.info(f"Source: {st.session_state.quiz_metadata.get('source', 'PDF Document')}")
+            st.subheader(f"🧠 {quiz_metadata['topic'].title()} Quiz Preview")
+            st.info(f"Source: {quiz_metadata.get('source', 'PDF Document')}")
             
             # Options for the quiz
             col1, col2 = st.columns(2)
             with col1:
                 # PDF Download options
-                st.markdown("### 📄 PDF Options")
-                pdf_options = st.radio(
-                    "Choose PDF Content:",
-                    ["Quiz Only", "Quiz with Answers"],
-                    horizontal=True,
-                    key="rag_pdf_options"
-                )
-                
-                # Get PDF data
-                show_answers = pdf_options == "Quiz with Answers"
-                pdf_data = get_pdf_download_link(
-                    st.session_state.quiz_data, 
-                    st.session_state.quiz_metadata["topic"],
-                    st.session_state.quiz_metadata["difficulty"],
-                    st.session_state.quiz_metadata["language"],
-                    show_answers=show_answers
-                )
-                
-                # Create download button
-                file_name = f"{st.session_state.quiz_metadata['topic'].replace(' ', '_')}_pdf_quiz.pdf"
-                st.markdown(
-                    create_download_button(pdf_data, file_name),
-                    unsafe_allow_html=True
-                )
+                pdf_options(quiz.id, "rag_pdf_options", "_pdf_quiz.pdf")
             
             with col2:
                 # Play options
                 st.markdown("### 🎮 Play Options")
-                if st.session_state.quiz_metadata.get("q_type") != "Short Answer":
+                if quiz_metadata.get("q_type") != "Short Answer":
                     if st.button("Take This Quiz Now", type="primary", use_container_width=True, key="rag_take_quiz"):
                         st.session_state.current_mode = PLAY_MODE
                         st.session_state.quiz_submitted = False
@@ -514,21 +626,21 @@ elif st.session_state.current_mode == RAG_MODE:
             
             # Display quiz preview
             with st.expander("Quiz Preview", expanded=True):
-                for i, q in enumerate(st.session_state.quiz_data):
-                    st.markdown(f"**Q{i+1}: {q['question']}**")
+                for i, q in enumerate(quiz.questions):
+                    st.markdown(f"**Q{i+1}: {q.question}**")
                     
                     # Display options
-                    if q['options'] and isinstance(q['options'], dict):
-                        for letter, text in q['options'].items():
+                    if q.options:
+                        for letter, text in q.options:
                             st.markdown(f"{letter}) {text}")
                     
                     # Show correct answer in the preview
-                    if q['answer']:
-                        st.markdown(f"<span style='color:green'>Correct answer: {q['answer']}</span>", unsafe_allow_html=True)
+                    if q.answer:
+                        st.markdown(f"<span style='color:green'>Correct answer: {q.answer}</span>", unsafe_allow_html=True)
                     # Show hint and explanation
-                    if q.get('hint') or q.get('explanation'):
-                        st.markdown(f"<span style='color:blue'>Hint: {q.get('hint', 'No hint provided')}</span>", unsafe_allow_html=True)
-                        st.markdown(f"<span style='color:purple'>Explanation: {q.get('explanation', 'No explanation provided')}</span>", unsafe_allow_html=True)
+                    if q.hint or q.explanation:
+                        st.markdown(f"<span style='color:blue'>Hint: {q.hint}</span>", unsafe_allow_html=True)
+                        st.markdown(f"<span style='color:purple'>Explanation: {q.explanation}</span>", unsafe_allow_html=True)
                     
                     st.divider()
 
@@ -536,8 +648,12 @@ elif st.session_state.current_mode == RAG_MODE:
 elif st.session_state.current_mode == PLAY_MODE:
     st.title("🎮 Play Quiz")
     
+    # Saved quizzes that are still in the shared store
+    quiz_store = get_quiz_store()
+    saved_quizzes = [quiz for quiz in map(quiz_store.get, st.session_state.saved_quiz_ids) if quiz]
+    
     # Check if there are saved quizzes
-    if not st.session_state.saved_quizzes:
+    if not saved_quizzes:
         st.warning("No saved quizzes found. Please generate a quiz first.")
         
         if st.button("Generate a New Quiz", type="primary"):
@@ -548,42 +664,38 @@ elif st.session_state.current_mode == PLAY_MODE:
         st.subheader("Select a Quiz to Play")
         
         # Create a list of quiz names for selection
-        quiz_names = []
-        for i, quiz in enumerate(st.session_state.saved_quizzes):
-            metadata = quiz["metadata"]
-            topic = metadata.get("topic", "Untitled Quiz")
-            difficulty = metadata.get("difficulty", "Medium")
-            q_type = metadata.get("q_type", "MCQ")
-            num_q = len(quiz["questions"])
-            source = metadata.get("source", "Custom")
-            
-            # Create a display name
-            if "PDF" in source:
-                display_name = f"{topic} (PDF-based, {difficulty}, {q_type}, {num_q} questions)"
-            else:
-                display_name = f"{topic} ({difficulty}, {q_type}, {num_q} questions)"
-            
-            quiz_names.append(display_name)
+        quiz_names = [quiz_label(quiz.id) for quiz in saved_quizzes]
         
-        # Let user select a quiz
+        # Let user select a quiz, defaulting to the current one
+        quiz_ids = [quiz.id for quiz in saved_quizzes]
+        default_index = quiz_ids.index(st.session_state.current_quiz_id) if st.session_state.current_quiz_id in quiz_ids else 0
         selected_quiz_index = st.selectbox(
             "Choose a quiz to play:",
             range(len(quiz_names)),
+            index=default_index,
             format_func=lambda i: quiz_names[i]
         )
         
         # Get the selected quiz data
-        selected_quiz = st.session_state.saved_quizzes[selected_quiz_index]
-        quiz_metadata = selected_quiz["metadata"]
-        quiz_data = selected_quiz["questions"]
+        selected_quiz = saved_quizzes[selected_quiz_index]
+        quiz_metadata = selected_quiz.metadata
+        quiz_data = selected_quiz.questions
         
         # Check if it's a new quiz selection or continuing with current quiz
-        if "current_quiz_index" not in st.session_state or st.session_state.current_quiz_index != selected_quiz_index:
-            st.session_state.current_quiz_index = selected_quiz_index
-            st.session_state.quiz_data = quiz_data
-            st.session_state.quiz_metadata = quiz_metadata
+        if st.session_state.get("play_quiz_id") != selected_quiz.id:
+            st.session_state.play_quiz_id = selected_quiz.id
+            st.session_state.current_quiz_id = selected_quiz.id
             st.session_state.user_answers = [None] * len(quiz_data)
             st.session_state.quiz_submitted = False
+            st.session_state.attempt_result = None
+        
+        # Generate the likely next quizzes while this one is played (topic quizzes only, PDF quizzes need the document)
+        st.toggle("⚡ Prepare follow-up quizzes in the background", key="prefetch_enabled", on_change=toggle_prefetch)
+        if st.session_state.prefetch_enabled and "source" not in quiz_metadata:
+            get_quiz_prefetcher().start(
+                st.session_state.session_id, quiz_metadata,
+                exclude_ids=st.session_state.seen_question_ids | {q.id for q in quiz_data}
+            )
         
         # Display quiz information
         st.markdown(f"### 📚 {quiz_metadata['topic'].title()}")
@@ -607,12 +719,12 @@ elif st.session_state.current_mode == PLAY_MODE:
         with st.form("quiz_play_form"):
             for i, question in enumerate(quiz_data):
                 st.markdown(f"### Question {i+1}")
-                st.markdown(f"**{question['question']}**")
+                st.markdown(f"**{question.question}**")
                 
                 # Display options based on question type
                 if quiz_metadata.get("q_type") == "MCQ":
                     # Use radio buttons for MCQ
-                    options = list(question['options'].items())
+                    options = question.options
                     radio_options = [f"{letter}) {text}" for letter, text in options]
                     letter_only_options = [letter for letter, _ in options]
                     
@@ -648,24 +760,28 @@ elif st.session_state.current_mode == PLAY_MODE:
             
             if submit_quiz:
                 st.session_state.quiz_submitted = True
+                # Score and log the attempt for analytics
+                st.session_state.attempt_result = get_quiz_analytics().record_attempt(
+                    st.session_state.session_id, selected_quiz, st.session_state.user_answers
+                )
+                # Include this attempt in the statistics shown below
+                attempt_counts = st.session_state.attempt_counts
+                attempt_counts[selected_quiz.id] = attempt_counts.get(selected_quiz.id, 0) + 1
         
         # Show results if quiz is submitted
         if st.session_state.quiz_submitted:
             st.divider()
             st.subheader("📊 Quiz Results")
             
-            # Calculate score
-            correct_answers = 0
+            # Score computed when the quiz was submitted
+            if st.session_state.get("attempt_result") is None:
+                st.session_state.attempt_result = score_attempt([q.answer for q in quiz_data], st.session_state.user_answers)
+            correctness, correct_answers = st.session_state.attempt_result
             total_questions = len(quiz_data)
             
             # Display results for each question
-            for i, (question, user_answer) in enumerate(zip(quiz_data, st.session_state.user_answers)):
-                correct = question["answer"]
-                
-                # Check if user answered correctly
-                is_correct = user_answer == correct
-                if is_correct:
-                    correct_answers += 1
+            for i, (question, user_answer, is_correct) in enumerate(zip(quiz_data, st.session_state.user_answers, correctness)):
+                correct = question.answer
                 
                 # Display question result
                 if is_correct:
@@ -697,15 +813,41 @@ elif st.session_state.current_mode == PLAY_MODE:
             else:
                 st.markdown("### 📚 Keep learning! Review the material and try again.")
             
+            # How everyone else did on these questions
+            with st.expander("📈 Question Statistics (all players)"):
+                rows = question_stats_rows(tuple(q.id for q in quiz_data),
+                                           st.session_state.attempt_counts.get(selected_quiz.id, 0))
+                st.dataframe(rows, hide_index=True, use_container_width=True)
+                mastery = session_mastery(st.session_state.session_id, sum(st.session_state.attempt_counts.values()))
+                if not mastery.empty:
+                    st.markdown("**Your topic mastery**")
+                    st.dataframe(mastery.rename(columns={"attempts": "Answers", "mastery": "Correct"}), use_container_width=True)
+            
             # Options to try again or create new quiz
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("Try Again", use_container_width=True):
                     st.session_state.user_answers = [None] * len(quiz_data)
                     st.session_state.quiz_submitted = False
+                    st.session_state.attempt_result = None
                     st.rerun()
             
             with col2:
                 if st.button("Create New Quiz", use_container_width=True):
                     st.session_state.current_mode = GENERATE_MODE
-                    st.rerun()
\ No newline at end of file
+                    st.rerun()
+            
+            # Follow-up quizzes prepared while this one was played
+            prefetches = get_quiz_prefetcher().status(st.session_state.session_id) if st.session_state.prefetch_enabled else []
+            ready = [variant for variant, state in prefetches if state == "ready"]
+            pending = any(state == "pending" for _, state in prefetches)
+            if ready or pending:
+                st.markdown("### 🚀 Up Next")
+            if ready:
+                next_cols = st.columns(len(ready))
+                for i, variant in enumerate(ready):
+                    with next_cols[i]:
+                        st.button(f"⚡ {variant['topic'].title()} ({variant['difficulty']})", key=f"prefetched_{i}",
+                                  use_container_width=True, on_click=play_prefetched, args=(variant,))
+            if pending:
+                prefetch_progress(st.session_state.session_id)
\ No newline at end of file
@@ -0,0 +1,7 @@
+import os
+
+# Run CPU jobs on threads in this process, so patched embeddings reach them
+os.environ.setdefault("CPU_JOB_WORKERS", "0")
+
+# Import PyMuPDF before faiss, as the app does; imported after it, its SWIG vector types shadow faiss's
+import pdf_rag_utils  # noqa: E402,F401
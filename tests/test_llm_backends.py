@@ -0,0 +1,62 @@
+import sys
+import time
+import types
+import threading
+import concurrent.futures
+from langchain_groq import ChatGroq
+import llm_backends
+import pdf_rag_utils
+
+
+def test_backend_set_after_import(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "openai")
+    monkeypatch.setenv("LOCAL_LLM_URL", "http://127.0.0.1:9999/v1")
+    llm = pdf_rag_utils.get_llm(ChatGroq, temperature=0.3)
+    assert isinstance(llm, llm_backends.OpenAICompatibleChat)
+    assert llm.base_url == "http://127.0.0.1:9999/v1"
+
+    monkeypatch.setenv("LLM_BACKEND", "llamacpp")
+    assert isinstance(pdf_rag_utils.get_llm(ChatGroq, temperature=0.3), llm_backends.LlamaCppChat)
+
+
+def test_groq_by_default(monkeypatch):
+    monkeypatch.delenv("LLM_BACKEND", raising=False)
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    assert isinstance(pdf_rag_utils.get_llm(ChatGroq, temperature=0.3), ChatGroq)
+
+
+def test_llamacpp_instances_answer_in_parallel(monkeypatch, tmp_path):
+    class FakeLlama:
+        running = 0
+        most_running = 0
+        lock = threading.Lock()
+
+        def __init__(self, **kwargs):
+            self.n_threads = kwargs["n_threads"]
+
+        def set_cache(self, cache):
+            pass
+
+        def create_chat_completion(self, **kwargs):
+            with FakeLlama.lock:
+                FakeLlama.running += 1
+                FakeLlama.most_running = max(FakeLlama.most_running, FakeLlama.running)
+            time.sleep(0.05)
+            with FakeLlama.lock:
+                FakeLlama.running -= 1
+            return {"choices": [{"message": {"content": "ok"}}]}
+
+    monkeypatch.setitem(sys.modules, "llama_cpp", types.SimpleNamespace(Llama=FakeLlama, LlamaRAMCache=dict))
+    monkeypatch.setenv("GGUF_MODEL_PATH", str(tmp_path / "model.gguf"))
+    monkeypatch.setattr(llm_backends, "LLAMA_INSTANCES", 2)
+    monkeypatch.setattr(llm_backends, "LLAMA_THREADS", 8)
+    llm_backends.get_llama_pool.cache_clear()
+    try:
+        llm = llm_backends.LlamaCppChat()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
+            outputs = list(executor.map(lambda _: llm.invoke("hi").content, range(6)))
+        assert outputs == ["ok"] * 6
+        assert FakeLlama.most_running == 2
+        assert all(llama.n_threads == 4 for llama in llm_backends.get_llama_pool().queue)
+    finally:
+        llm_backends.get_llama_pool.cache_clear()
@@ -0,0 +1,44 @@
+import time
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+import document_outline
+import pdf_rag_utils
+from benchmarks.synthetic_pdf import make_pdf
+from document_outline import IndexBuild, document_id, get_outline, stage_ends
+from pdf_rag_utils import build_vector_store, embed_chunks, extract_text_from_pdf, retrieve_for_quiz, split_text
+
+
+@pytest.fixture(autouse=True)
+def fake_embeddings(monkeypatch):
+    embeddings = DeterministicFakeEmbedding(size=64)
+    monkeypatch.setattr(pdf_rag_utils, "get_embeddings", lambda: embeddings)
+    monkeypatch.setattr(document_outline, "get_embeddings", lambda: embeddings)
+
+
+def wait_for_outline(doc_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while (outline := get_outline(doc_id)) is None:
+        assert time.monotonic() < deadline, "outline was not built"
+        time.sleep(0.05)
+    return outline
+
+
+def test_full_outline_with_partial_store():
+    pdf = make_pdf(30, seed=3)
+    doc_id = document_id(pdf)
+    chunks, metadatas = split_text(extract_text_from_pdf(pdf))
+    # Another session finished indexing the same document, registering its full outline
+    IndexBuild(doc_id, chunks, metadatas).result()
+    outline = wait_for_outline(doc_id)
+
+    # This session has only collected the first stage
+    end = stage_ends(metadatas)[0]
+    partial = build_vector_store(chunks[:end], embed_chunks(chunks[:end]), metadatas[:end])
+    sections = [s for s in outline.sections if max(s["chunk_ids"]) >= partial.index.ntotal]
+    assert sections
+
+    for section in sections:
+        allocations = retrieve_for_quiz(section["title"], partial, 5, outline)
+        assert allocations
+        for _, documents in allocations:
+            assert documents and all(doc.page_content in chunks[:end] for doc in documents)
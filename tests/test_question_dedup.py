@@ -0,0 +1,43 @@
+import pytest
+from question_dedup import QuestionDedupIndex, numbers
+
+
+@pytest.fixture
+def dedup(tmp_path):
+    return QuestionDedupIndex(str(tmp_path / "question_dedup.db"), use_embeddings=False)
+
+
+def canonical(dedup, *texts):
+    return dedup.canonical_ids([{"question": text} for text in texts])
+
+
+@pytest.mark.parametrize("word", ["i", "mix", "dim", "civil", "mid", "I", "MIX", "Civil"])
+def test_roman_looking_words_are_not_numbers(word):
+    assert not numbers(f"Which colours do painters {word} to get green")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("What started World War I", {"i"}),
+    ("Which events led to world war ii", {"ii"}),
+    ("Who succeeded Henry VIII", {"viii"}),
+    ("What does Part IV of the treaty cover", {"iv"}),
+    ("What happened in 1914 and 1918", {"1914", "1918"}),
+    ("Why do I need a catalyst", set()),
+])
+def test_numbers(text, expected):
+    assert numbers(text) == expected
+
+
+@pytest.mark.parametrize("word", ["mix", "dim", "civil", "mid", "I"])
+def test_paraphrase_differing_in_roman_looking_word_is_merged(dedup, word):
+    first, second = canonical(dedup,
+                              f"What colours do painters {word} together to get a bright shade of green",
+                              "What colours do painters together to get a bright shade of green")
+    assert first == second
+
+
+def test_different_numbers_are_not_merged(dedup):
+    first, second = canonical(dedup,
+                              "What were the main causes of World War I in Europe and its colonies",
+                              "What were the main causes of World War II in Europe and its colonies")
+    assert first != second
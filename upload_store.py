@@ -0,0 +1,130 @@
+import os
+import time
+import sqlite3
+import hashlib
+import tempfile
+import functools
+import threading
+from pdf_extraction import PAGE_BREAK
+from document_ingestion import SUPPORTED_EXTENSIONS
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "quiz_uploads"))
+PAGE_STORE_PATH = os.getenv("PAGE_STORE_PATH", os.path.join(UPLOAD_DIR, "pages.db"))
+# Keep in line with server.maxUploadSize in .streamlit/config.toml
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "100"))
+# Spooled documents and their pages are deleted after this long without a new upload of the same file
+UPLOAD_TTL_SECONDS = 24 * 3600
+SPOOL_BLOCK_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def upload_path(doc_id, extension=".pdf"):
+    return os.path.join(UPLOAD_DIR, f"{doc_id}{extension}")
+
+
+def spool_upload(file_obj, max_bytes=MAX_UPLOAD_MB * 1024 * 1024, extension=".pdf"):
+    """Copy an uploaded file to disk block by block and return (doc_id, path).
+
+    The file keeps its `extension`, which decides how its text is extracted.
+
+    The document ID is the same content hash as document_id(), computed while
+    copying, so the upload is never held in memory as one bytes object.
+    Raises UploadTooLarge once more than `max_bytes` have been read.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    prune_uploads()
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=".part", delete=False) as spool:
+        try:
+            file_obj.seek(0)
+            while block := file_obj.read(SPOOL_BLOCK_BYTES):
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"The file is larger than the {max_bytes // (1024 * 1024)} MB upload limit")
+                digest.update(block)
+                spool.write(block)
+        except BaseException:
+            spool.close()
+            os.remove(spool.name)
+            raise
+    doc_id = digest.hexdigest()
+    path = upload_path(doc_id, extension)
+    # Identical uploads share one file
+    os.replace(spool.name, path)
+    return doc_id, path
+
+
+def prune_uploads():
+    """Delete spooled documents and stored pages that have expired.
+
+    Only files the spooler writes are touched, since UPLOAD_DIR may be shared
+    with other files.
+    """
+    cutoff = time.time() - UPLOAD_TTL_SECONDS
+    expired = []
+    for name in os.listdir(UPLOAD_DIR):
+        path = os.path.join(UPLOAD_DIR, name)
+        doc_id, extension = os.path.splitext(name)
+        if extension in (*SUPPORTED_EXTENSIONS, ".part") and os.path.getmtime(path) < cutoff:
+            if extension != ".part":
+                expired.append(doc_id)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    if expired:
+        get_page_store().delete(expired)
+
+
+class PageStore:
+    """Extracted page text of uploaded documents, read back one page at a time"""
+
+    def __init__(self, path=PAGE_STORE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages (doc_id TEXT NOT NULL, page INTEGER NOT NULL, text TEXT NOT NULL, "
+            "PRIMARY KEY (doc_id, page))"
+        )
+
+    def save_text(self, doc_id, pdf_text):
+        """Store extracted text, split into its pages"""
+        with self.lock:
+            self.conn.execute("DELETE FROM pages WHERE doc_id = ?", (doc_id,))
+            self.conn.executemany(
+                "INSERT INTO pages (doc_id, page, text) VALUES (?, ?, ?)",
+                ((doc_id, number, text) for number, text in enumerate(pdf_text.split(PAGE_BREAK), start=1))
+            )
+            self.conn.commit()
+
+    def page_count(self, doc_id):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pages WHERE doc_id = ?", (doc_id,)).fetchone()[0]
+
+    def get_page(self, doc_id, page):
+        """Text of one page (1-based), or an empty string"""
+        with self.lock:
+            row = self.conn.execute("SELECT text FROM pages WHERE doc_id = ? AND page = ?", (doc_id, page)).fetchone()
+        return row[0] if row else ""
+
+    def document_text(self, doc_id):
+        """All pages joined the way extract_text_from_pdf returns them"""
+        with self.lock:
+            rows = self.conn.execute("SELECT text FROM pages WHERE doc_id = ? ORDER BY page", (doc_id,)).fetchall()
+        return PAGE_BREAK.join(text for text, in rows)
+
+    def delete(self, doc_ids):
+        with self.lock:
+            self.conn.executemany("DELETE FROM pages WHERE doc_id = ?", ((doc_id,) for doc_id in doc_ids))
+            self.conn.commit()
+
+
+@functools.lru_cache(maxsize=1)
+def get_page_store():
+    """Page store shared by all sessions"""
+    return PageStore()